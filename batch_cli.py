@@ -0,0 +1,147 @@
+"""
+命令行批量分析，可在没有图形界面的服务器上运行（使用 matplotlib 的 Agg 后端，不导入 PyQt6）：
+
+    python batch_cli.py batch_config.json --dir csv数据/负载 --workers 4 --output-dir 结果
+    python batch_cli.py batch_config.json --files 1.csv 2.csv 3.csv --trace trace.json --cache
+    python batch_cli.py batch_config.json --dual --files z1.csv z2.csv --fan-files f1.csv f2.csv
+    python batch_cli.py batch_config.json --dual --dir 正接 --fan-dir 反接 --export 结果/对比.parquet --export-traces
+
+配置文件为界面中“保存配置”或 ExperimentConfig.save_config 生成的 JSON，第 i 个数据文件对应配置中的第 i 组参数
+（--dir 中的文件按文件名中的数字排序）。默认为因素探究模式（正接/反接为同一文件），--dual 为双机标定模式。
+结果对比表和效率曲线图写入 --output-dir；指定 --export 时结果对比表改为流式导出到该路径（格式由扩展名确定：
+.csv、.parquet 或 .xlsx），双机标定模式下 --export-traces 同时导出各组的逐点数据。
+--cache 把解析后的数据缓存为可内存映射的二进制文件（daq_io.AcquisitionCache），重复分析同一批文件时更快；默认不缓存。
+全部成功时退出码为 0，部分组失败为 1，没有任何结果为 2。
+"""
+import argparse
+import contextlib
+import glob
+import logging
+import os
+import re
+import sys
+import time
+import warnings
+
+os.environ["MPLBACKEND"] = "Agg"
+
+from daq_io import AcquisitionCache, set_default_cache
+from efficiency_kernels import SteadyStateDetector
+from stage_trace import LOGGER_NAME, get_logger, tracing
+from trace_store import TraceStore
+from result_export import export_format
+from unified_calculator import ExperimentConfig, BatchExperimentAnalyzer
+
+logger = get_logger("batch_cli")
+
+
+def natural_key(path):
+    """按文件名中的数字排序：2-xx.csv 排在 10-xx.csv 之前"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', os.path.basename(path))]
+
+
+def collect_files(files, directory, pattern):
+    if files:
+        return list(files)
+    if directory:
+        return sorted(glob.glob(os.path.join(directory, pattern)), key=natural_key)
+    return []
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="电机效率批量分析（命令行）")
+    parser.add_argument('config', help="ExperimentConfig 配置文件 (JSON)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--files', nargs='+', help="数据文件，按实验组顺序")
+    source.add_argument('--dir', help="数据文件目录")
+    parser.add_argument('--pattern', default='*.csv', help="--dir 中的文件名模式")
+    parser.add_argument('--dual', action='store_true', help="双机标定模式（需要反接文件）")
+    fan_source = parser.add_mutually_exclusive_group()
+    fan_source.add_argument('--fan-files', nargs='+', help="反接数据文件，按实验组顺序")
+    fan_source.add_argument('--fan-dir', help="反接数据文件目录")
+    parser.add_argument('--workers', type=int, default=0, help="并行进程数，0 为全部CPU核心")
+    parser.add_argument('--points', type=int, default=None, help="每个文件只读取前 N 行")
+    parser.add_argument('--steady-state', action='store_true', help="配置中没有稳态检测参数时使用默认的稳态检测")
+    parser.add_argument('--cache', action='store_true',
+                        help="把解析后的数据缓存为二进制文件（位置见 MOTOR_DAQ_CACHE_DIR，默认 ~/.cache/motor_daq）")
+    parser.add_argument('--output-dir', default='.', help="结果输出目录")
+    parser.add_argument('--no-plot', action='store_true', help="不生成效率曲线图")
+    parser.add_argument('--export', default=None, help="结果对比表的导出路径（.csv、.parquet 或 .xlsx）")
+    parser.add_argument('--export-traces', action='store_true', help="同时导出逐点数据（双机标定模式，需要 --export）")
+    parser.add_argument('--trace', default=None, help="把分阶段计时导出为 JSON 文件")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-v', '--verbose', action='store_true', help="显示调试信息")
+    verbosity.add_argument('-q', '--quiet', action='store_true', help="只显示警告和错误")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger(LOGGER_NAME).setLevel(level)
+    # 服务器上通常没有 SimHei 字体，每个文字都会产生一条字体回退警告
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore', message=r'Glyph \d+ .* missing from font')
+
+    if args.cache:
+        cache = AcquisitionCache()
+        set_default_cache(cache)
+        logger.info("数据缓存已启用: %s", cache.describe())
+
+    config = ExperimentConfig.load_config(args.config)
+    config.is_factor_exploration_mode = not args.dual
+    if args.steady_state and config.steady_state is None:
+        config.steady_state = SteadyStateDetector()
+
+    zheng_files = collect_files(args.files, args.dir, args.pattern)
+    fan_files = collect_files(args.fan_files, args.fan_dir, args.pattern) if args.dual else None
+    if not zheng_files:
+        logger.error("没有找到数据文件")
+        return 2
+    if args.dual and not fan_files:
+        logger.error("双机标定模式需要 --fan-files 或 --fan-dir")
+        return 2
+    if args.export_traces and not (args.export and args.dual):
+        logger.error("--export-traces 需要 --export 和 --dual（因素探究模式不保留逐点数据）")
+        return 2
+    if args.export:
+        try:
+            export_format(args.export)
+        except ValueError as e:
+            logger.error("%s", e)
+            return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    # 导出逐点数据时各组的逐点数据先写入临时的会话目录，导出后删除
+    with TraceStore() if args.export_traces else contextlib.nullcontext() as trace_store:
+        analyzer = BatchExperimentAnalyzer(config, trace_store=trace_store)
+        start_time = time.perf_counter()
+        with tracing() as tracer:
+            analyzer.run_files(zheng_files, fan_files, args.points, args.workers)
+        elapsed = time.perf_counter() - start_time
+        logger.info("完成 %d 组，失败 %d 组，用时 %.2f s", len(analyzer.results), len(analyzer.failures), elapsed)
+        for failure in analyzer.failures:
+            logger.warning("第 %d 组 (%s) 失败: %s", failure['experiment_index'], failure['file'], failure['error'])
+
+        if args.trace:
+            tracer.export_json(args.trace)
+            logger.info("分阶段计时已导出到: %s", args.trace)
+        if not analyzer.results:
+            return 2
+
+        if args.export:
+            try:
+                analyzer.export_results(args.export, include_traces=args.export_traces)
+            except ImportError as e:
+                logger.error("导出失败: %s", e)
+                return 2
+        else:
+            analyzer.generate_comparison_table(args.output_dir)
+    if not args.no_plot:
+        analyzer.plot_efficiency_curves(args.output_dir, show=False)
+    return 1 if analyzer.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
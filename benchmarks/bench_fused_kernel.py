@@ -0,0 +1,98 @@
+"""
+对比融合积分核与原来的逐步计算链（转电流 → NaN掩码 → 压缩 → 功率 → 梯形积分）在仓库自带数据上的耗时。
+
+    python benchmarks/bench_fused_kernel.py [--repeat 20] [--tile 1]
+
+--tile 把每个文件的数据重复多次，以观察较长采集下的表现。未安装 Numba 时只对比 NumPy 实现。
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import efficiency_kernels
+from efficiency_kernels import uniform_trapz, valid_sample_index, fused_side_integrals
+from daq_io import read_acquisition, ChannelMap, resolve_channel_columns
+
+REFERENCE_V, INITIAL_V, R_LOAD, DRIVE_V = 0.185, 2.52, 3.5, 12.0
+DX = 1.0 / 87500.0
+
+
+def chain_integrals(ver_v, theo_output_v, theo_input_v):
+    """原来的计算链，每一步都生成中间数组（与融合核得到相同的量，包括输出功率的平均值和最大值）"""
+    output_i = (ver_v - INITIAL_V) / REFERENCE_V
+    valid = ~np.isnan(output_i)
+    output_power = output_i[valid]**2 * R_LOAD
+    ver_energy = uniform_trapz(output_power, DX, valid_sample_index(valid))
+    ver_energy = (ver_energy, np.mean(output_power), np.max(output_power))
+    if theo_output_v is None:
+        return ver_energy, 0.0, 0.0
+    output_i = (theo_output_v - INITIAL_V) / REFERENCE_V
+    input_i = (theo_input_v - INITIAL_V) / REFERENCE_V
+    valid = ~np.isnan(output_i) & ~np.isnan(input_i)
+    index = valid_sample_index(valid)
+    return (ver_energy,
+            uniform_trapz(output_i[valid]**2 * R_LOAD, DX, index),
+            uniform_trapz(DRIVE_V * input_i[valid], DX, index))
+
+
+def fused_integrals(ver_v, theo_output_v, theo_input_v):
+    return fused_side_integrals(ver_v, theo_output_v, theo_input_v, INITIAL_V, REFERENCE_V, R_LOAD, DRIVE_V, DX)
+
+
+def fused_integrals_numpy(ver_v, theo_output_v, theo_input_v):
+    """不使用 Numba 时的实现"""
+    empty = np.zeros(0)
+    return efficiency_kernels._fused_side_numpy(
+        ver_v, empty if theo_output_v is None else theo_output_v, empty if theo_input_v is None else theo_input_v,
+        INITIAL_V, REFERENCE_V, R_LOAD, DRIVE_V, DX, efficiency_kernels.new_fused_state())
+
+
+def best_time(func, args, repeat):
+    func(*args)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="融合积分核基准测试")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--tile', type=int, default=1)
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'csv数据'))
+    args = parser.parse_args()
+
+    implementations = [("计算链", chain_integrals), ("融合(NumPy)", fused_integrals_numpy)]
+    if efficiency_kernels.HAS_NUMBA:
+        implementations.append(("融合(Numba)", fused_integrals))
+
+    files = sorted(glob.glob(os.path.join(args.data, '**', '*.csv'), recursive=True))
+    totals = {name: 0.0 for name, _ in implementations}
+    total_rows = 0
+    for file_path in files:
+        channels, _ = resolve_channel_columns(file_path, ChannelMap())
+        acquisition = read_acquisition(file_path)
+        if acquisition.empty or channels["verification_output"] not in acquisition:
+            continue
+        data = [np.tile(acquisition[channels["verification_output"]], args.tile), None, None]
+        if channels["theoretical_output"] in acquisition and channels["theoretical_input"] in acquisition:
+            data[1] = np.tile(acquisition[channels["theoretical_output"]], args.tile)
+            data[2] = np.tile(acquisition[channels["theoretical_input"]], args.tile)
+        total_rows += len(data[0])
+        for name, func in implementations:
+            totals[name] += best_time(func, data, args.repeat)
+
+    print(f"文件数: {len(files)}    总行数: {total_rows}    Numba: {'是' if efficiency_kernels.HAS_NUMBA else '否'}")
+    baseline = totals["计算链"]
+    for name, elapsed in totals.items():
+        print(f"{name:<12} {elapsed * 1000:9.3f} ms    {total_rows / elapsed / 1e6:8.1f} M行/s    加速比 {baseline / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+启动时间预算：在新的 Python 进程中测量导入计算模块（unified_calculator）和打开主窗口（导入 unified_app、
+创建并显示 UnifiedMotorAnalysisApp）的耗时，超出预算时退出码为 1，可用于发现拖慢启动的导入。
+
+    python benchmarks/bench_startup.py [--repeat 5] [--calculator-budget 0.7] [--gui-budget 0.6]
+
+耗时取 repeat 次中的最短时间（不含解释器本身的启动），同时列出此时已经导入的重量级模块；
+界面用 Qt 的 offscreen 平台，不需要显示器。结果追加到与 bench_suite.py 相同的 JSONL 历史文件中。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+from bench_suite import DEFAULT_HISTORY, environment_info, load_history
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 启动时应当推迟导入的模块
+HEAVY_MODULES = ["matplotlib", "pandas", "numba", "openpyxl", "unified_calculator", "factor_calculator"]
+
+_PROBES = {
+    "calculator": """
+import time
+start = time.perf_counter()
+import unified_calculator
+seconds = time.perf_counter() - start
+""",
+    "gui": """
+import time
+start = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+app = QApplication([])
+import unified_app
+window = unified_app.UnifiedMotorAnalysisApp()
+window.show()
+app.processEvents()
+seconds = time.perf_counter() - start
+window.close()
+""",
+}
+_REPORT = """
+import json, sys
+print(json.dumps({"seconds": seconds, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+
+def probe(case):
+    """在新进程中执行一次测量，返回 {"seconds", "loaded"}"""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    code = _PROBES[case] + _REPORT % (HEAVY_MODULES,)
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{case} 测量失败:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动时间预算")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--calculator-budget', type=float, default=0.7, help="导入 unified_calculator 的预算 (s)")
+    parser.add_argument('--gui-budget', type=float, default=0.6, help="打开主窗口的预算 (s)")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSONL 历史文件")
+    parser.add_argument('--no-save', action='store_true', help="只显示结果，不写入历史文件")
+    parser.add_argument('--label', default=None, help="写入记录的说明")
+    args = parser.parse_args()
+
+    budgets = {"calculator": args.calculator_budget, "gui": args.gui_budget}
+    history = load_history(args.history)
+    env = environment_info()
+    timestamp = datetime.now().isoformat(timespec='seconds')
+    records = []
+    over_budget = False
+    print(f"commit {env['commit']}    Python {env['python']}")
+    print(f"{'用例':<20}{'耗时 (ms)':>12}{'预算 (ms)':>12}{'耗时变化':>12}    已导入")
+
+    for case, budget in budgets.items():
+        runs = [probe(case) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["seconds"])
+        name = f"startup_{case}"
+        record = {"timestamp": timestamp, "label": args.label, **env, "case": name, "rows": None,
+                  "repeat": args.repeat, "seconds": best["seconds"], "budget": budget, "loaded": best["loaded"]}
+        records.append(record)
+
+        previous = next((r for r in reversed(history) if r["case"] == name), None)
+        change = f"{best['seconds'] / previous['seconds'] - 1:+.1%}" if previous else "-"
+        status = "" if best["seconds"] <= budget else "  超出预算"
+        over_budget = over_budget or best["seconds"] > budget
+        print(f"{name:<20}{best['seconds'] * 1000:>12.1f}{budget * 1000:>12.0f}{change:>12}    "
+              f"{', '.join(best['loaded']) or '-'}{status}")
+
+    if not args.no_save:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {args.history}")
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+效率计算的基准测试：在不同长度的合成采集数据（见 synthetic_daq.py）上测量各计算入口的耗时和峰值内存，
+结果追加到 JSONL 历史文件中，并与同一用例上一次的记录对比，便于发现版本之间的性能退化。
+
+    python benchmarks/bench_suite.py [--sizes 10000 100000 1000000] [--repeat 3] [--label 说明]
+    python benchmarks/bench_suite.py --sizes 10000000 100000000 --repeat 1 --cases unified simple
+
+合成数据缓存在 --data-dir（默认系统临时目录下的 motor_bench_data）中，再次运行时不重新生成；
+解析后的数据缓存（daq_io.AcquisitionCache）也放在该目录下，--no-cache 时每次都解析CSV文件。
+耗时取 repeat 次中的最短时间；峰值内存由 tracemalloc 在单独的一次运行中测量（Python 与 NumPy 分配的内存），
+这次运行同时起到预热作用（Numba 编译、文件缓存）。BatchExperimentAnalyzer 用 --workers > 1 时子进程的内存不计入。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+import efficiency_kernels
+from daq_io import AcquisitionCache, set_default_cache
+from synthetic_daq import ensure_synthetic_csv
+from unified_calculator import (calculate_unified_efficiencies, calculate_simple_efficiency,
+                                ExperimentConfig, BatchExperimentAnalyzer)
+from factor_calculator import calculate_single_efficiency, calculate_factor_experiment
+
+PARAMS = {"reference_v": 0.185, "initial_v": 2.52, "r_load": 3.5, "drive_v": 12.0, "power_input": 13.0,
+          "sampling_freq": 87500.0}
+# 各实验组的验证实验输出电流 (A)，对应不同的负载工况
+GROUP_CURRENTS = [1.3, 1.5, 1.7]
+DEFAULT_HISTORY = os.path.join(BENCH_DIR, 'history.jsonl')
+
+
+class BenchFiles:
+    """某一行数的全部数据文件：zheng[i] / fan[i] 为第 i+1 组的正接/反接文件"""
+
+    def __init__(self, directory, n_rows):
+        self.directory = os.path.join(directory, str(n_rows))
+        self.n_rows = n_rows
+        self.zheng = []
+        self.fan = []
+        for i, current in enumerate(GROUP_CURRENTS):
+            self.zheng.append(ensure_synthetic_csv(self.directory, f'zheng_{i + 1}.csv', n_rows, seed=2 * i,
+                                                   output_current=current))
+            self.fan.append(ensure_synthetic_csv(self.directory, f'fan_{i + 1}.csv', n_rows, seed=2 * i + 1,
+                                                 output_current=current * 0.95))
+
+    def pattern(self, side):
+        return os.path.join(self.directory, side + '_{index}.csv')
+
+
+def case_unified(files):
+    p = PARAMS
+    return calculate_unified_efficiencies(files.zheng[0], files.fan[0], p["reference_v"], p["initial_v"],
+                                          p["r_load"], p["drive_v"], p["power_input"], p["sampling_freq"])
+
+
+def case_simple(files):
+    p = PARAMS
+    return calculate_simple_efficiency(files.zheng[0], p["reference_v"], p["initial_v"], p["r_load"],
+                                       p["power_input"], p["sampling_freq"])
+
+
+def case_single(files):
+    p = PARAMS
+    return calculate_single_efficiency(files.zheng[0], p["reference_v"], p["initial_v"], p["r_load"],
+                                       p["power_input"], p["sampling_freq"])
+
+
+def case_factor_experiment(files):
+    params = {name: PARAMS[name] for name in ("reference_v", "initial_v", "r_load", "power_input", "sampling_freq")}
+    experiments = [{"factor_value": current, "file_path": file_path, "params": params}
+                   for current, file_path in zip(GROUP_CURRENTS, files.zheng)]
+    return calculate_factor_experiment(experiments)
+
+
+def case_batch(files, max_workers=1):
+    config = ExperimentConfig()
+    config.common_params.update({name: PARAMS[name] for name in ("reference_v", "initial_v", "sampling_freq")})
+    config.configure_voltage_exploration(
+        [{"drive_v": PARAMS["drive_v"], "power_input": PARAMS["power_input"]} for _ in GROUP_CURRENTS],
+        r_load_fixed=PARAMS["r_load"])
+    analyzer = BatchExperimentAnalyzer(config)
+    analyzer.run_batch_experiments(files.pattern('zheng'), files.pattern('fan'), max_workers=max_workers)
+    return analyzer.results
+
+
+CASES = {
+    "unified": case_unified,
+    "simple": case_simple,
+    "single": case_single,
+    "factor_experiment": case_factor_experiment,
+    "batch": case_batch,
+}
+# 每个用例读取的文件数，用于计算吞吐量
+CASE_FILES = {"unified": 2, "simple": 1, "single": 1, "factor_experiment": len(GROUP_CURRENTS),
+              "batch": 2 * len(GROUP_CURRENTS)}
+
+
+def _quiet(func, *args):
+    """执行时屏蔽计算函数的调试输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def measure(func, files, repeat):
+    """返回 (最短耗时 s, tracemalloc 峰值字节数)"""
+    tracemalloc.start()
+    try:
+        _quiet(func, files)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _quiet(func, files)
+        best = min(best, time.perf_counter() - start)
+    return best, peak
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info():
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": efficiency_kernels.HAS_NUMBA,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_record(history, case, rows, acquisition_cache):
+    for record in reversed(history):
+        if (record["case"] == case and record["rows"] == rows
+                and record.get("acquisition_cache", True) == acquisition_cache):
+            return record
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="效率计算基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help="每个文件的采样数")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1, help="batch 用例的进程数")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'motor_bench_data'))
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSONL 历史文件")
+    parser.add_argument('--no-cache', action='store_true', help="不使用解析后的数据缓存，测量包含CSV解析")
+    parser.add_argument('--no-save', action='store_true', help="只显示结果，不写入历史文件")
+    parser.add_argument('--label', default=None, help="写入记录的说明")
+    args = parser.parse_args()
+
+    use_cache = not args.no_cache
+    set_default_cache(AcquisitionCache(os.path.join(args.data_dir, 'acquisition_cache'), max_bytes=2**40)
+                      if use_cache else None)
+    history = load_history(args.history)
+    env = environment_info()
+    timestamp = datetime.now().isoformat(timespec='seconds')
+    records = []
+    print(f"commit {env['commit']}    Python {env['python']}    NumPy {env['numpy']}    "
+          f"Numba: {'是' if env['numba'] else '否'}    数据缓存: {'是' if use_cache else '否'}")
+    print(f"{'用例':<18}{'行数':>12}{'耗时 (ms)':>14}{'M行/s':>10}{'峰值内存 (MB)':>16}{'耗时变化':>12}")
+
+    for n_rows in args.sizes:
+        files = BenchFiles(args.data_dir, n_rows)
+        for case in args.cases:
+            func = CASES[case]
+            if case == "batch":
+                func = lambda files: case_batch(files, args.workers)
+            seconds, peak = measure(func, files, args.repeat)
+            record = {"timestamp": timestamp, "label": args.label, **env, "case": case, "rows": n_rows,
+                      "acquisition_cache": use_cache, "repeat": args.repeat, "seconds": seconds, "peak_bytes": peak}
+            if case == "batch":
+                record["workers"] = args.workers
+            records.append(record)
+
+            previous = previous_record(history, case, n_rows, use_cache)
+            change = f"{seconds / previous['seconds'] - 1:+.1%}" if previous else "-"
+            print(f"{case:<18}{n_rows:>12}{seconds * 1000:>14.2f}{CASE_FILES[case] * n_rows / seconds / 1e6:>10.2f}"
+                  f"{peak / 2**20:>16.1f}{change:>12}")
+
+    if not args.no_save:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"结果已追加到 {args.history}")
+
+
+if __name__ == '__main__':
+    main()
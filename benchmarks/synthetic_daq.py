@@ -0,0 +1,82 @@
+"""
+生成确定性的合成采集数据（Index,AIN 1 ~ AIN 8 格式，与 csv数据 中的文件相同），用于基准测试。
+
+    python benchmarks/synthetic_daq.py out.csv --rows 1000000 [--seed 0] [--output-current 1.5]
+
+波形为直流电机启动后进入稳态的电流：指数上升、换向纹波加高斯噪声，再按采集卡的量化步长取整。
+相同的 rows、seed 和参数总是得到相同的文件；数据按块生成和写入，内存占用与行数无关。
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+CHANNELS = 8
+HEADER = ['Index'] + [f'AIN {i}' for i in range(1, CHANNELS + 1)]
+CHUNK_ROWS = 1 << 20
+ADC_STEP = 10.0 / 2730
+
+
+def synthetic_block(start: int, n_rows: int, seed: int = 0, sampling_freq: float = 87500.0,
+                    initial_v: float = 2.52, reference_v: float = 0.185, output_current: float = 1.5,
+                    theoretical_output_current: float = 0.1, theoretical_input_current: float = 0.25,
+                    ripple_freq: float = 350.0, startup_s: float = 0.05, noise_v: float = 0.004,
+                    missing_fraction: float = 0.0) -> np.ndarray:
+    """
+    第 start 行起的 n_rows 行数据，形状 (n_rows, 8)。随机数按 (seed, 块序号) 生成，
+    因此结果只取决于行号，与调用时的分块方式无关（start 需为 CHUNK_ROWS 的整数倍）。
+    verification_output 在 AIN 2，理论实验输出/输入在 AIN 6 / AIN 7，与默认通道映射一致。
+    """
+    rng = np.random.default_rng([seed, start // CHUNK_ROWS])
+    t = (start + np.arange(n_rows)) / sampling_freq
+    rise = 1.0 - np.exp(-t / startup_s)
+    ripple = 1.0 + 0.05 * np.sin(2 * np.pi * ripple_freq * t)
+
+    rows = rng.normal(0.0, noise_v, size=(n_rows, CHANNELS))
+    rows[:, 0] += 3.17582
+    rows[:, 1] += initial_v + reference_v * output_current * rise * ripple
+    rows[:, 5] += initial_v + reference_v * theoretical_output_current * rise * ripple
+    rows[:, 6] += initial_v + reference_v * theoretical_input_current * rise
+    rows = np.abs(np.round(rows / ADC_STEP) * ADC_STEP)
+    if missing_fraction > 0:
+        rows[rng.random(size=rows.shape) < missing_fraction] = np.nan
+    return rows
+
+
+def write_synthetic_csv(file_path: str, n_rows: int, seed: int = 0, **waveform):
+    """写入 n_rows 行合成数据；waveform 为 synthetic_block 的波形参数"""
+    with open(file_path, 'w', newline='') as f:
+        for start in range(0, n_rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, n_rows - start)
+            frame = pd.DataFrame(synthetic_block(start, n, seed, **waveform), columns=HEADER[1:])
+            frame.insert(0, 'Index', np.arange(start + 1, start + n + 1))
+            frame.to_csv(f, header=start == 0, index=False, float_format='%.6g', lineterminator='\n')
+    return file_path
+
+
+def ensure_synthetic_csv(directory: str, name: str, n_rows: int, seed: int = 0, **waveform):
+    """directory 中已有同名文件时直接返回其路径，否则生成（文件名应包含行数和 seed）"""
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, name)
+    if not os.path.exists(file_path):
+        tmp_path = file_path + '.tmp'
+        write_synthetic_csv(tmp_path, n_rows, seed, **waveform)
+        os.replace(tmp_path, file_path)
+    return file_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成采集数据")
+    parser.add_argument('output')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-current', type=float, default=1.5, help="验证实验输出电流 (A)")
+    parser.add_argument('--missing', type=float, default=0.0, help="缺失值（空单元格）的比例")
+    args = parser.parse_args()
+    write_synthetic_csv(args.output, args.rows, args.seed, output_current=args.output_current,
+                        missing_fraction=args.missing)
+    print(f"已生成 {args.output}: {args.rows} 行")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+import numpy as np
+import os
+import io
+import json
+import hashlib
+import shutil
+from stage_trace import get_logger
+
+logger = get_logger(__name__)
+
+
+class Acquisition:
+    """
+    一次数据采集的解析结果：按CSV列位置索引的浮点通道数组（第0列为 Index）。
+    start_row 为第一行在原始数据中的行号（截取稳态段等情况下不为0）。
+    """
+
+    def __init__(self, file_path, channels, n_rows, n_columns, start_row=0):
+        self.file_path = file_path
+        self.channels = channels
+        self.n_rows = n_rows
+        self.n_columns = n_columns
+        self.start_row = start_row
+
+    def __len__(self):
+        return self.n_rows
+
+    def __contains__(self, column):
+        return column in self.channels
+
+    def __getitem__(self, column):
+        return self.channels[column]
+
+    @property
+    def empty(self):
+        return self.n_rows == 0
+
+    def slice(self, start, stop):
+        """返回 [start, stop) 行的视图（不复制数据）"""
+        start = max(0, min(start, self.n_rows))
+        stop = max(start, min(stop, self.n_rows))
+        channels = {column: values[start:stop] for column, values in self.channels.items()}
+        return Acquisition(self.file_path, channels, stop - start, self.n_columns, self.start_row + start)
+
+
+class ChannelMap:
+    """
+    各实验量所在的采集通道，按CSV表头中的通道名称指定（如 "AIN 2"），读取数据时由表头解析为列位置。
+
+    verification_output: 验证实验的输出电压通道
+    theoretical_output / theoretical_input: 理论实验的输出/输入电压通道
+    """
+
+    ROLES = ('verification_output', 'theoretical_output', 'theoretical_input')
+    # 早期版本按固定列位置读取（第0列为 Index，AIN n 位于第 n 列）
+    DEFAULT_POSITIONS = {'verification_output': 2, 'theoretical_output': 6, 'theoretical_input': 7}
+
+    def __init__(self, verification_output: str = 'AIN 2', theoretical_output: str = 'AIN 6',
+                 theoretical_input: str = 'AIN 7'):
+        self.verification_output = verification_output
+        self.theoretical_output = theoretical_output
+        self.theoretical_input = theoretical_input
+
+    @staticmethod
+    def normalize(name):
+        """表头名称比较时忽略大小写、空白和下划线，"AIN 2"、"ain2"、"AIN_2" 视为同一通道"""
+        return ''.join(str(name).split()).replace('_', '').upper()
+
+    @classmethod
+    def fallback_position(cls, role, name):
+        """表头中找不到通道时使用的列位置："AIN n" 形式的名称对应第 n 列，其他名称使用该角色的默认列位置"""
+        normalized = cls.normalize(name)
+        if normalized.startswith('AIN') and normalized[3:].isdigit():
+            return int(normalized[3:])
+        return cls.DEFAULT_POSITIONS[role]
+
+    def resolve(self, header, roles=None):
+        """
+        返回 {角色: 列位置}。只查找 roles 中的角色（默认全部），其余角色对应 None。
+        表头中找不到的通道按 fallback_position 使用固定列位置（并记录警告），该位置超出列数时对应 None。
+        """
+        roles = self.ROLES if roles is None else roles
+        positions = {}
+        for position, name in enumerate(header):
+            positions.setdefault(self.normalize(name), position)
+        resolved = dict.fromkeys(self.ROLES)
+        for role in roles:
+            name = getattr(self, role)
+            position = positions.get(self.normalize(name))
+            if position is None:
+                position = self.fallback_position(role, name)
+                if position < len(header):
+                    logger.warning("表头中没有通道 '%s'（%s），按第 %d 列读取；表头为: %s",
+                                   name, role, position, ','.join(header))
+                else:
+                    logger.warning("表头中没有通道 '%s'（%s），第 %d 列也不存在；表头为: %s",
+                                   name, role, position, ','.join(header))
+                    position = None
+            resolved[role] = position
+        return resolved
+
+    def to_dict(self):
+        return {role: getattr(self, role) for role in self.ROLES}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data is None:
+            return cls()
+        return cls(**{role: data[role] for role in cls.ROLES if role in data})
+
+    def __repr__(self):
+        return f"ChannelMap({', '.join(f'{role}={getattr(self, role)!r}' for role in self.ROLES)})"
+
+
+class AcquisitionCache:
+    """
+    已解析采集数据的二进制缓存。
+
+    每个CSV文件对应缓存目录下的一个条目（以绝对路径的哈希命名），每列保存为一个 float64 的 .npy 文件，
+    读取时以内存映射方式打开。条目记录源文件的大小和修改时间，源文件变化后自动失效；
+    缓存总大小超过 max_bytes 时按最近使用时间淘汰最旧的条目。
+    """
+
+    META_FILE = 'meta.json'
+
+    def __init__(self, cache_dir: str | None = None, max_bytes: int = 2 * 1024**3):
+        if cache_dir is None:
+            cache_dir = os.environ.get('MOTOR_DAQ_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'motor_daq')
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, file_path):
+        digest = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:20])
+
+    @staticmethod
+    def _column_file(entry_dir, column):
+        return os.path.join(entry_dir, f'col{column}.npy')
+
+    @staticmethod
+    def _source_signature(file_path):
+        st = os.stat(file_path)
+        return st.st_size, st.st_mtime_ns
+
+    def lookup(self, file_path):
+        """返回有效条目的元数据，条目不存在或源文件已变化时返回 None（失效条目会被删除）"""
+        entry_dir = self._entry_dir(file_path)
+        meta_path = os.path.join(entry_dir, self.META_FILE)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        size, mtime_ns = self._source_signature(file_path)
+        if meta.get('size') != size or meta.get('mtime_ns') != mtime_ns:
+            self.invalidate(file_path)
+            return None
+        os.utime(meta_path)
+        return meta
+
+    def load_columns(self, file_path, columns, n_rows=None):
+        """以内存映射方式读取已缓存的列，返回 {列位置: 数组}，未缓存的列不包含在结果中"""
+        entry_dir = self._entry_dir(file_path)
+        channels = {}
+        for column in columns:
+            try:
+                array = np.load(self._column_file(entry_dir, column), mmap_mode='r')
+            except (OSError, ValueError):
+                continue
+            channels[column] = array[:n_rows] if n_rows is not None else array
+        return channels
+
+    def store(self, file_path, channels, n_rows, n_columns):
+        """写入（或补充）某文件的列缓存，写入完成后按容量上限淘汰旧条目"""
+        size, mtime_ns = self._source_signature(file_path)
+        entry_dir = self._entry_dir(file_path)
+        os.makedirs(entry_dir, exist_ok=True)
+        suffix = f'.{os.getpid()}.tmp'
+        for column, values in channels.items():
+            target = self._column_file(entry_dir, column)
+            with open(target + suffix, 'wb') as f:
+                np.save(f, np.asarray(values, dtype=np.float64))
+            os.replace(target + suffix, target)
+        meta = {
+            'source': os.path.abspath(file_path),
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'n_rows': n_rows,
+            'n_columns': n_columns
+        }
+        meta_path = os.path.join(entry_dir, self.META_FILE)
+        with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + suffix, meta_path)
+        self.evict(keep=entry_dir)
+
+    def invalidate(self, file_path):
+        shutil.rmtree(self._entry_dir(file_path), ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def evict(self, keep=None):
+        """
+        淘汰最久未使用的条目，直到缓存总大小不超过 max_bytes。
+        多个进程可能同时写入和淘汰同一缓存目录，遍历中途被其他进程删除的条目和文件直接跳过。
+        """
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        entries = []
+        total = 0
+        for name in names:
+            entry_dir = os.path.join(self.cache_dir, name)
+            try:
+                file_names = os.listdir(entry_dir)
+            except OSError:
+                continue
+            entry_size = 0
+            for file_name in file_names:
+                try:
+                    entry_size += os.path.getsize(os.path.join(entry_dir, file_name))
+                except OSError:
+                    pass
+            try:
+                last_used = os.path.getmtime(os.path.join(entry_dir, self.META_FILE))
+            except OSError:
+                last_used = 0.0
+            entries.append((last_used, entry_dir, entry_size))
+            total += entry_size
+        for last_used, entry_dir, entry_size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_dir == keep:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= entry_size
+
+    def describe(self):
+        """缓存位置与容量上限的说明，启用缓存时记录到日志"""
+        return f"{self.cache_dir}（容量上限 {self.max_bytes / 1024**3:.1f} GiB）"
+
+    def __repr__(self):
+        return f"AcquisitionCache(cache_dir={self.cache_dir!r}, max_bytes={self.max_bytes!r})"
+
+
+# 默认不缓存：由调用方（界面设置、命令行 --cache）通过 set_default_cache 启用，或设置环境变量 MOTOR_DAQ_CACHE=1
+_default_cache = AcquisitionCache() if os.environ.get('MOTOR_DAQ_CACHE', '0') == '1' else None
+
+
+def get_default_cache():
+    return _default_cache
+
+
+def set_default_cache(cache: AcquisitionCache | None):
+    """设置 read_acquisition 默认使用的缓存，传入 None 关闭缓存"""
+    global _default_cache
+    _default_cache = cache
+
+
+def _read_header(file_path):
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.readline().rstrip('\r\n').split(',')
+
+
+def resolve_channel_columns(file_path, channel_map: ChannelMap | None = None, roles=None):
+    """读取表头并按通道映射解析 roles 中各角色（默认全部）的列位置，同时返回文件的总列数"""
+    header = _read_header(file_path)
+    return (channel_map or ChannelMap()).resolve(header, roles), len(header)
+
+
+def _parse_csv(file_path, columns, nrows):
+    # pandas 只在解析CSV文本时导入（约 0.4 s），界面启动和命中缓存的读取不需要
+    import pandas as pd
+    if columns is None:
+        data_df = pd.read_csv(file_path, header=None, skiprows=1, nrows=nrows)
+        n_columns = data_df.shape[1]
+        usecols = list(data_df.columns)
+    else:
+        n_columns = len(_read_header(file_path))
+        usecols = sorted({c for c in columns if 0 <= c < n_columns})
+        # 请求的列都不存在时仍读取第0列，以获得数据行数
+        data_df = pd.read_csv(file_path, header=None, skiprows=1, usecols=usecols or [0], nrows=nrows)
+
+    channels = {}
+    for column in usecols:
+        channels[column] = pd.to_numeric(data_df[column], errors='coerce').to_numpy(dtype=np.float64)
+    return channels, len(data_df), n_columns
+
+
+_USE_DEFAULT_CACHE = object()
+
+
+def read_acquisition(file_path: str, columns=None, points_to_process: int | None = None,
+                     cache=_USE_DEFAULT_CACHE) -> Acquisition:
+    """
+    读取DAQ导出的CSV文件（跳过表头）。
+
+    columns: 需要解析的列位置列表，None 表示全部列；文件中不存在的列会被忽略。
+    points_to_process: 只读取前N行（<=0 或 None 表示全部），读取在第N行处停止，而不是解析整个文件后再截取。
+    cache: AcquisitionCache 实例，None 表示不使用缓存，默认使用 get_default_cache()（未启用时为 None）。
+           命中时直接内存映射已缓存的列；未命中的完整读取会把解析结果写入缓存，截取读取不写入缓存。
+    """
+    if cache is _USE_DEFAULT_CACHE:
+        cache = _default_cache
+    nrows = points_to_process if points_to_process is not None and points_to_process > 0 else None
+
+    meta = None
+    if cache is not None:
+        try:
+            meta = cache.lookup(file_path)
+        except OSError:
+            meta = None
+
+    cached = {}
+    if meta is not None:
+        n_columns = meta['n_columns']
+        wanted = list(range(n_columns)) if columns is None else sorted({c for c in columns if 0 <= c < n_columns})
+        n_rows = meta['n_rows'] if nrows is None else min(nrows, meta['n_rows'])
+        cached = cache.load_columns(file_path, wanted, n_rows)
+        missing = [c for c in wanted if c not in cached]
+        if not missing:
+            return Acquisition(file_path, cached, n_rows, n_columns)
+        # 只解析缓存中缺少的列
+        columns = missing
+
+    channels, n_rows, n_columns = _parse_csv(file_path, columns, nrows)
+    if cache is not None and nrows is None and channels:
+        try:
+            cache.store(file_path, channels, n_rows, n_columns)
+        except OSError as e:
+            logger.warning("写入数据缓存失败: %s", e)
+    channels.update(cached)
+    return Acquisition(file_path, dict(sorted(channels.items())), n_rows, n_columns)
+
+
+def iter_acquisition_chunks(file_path: str, columns=None, points_to_process: int | None = None,
+                            chunksize: int = 500_000, cache=_USE_DEFAULT_CACHE):
+    """
+    按块读取DAQ CSV文件，逐块返回 Acquisition（n_rows 为块内行数），峰值内存只与 chunksize 有关。
+
+    缓存命中时直接按块切片内存映射的列，不再解析文本；流式读取不会写入缓存。
+    """
+    if cache is _USE_DEFAULT_CACHE:
+        cache = _default_cache
+    nrows = points_to_process if points_to_process is not None and points_to_process > 0 else None
+
+    meta = None
+    if cache is not None:
+        try:
+            meta = cache.lookup(file_path)
+        except OSError:
+            meta = None
+    if meta is not None:
+        n_columns = meta['n_columns']
+        wanted = list(range(n_columns)) if columns is None else sorted({c for c in columns if 0 <= c < n_columns})
+        n_rows = meta['n_rows'] if nrows is None else min(nrows, meta['n_rows'])
+        cached = cache.load_columns(file_path, wanted, n_rows)
+        if len(cached) == len(wanted):
+            for start in range(0, n_rows, chunksize):
+                stop = min(start + chunksize, n_rows)
+                yield Acquisition(file_path, {c: np.asarray(a[start:stop]) for c, a in cached.items()}, stop - start, n_columns)
+            return
+
+    if columns is None:
+        n_columns = None
+        usecols = None
+    else:
+        n_columns = len(_read_header(file_path))
+        usecols = sorted({c for c in columns if 0 <= c < n_columns})
+    import pandas as pd
+    reader = pd.read_csv(file_path, header=None, skiprows=1, usecols=(usecols or [0]) if usecols is not None else None,
+                         nrows=nrows, chunksize=chunksize)
+    with reader:
+        for chunk_df in reader:
+            chunk_columns = list(chunk_df.columns) if usecols is None else usecols
+            channels = {
+                column: pd.to_numeric(chunk_df[column], errors='coerce').to_numpy(dtype=np.float64)
+                for column in chunk_columns
+            }
+            yield Acquisition(file_path, channels, len(chunk_df), n_columns if n_columns is not None else chunk_df.shape[1])
+
+
+class CsvTailReader:
+    """
+    增量读取仍在写入中的DAQ CSV文件。
+
+    每次调用 read_new() 最多读取 max_bytes 字节，只解析上次读取之后新增的完整行，返回 Acquisition
+    （start_row 为这些行在文件中的行号，没有新行时 n_rows 为 0）。尚未写完的最后一行留到下次读取，
+    因此每次调用的耗时只与新增数据量有关，与文件总长度无关。文件被截短（重新开始采集）时从头读取。
+
+    columns: 需要解析的列位置列表；也可以是函数 columns(header)，在读到表头后调用一次，返回列位置列表。
+    """
+
+    def __init__(self, file_path: str, columns=None, max_bytes: int = 8 * 1024 * 1024):
+        self.file_path = file_path
+        self.columns = columns
+        self.max_bytes = max_bytes
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.header = None
+        self.usecols = None
+        self.rows_read = 0
+        self._pending = b''
+
+    def _empty(self):
+        n_columns = len(self.header) if self.header is not None else 0
+        return Acquisition(self.file_path, {}, 0, n_columns, self.rows_read)
+
+    def read_new(self) -> Acquisition:
+        if os.path.getsize(self.file_path) < self.offset:
+            self.reset()
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(self.max_bytes)
+        self.offset += len(data)
+        data = self._pending + data
+
+        if self.header is None:
+            newline = data.find(b'\n')
+            if newline < 0:
+                self._pending = data
+                return self._empty()
+            self.header = data[:newline].decode('utf-8', errors='replace').rstrip('\r').split(',')
+            data = data[newline + 1:]
+            columns = self.columns(self.header) if callable(self.columns) else self.columns
+            if columns is not None:
+                self.usecols = sorted({c for c in columns if 0 <= c < len(self.header)}) or [0]
+
+        cut = data.rfind(b'\n')
+        if cut < 0:
+            self._pending = data
+            return self._empty()
+        complete, self._pending = data[:cut + 1], data[cut + 1:]
+
+        import pandas as pd
+        data_df = pd.read_csv(io.BytesIO(complete), header=None, usecols=self.usecols)
+        channels = {
+            column: pd.to_numeric(data_df[column], errors='coerce').to_numpy(dtype=np.float64)
+            for column in data_df.columns
+        }
+        start_row = self.rows_read
+        self.rows_read += len(data_df)
+        return Acquisition(self.file_path, channels, len(data_df), len(self.header), start_row)
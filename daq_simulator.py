@@ -0,0 +1,90 @@
+"""
+数据流模拟器：按指定采样率向 daq_stream.StreamIngestServer 发送 8 通道采样（小端 float32），用于在没有采集卡时调试实时监测。
+
+    python daq_simulator.py --protocol tcp --port 5555 --csv csv数据/<文件名>.csv
+    python daq_simulator.py --protocol udp --port 5555 --seconds 10
+
+指定 --csv 时循环回放文件中的 AIN 1 ~ AIN 8（缺少的通道补 0），否则生成正弦波形。
+"""
+import argparse
+import socket
+import time
+import numpy as np
+from daq_io import read_acquisition
+from daq_stream import STREAM_CHANNELS, FRAME_DTYPE
+
+
+def synthetic_rows(n_rows: int, sampling_freq: float, initial_v: float = 2.5, amplitude: float = 0.5,
+                   frequency: float = 50.0) -> np.ndarray:
+    """生成 n_rows 个采样的正弦波形，各通道相位不同"""
+    t = np.arange(n_rows) / sampling_freq
+    phases = np.linspace(0, np.pi, STREAM_CHANNELS, endpoint=False)
+    rows = initial_v + amplitude * np.sin(2 * np.pi * frequency * t[:, np.newaxis] + phases)
+    return rows.astype(FRAME_DTYPE)
+
+
+def csv_rows(file_path: str) -> np.ndarray:
+    """读取CSV文件中的 AIN 1 ~ AIN 8 作为回放数据"""
+    acquisition = read_acquisition(file_path, columns=range(1, STREAM_CHANNELS + 1))
+    rows = np.zeros((len(acquisition), STREAM_CHANNELS), dtype=FRAME_DTYPE)
+    for column in range(1, STREAM_CHANNELS + 1):
+        if column in acquisition:
+            rows[:, column - 1] = np.nan_to_num(acquisition[column])
+    return rows
+
+
+def send_rows(rows: np.ndarray, host: str, port: int, protocol: str = 'tcp', sampling_freq: float = 87500.0,
+              seconds: float | None = None, block_rows: int = 512):
+    """
+    按采样率循环发送 rows，直到发送了 seconds 秒的数据（None 表示持续发送），返回发送的采样数。
+    每次发送 block_rows 个采样；UDP 时每个数据报恰好包含一个块。
+    """
+    sock_type = socket.SOCK_STREAM if protocol == 'tcp' else socket.SOCK_DGRAM
+    sock = socket.socket(socket.AF_INET, sock_type)
+    if protocol == 'tcp':
+        sock.connect((host, port))
+    total_rows = None if seconds is None else int(seconds * sampling_freq)
+    payload = np.ascontiguousarray(rows, dtype=FRAME_DTYPE)
+    sent = 0
+    start_time = time.perf_counter()
+    try:
+        while total_rows is None or sent < total_rows:
+            count = block_rows if total_rows is None else min(block_rows, total_rows - sent)
+            index = (sent + np.arange(count)) % len(payload)
+            data = payload[index].tobytes()
+            if protocol == 'tcp':
+                sock.sendall(data)
+            else:
+                sock.sendto(data, (host, port))
+            sent += count
+            # 按采样率节流：发送进度超前时等待
+            ahead = sent / sampling_freq - (time.perf_counter() - start_time)
+            if ahead > 0:
+                time.sleep(ahead)
+    finally:
+        sock.close()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DAQ 数据流模拟器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--protocol', choices=['tcp', 'udp'], default='tcp')
+    parser.add_argument('--rate', type=float, default=87500.0, help="采样率 (Hz)")
+    parser.add_argument('--seconds', type=float, default=None, help="发送时长 (s)，默认持续发送")
+    parser.add_argument('--csv', default=None, help="回放的CSV数据文件")
+    parser.add_argument('--block-rows', type=int, default=512, help="每次发送的采样数")
+    args = parser.parse_args()
+
+    rows = csv_rows(args.csv) if args.csv else synthetic_rows(int(args.rate), args.rate)
+    print(f"发送到 {args.protocol}://{args.host}:{args.port}，采样率 {args.rate:g} Hz")
+    try:
+        sent = send_rows(rows, args.host, args.port, args.protocol, args.rate, args.seconds, args.block_rows)
+        print(f"发送完成: {sent} 个采样")
+    except KeyboardInterrupt:
+        print("已停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import socket
+import threading
+import numpy as np
+from daq_io import Acquisition
+
+
+# 数据流格式：每个采样为 8 个小端 float32（AIN 1 ~ AIN 8），与CSV文件的通道排列相同（不含 Index 列）
+STREAM_CHANNELS = 8
+FRAME_DTYPE = np.dtype('<f4')
+FRAME_BYTES = STREAM_CHANNELS * FRAME_DTYPE.itemsize
+STREAM_HEADER = ['Index'] + [f'AIN {i}' for i in range(1, STREAM_CHANNELS + 1)]
+
+
+class RingBuffer:
+    """
+    预分配的多通道环形缓冲区，按 (通道, 样本) 存储，只保留最近 capacity 个采样。
+
+    total 为累计写入的采样数；读取按绝对采样序号进行，只复制请求的部分。写入与读取可以在不同线程中进行。
+    """
+
+    def __init__(self, capacity: int, n_channels: int = STREAM_CHANNELS, dtype=np.float32):
+        self.capacity = capacity
+        self.n_channels = n_channels
+        self.data = np.zeros((n_channels, capacity), dtype=dtype)
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def write(self, rows: np.ndarray):
+        """写入形状为 (采样数, 通道数) 的数据块，超出容量时覆盖最旧的采样"""
+        k = len(rows)
+        if k == 0:
+            return
+        with self._lock:
+            kept = rows[-self.capacity:]
+            start = (self.total + k - len(kept)) % self.capacity
+            first = min(len(kept), self.capacity - start)
+            self.data[:, start:start + first] = kept[:first].T
+            if first < len(kept):
+                self.data[:, :len(kept) - first] = kept[first:].T
+            self.total += k
+
+    def read(self, start_row: int, max_rows: int | None = None):
+        """
+        复制从采样序号 start_row 开始的数据，返回 (实际起始序号, float64 数组 (通道数, 采样数))。
+        start_row 对应的采样已被覆盖时从仍保留的最旧采样开始。
+        """
+        with self._lock:
+            total = self.total
+            first_row = max(start_row, total - self.capacity, 0)
+            n = total - first_row
+            if max_rows is not None:
+                n = min(n, max_rows)
+            block = np.empty((self.n_channels, n), dtype=np.float64)
+            start = first_row % self.capacity
+            first = min(n, self.capacity - start)
+            block[:, :first] = self.data[:, start:start + first]
+            if first < n:
+                block[:, first:] = self.data[:, :n - first]
+        return first_row, block
+
+    def tail(self, n: int):
+        """最近 n 个采样，返回值同 read()"""
+        return self.read(max(self.total - n, 0))
+
+
+class StreamReader:
+    """
+    按与 daq_io.CsvTailReader 相同的方式读取数据流：每次 read_new() 返回上次读取之后新到达的采样（Acquisition，
+    列位置与CSV文件相同，AIN n 位于第 n 列）。读取落后超过环形缓冲区容量时，被覆盖的采样计入 lost_rows。
+    """
+
+    def __init__(self, ring: RingBuffer, columns=None, max_rows: int | None = None):
+        self.ring = ring
+        self.columns = columns
+        self.max_rows = max_rows
+        self.file_path = None
+        self.header = None
+        self.usecols = None
+        self.position = ring.total
+        self.lost_rows = 0
+
+    def read_new(self) -> Acquisition:
+        if self.header is None:
+            self.header = list(STREAM_HEADER)
+            columns = self.columns(self.header) if callable(self.columns) else self.columns
+            if columns is None:
+                columns = range(1, STREAM_CHANNELS + 1)
+            self.usecols = sorted({c for c in columns if 1 <= c <= STREAM_CHANNELS})
+
+        first_row, block = self.ring.read(self.position, self.max_rows)
+        self.lost_rows += first_row - self.position
+        self.position = first_row + block.shape[1]
+        return self._to_acquisition(first_row, block)
+
+    def read_tail(self, n: int) -> Acquisition:
+        """最近 n 个采样（不改变读取位置），只复制这 n 个采样"""
+        first_row, block = self.ring.tail(n)
+        return self._to_acquisition(first_row, block)
+
+    def _to_acquisition(self, first_row, block):
+        channels = {column: block[column - 1] for column in self.usecols or ()}
+        return Acquisition(self.file_path, channels, block.shape[1], len(STREAM_HEADER), first_row)
+
+
+class StreamIngestServer:
+    """
+    在后台线程中接收本地采集程序通过 TCP 或 UDP 发送的数据流，写入预分配的环形缓冲区。
+
+    TCP：同一时间接受一个连接，字节流中的采样可以跨越 recv 边界；UDP：每个数据报包含整数个采样，
+    不完整的尾部字节计入 malformed_bytes。port 为 0 时由系统分配端口（启动后见 address）。
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5555, protocol: str = 'tcp',
+                 sampling_freq: float = 87500.0, buffer_seconds: float = 60.0, recv_bytes: int = 1024 * 1024):
+        if protocol not in ('tcp', 'udp'):
+            raise ValueError(f"不支持的协议: {protocol}")
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.sampling_freq = sampling_freq
+        self.ring = RingBuffer(max(int(buffer_seconds * sampling_freq), 1))
+        self.recv_bytes = recv_bytes - recv_bytes % FRAME_BYTES
+        self.frames_received = 0
+        self.malformed_bytes = 0
+        self.address = None
+        self.error = None
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        sock_type = socket.SOCK_STREAM if self.protocol == 'tcp' else socket.SOCK_DGRAM
+        self._sock = socket.socket(socket.AF_INET, sock_type)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # 加大内核接收缓冲区，避免界面卡顿时 UDP 数据报被丢弃
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self._sock.bind((self.host, self.port))
+        self._sock.settimeout(0.2)
+        if self.protocol == 'tcp':
+            self._sock.listen(1)
+        self.address = self._sock.getsockname()
+        self._stop.clear()
+        target = self._serve_tcp if self.protocol == 'tcp' else self._serve_udp
+        self._thread = threading.Thread(target=target, name='daq-stream-ingest', daemon=True)
+        self._thread.start()
+        return self.address
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def open_reader(self, columns=None, max_rows: int | None = None) -> StreamReader:
+        """从当前位置开始读取新到达的采样"""
+        return StreamReader(self.ring, columns, max_rows)
+
+    def _write_frames(self, payload):
+        rows = np.frombuffer(payload, dtype=FRAME_DTYPE).reshape(-1, STREAM_CHANNELS)
+        self.ring.write(rows)
+        self.frames_received += len(rows)
+
+    def _serve_tcp(self):
+        buffer = bytearray(self.recv_bytes + FRAME_BYTES)
+        view = memoryview(buffer)
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    continue
+                with conn:
+                    conn.settimeout(0.2)
+                    pending = 0
+                    while not self._stop.is_set():
+                        try:
+                            n = conn.recv_into(view[pending:pending + self.recv_bytes])
+                        except socket.timeout:
+                            continue
+                        if n == 0:
+                            break
+                        filled = pending + n
+                        complete = filled - filled % FRAME_BYTES
+                        if complete:
+                            self._write_frames(buffer[:complete])
+                        # 跨越 recv 边界的不完整采样移到缓冲区开头
+                        pending = filled - complete
+                        buffer[:pending] = buffer[complete:filled]
+        except OSError as e:
+            if not self._stop.is_set():
+                self.error = e
+
+    def _serve_udp(self):
+        buffer = bytearray(65536)
+        try:
+            while not self._stop.is_set():
+                try:
+                    n, _ = self._sock.recvfrom_into(buffer)
+                except socket.timeout:
+                    continue
+                complete = n - n % FRAME_BYTES
+                self.malformed_bytes += n - complete
+                if complete:
+                    self._write_frames(buffer[:complete])
+        except OSError as e:
+            if not self._stop.is_set():
+                self.error = e
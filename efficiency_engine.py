@@ -0,0 +1,390 @@
+import numpy as np
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from functools import cached_property
+from daq_io import ChannelMap, read_acquisition, resolve_channel_columns
+from stage_trace import stage
+from efficiency_kernels import (channel_moments, moments_to_stats, fused_side_integrals, valid_sample_index,
+                                FUSED_VER_COUNT, FUSED_VER_ENERGY, FUSED_VER_POWER_SUM, FUSED_VER_POWER_MAX,
+                                FUSED_THEO_COUNT, FUSED_THEO_OUTPUT_ENERGY, FUSED_THEO_INPUT_ENERGY)
+
+
+CHANNEL_NAMES = ["AIN1", "AIN2", "AIN3", "AIN4", "AIN5", "AIN6", "AIN7", "AIN8"]
+
+
+def _empty_channel_stats():
+    return {"max": np.nan, "min": np.nan, "avg": np.nan, "std": np.nan, "rms": np.nan}
+
+
+def _stats_columns(acquisition):
+    return [i+1 for i in range(len(CHANNEL_NAMES)) if i+1 in acquisition]
+
+
+def _stats_from_moments(columns, moments):
+    stats = {channel: _empty_channel_stats() for channel in CHANNEL_NAMES}
+    if moments is not None:
+        for column, channel_stats in zip(columns, moments_to_stats(moments)):
+            stats[CHANNEL_NAMES[column-1]] = channel_stats
+    return stats
+
+
+def _calculate_channel_stats(acquisition):
+    """对全部AIN通道组成的二维数据块一次性计算 max/min/avg/std/rms"""
+    columns = _stats_columns(acquisition)
+    if not columns or acquisition.empty:
+        return _stats_from_moments(columns, None)
+    block = np.stack([acquisition[column] for column in columns])
+    return _stats_from_moments(columns, channel_moments(block))
+
+
+VERIFICATION_TRACES = ("current",)
+THEORETICAL_TRACES = ("output_current", "input_current")
+
+
+class TraceData(Mapping):
+    """
+    剔除NaN后的逐点数据，按字典方式访问：plot_data["time"]、plot_data["current"] 等。
+
+    只保存电流（trace_dtype 为 np.float32 时以单精度保存）；时间轴由 start_row、采样率和有效样本位置
+    positions（没有缺口时为 None）在访问时生成，power/output_power/input_power 也在访问时由电流、r_load、drive_v 计算。
+    paths 不为 None 时数组保存在磁盘上的 .npy 文件中（见 trace_store.TraceStore），访问时以只读内存映射方式打开，
+    对象本身（以及 pickle 的结果）只包含文件路径。
+    """
+    __slots__ = ("_currents", "start_row", "_positions", "sampling_freq", "r_load", "drive_v", "paths")
+
+    _DERIVED = {"power": "current", "output_power": "output_current", "input_power": "input_current"}
+
+    def __init__(self, currents, start_row: int = 0, positions: np.ndarray | None = None,
+                 sampling_freq: float = 87500.0, r_load: float = 1.0, drive_v: float = 0.0, paths: dict | None = None):
+        self._currents = currents
+        self.start_row = start_row
+        self._positions = positions
+        self.sampling_freq = sampling_freq
+        self.r_load = r_load
+        self.drive_v = drive_v
+        self.paths = paths
+
+    @classmethod
+    def empty(cls, names):
+        return cls({name: np.array([]) for name in names})
+
+    @classmethod
+    def from_files(cls, paths: dict, start_row: int = 0, sampling_freq: float = 87500.0, r_load: float = 1.0,
+                   drive_v: float = 0.0):
+        """由 {电流名称或"positions": .npy文件路径} 创建保存在磁盘上的逐点数据"""
+        return cls(None, start_row, None, sampling_freq, r_load, drive_v, paths)
+
+    @property
+    def spilled(self):
+        return self.paths is not None
+
+    def _names(self):
+        if self.paths is None:
+            return list(self._currents)
+        return [name for name in self.paths if name != "positions"]
+
+    def _load(self, name):
+        if self.paths is None:
+            return self._currents[name]
+        return np.load(self.paths[name], mmap_mode="r")
+
+    @property
+    def currents(self):
+        return {name: self._load(name) for name in self._names()}
+
+    @property
+    def positions(self):
+        if self.paths is None:
+            return self._positions
+        return np.load(self.paths["positions"], mmap_mode="r") if "positions" in self.paths else None
+
+    def __len__(self):
+        names = self._names()
+        return 1 + len(names) + sum(source in names for source in self._DERIVED.values())
+
+    def __iter__(self):
+        names = self._names()
+        yield "time"
+        yield from names
+        yield from (name for name, source in self._DERIVED.items() if source in names)
+
+    def __getitem__(self, key):
+        if key == "time":
+            return self.time
+        names = self._names()
+        if key in names:
+            return self._load(key)
+        source = self._DERIVED.get(key)
+        if source in names:
+            return self._power(key, np.asarray(self._load(source), dtype=np.float64))
+        raise KeyError(key)
+
+    def _power(self, key, current):
+        if key == "input_power":
+            return self.drive_v * current
+        return current**2 * self.r_load
+
+    @property
+    def n_samples(self):
+        names = self._names()
+        return len(self._load(names[0])) if names else 0
+
+    @property
+    def time(self):
+        positions = np.arange(self.n_samples) if self.positions is None else self.positions
+        return (self.start_row + positions) * (1.0 / self.sampling_freq)
+
+    def iter_chunks(self, chunk_rows: int = 65536):
+        """按 chunk_rows 个样本分段返回与 dict(self) 相同键的字典，磁盘上的数据只读取当前段，内存占用与总样本数无关"""
+        names = self._names()
+        arrays = {name: self._load(name) for name in names}
+        positions = self.positions
+        for start in range(0, self.n_samples, chunk_rows):
+            stop = min(start + chunk_rows, self.n_samples)
+            index = np.arange(start, stop) if positions is None else np.asarray(positions[start:stop])
+            chunk = {"time": (self.start_row + index) * (1.0 / self.sampling_freq)}
+            for name in names:
+                chunk[name] = np.asarray(arrays[name][start:stop], dtype=np.float64)
+            for key, source in self._DERIVED.items():
+                if source in names:
+                    chunk[key] = self._power(key, chunk[source])
+            yield chunk
+
+    @property
+    def nbytes(self):
+        """内存中保存的数组占用的字节数（保存在磁盘上时为0）"""
+        if self.paths is not None:
+            return 0
+        stored = sum(array.nbytes for array in self._currents.values())
+        return stored + (0 if self._positions is None else self._positions.nbytes)
+
+
+class _ItemAccess:
+    """让结果对象兼容原来的字典访问方式：result["efficiency"]、result["stats"] = ...、result.get(...)、"key" in result"""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return list(self.__slots__)
+
+
+@dataclass(slots=True)
+class SideResult(_ItemAccess):
+    """单个数据文件中验证实验或理论实验部分的结果：efficiency、各通道统计 stats 和逐点数据 plot_data (TraceData)"""
+    efficiency: float = 0.0
+    stats: dict = field(default_factory=dict)
+    plot_data: TraceData = field(default_factory=lambda: TraceData.empty(VERIFICATION_TRACES))
+
+
+def _empty_side_results():
+    """单个数据文件的默认 (verification, theoretical) 结果（效率为0、绘图数据为空）"""
+    verification = SideResult(plot_data=TraceData.empty(VERIFICATION_TRACES))
+    theoretical = SideResult(plot_data=TraceData.empty(THEORETICAL_TRACES))
+    return verification, theoretical
+
+
+def _resolve_load_plan(file_path, channel_map, include_stats, include_theoretical):
+    """
+    按通道映射解析各角色的列位置，并给出需要解析的列：角色通道，以及需要统计时的全部AIN通道。
+    不计算理论实验时，理论通道视为不存在。
+    """
+    roles = ChannelMap.ROLES if include_theoretical else ('verification_output',)
+    channels, n_columns = resolve_channel_columns(file_path, channel_map, roles)
+    return _load_plan(channels, n_columns, include_stats, include_theoretical)
+
+
+def _load_plan(channels, n_columns, include_stats, include_theoretical):
+    if not include_theoretical:
+        channels["theoretical_output"] = None
+        channels["theoretical_input"] = None
+    columns = {column for column in channels.values() if column is not None}
+    if include_stats:
+        columns.update(range(1, min(n_columns, len(CHANNEL_NAMES) + 1)))
+    return channels, sorted(columns)
+
+
+class EfficiencyEngine:
+    """
+    单个数据文件的效率计算：数据只读取一次，各项结果在首次访问时才计算并缓存。
+
+    verification_integrals / theoretical_integrals 由 fused_side_integrals 一次遍历得到，不生成逐点的中间数组；
+    stats 与 verification_plot_data / theoretical_plot_data 只在访问时计算。只需要效率标量的调用方不会做多余的工作。
+    trace_dtype 为逐点电流的保存精度（np.float32 可减半内存）。
+    """
+
+    def __init__(self, acquisition, channels, reference_v: float, initial_v: float, r_load: float,
+                 power_input: float, drive_v: float = 0.0, sampling_freq: float = 87500.0, trace_dtype=np.float64):
+        self.acquisition = acquisition
+        self.channels = channels
+        self.reference_v = reference_v
+        self.initial_v = initial_v
+        self.r_load = r_load
+        self.power_input = power_input
+        self.drive_v = drive_v
+        self.sampling_freq = sampling_freq
+        self.time_once = 1.0 / sampling_freq
+        self.trace_dtype = trace_dtype
+
+    @classmethod
+    def from_file(cls, file_path: str, reference_v: float, initial_v: float, r_load: float, power_input: float,
+                  drive_v: float = 0.0, sampling_freq: float = 87500.0, points_to_process: int | None = None,
+                  channel_map=None, steady_state=None, include_stats: bool = False,
+                  include_theoretical: bool = False, trace_dtype=np.float64):
+        """
+        只读取计算所需的列：验证实验输出通道，include_theoretical 时加上理论实验通道，include_stats 时加上全部AIN通道。
+        steady_state 不为 None 时按验证实验输出通道截取稳态段。
+        """
+        channels, columns = _resolve_load_plan(file_path, channel_map, include_stats, include_theoretical)
+        with stage("parse", file_path):
+            acquisition = read_acquisition(file_path, columns=columns, points_to_process=points_to_process)
+        if steady_state is not None and not acquisition.empty:
+            with stage("steady_state", file_path):
+                acquisition = steady_state.trim(acquisition, channels["verification_output"], initial_v, sampling_freq)
+        return cls(acquisition, channels, reference_v, initial_v, r_load, power_input, drive_v, sampling_freq,
+                   trace_dtype)
+
+    @property
+    def empty(self):
+        return self.acquisition.empty
+
+    @property
+    def has_verification(self):
+        return self.channels["verification_output"] in self.acquisition
+
+    @property
+    def has_theoretical(self):
+        return self.channels["theoretical_output"] in self.acquisition and self.channels["theoretical_input"] in self.acquisition
+
+    @cached_property
+    def _integrals(self):
+        acquisition = self.acquisition
+        ver_v = acquisition[self.channels["verification_output"]] if self.has_verification else None
+        theo_output_v = theo_input_v = None
+        if self.has_theoretical:
+            theo_output_v = acquisition[self.channels["theoretical_output"]]
+            theo_input_v = acquisition[self.channels["theoretical_input"]]
+        # 融合核在同一遍历中完成电流转换与积分，计入 integrate 阶段
+        with stage("integrate", acquisition.file_path):
+            return fused_side_integrals(ver_v, theo_output_v, theo_input_v, self.initial_v, self.reference_v,
+                                        self.r_load, self.drive_v, self.time_once)
+
+    @cached_property
+    def verification_integrals(self):
+        """验证实验：有效样本数 count、output_energy (J)、duration (s)、avg_output_power、max_output_power (W)"""
+        state = self._integrals
+        count = int(state[FUSED_VER_COUNT])
+        return {
+            "count": count,
+            "output_energy": float(state[FUSED_VER_ENERGY]),
+            "duration": count * self.time_once,
+            "avg_output_power": float(state[FUSED_VER_POWER_SUM] / count) if count else np.nan,
+            "max_output_power": float(state[FUSED_VER_POWER_MAX]) if count else np.nan
+        }
+
+    @cached_property
+    def theoretical_integrals(self):
+        """理论实验：有效样本数 count、output_energy (∫I²R)、input_energy (∫VI)"""
+        state = self._integrals
+        return {
+            "count": int(state[FUSED_THEO_COUNT]),
+            "output_energy": float(state[FUSED_THEO_OUTPUT_ENERGY]),
+            "input_energy": float(state[FUSED_THEO_INPUT_ENERGY])
+        }
+
+    @property
+    def verification_efficiency(self):
+        """∫I²R / (P×t)；有效样本少于2个或输入能量不为正时为0"""
+        integrals = self.verification_integrals
+        input_energy = self.power_input * integrals["duration"]
+        if integrals["count"] < 2 or input_energy <= 0:
+            return 0.0
+        return integrals["output_energy"] / input_energy
+
+    @property
+    def theoretical_efficiency(self):
+        """∫I²R / ∫VI（未开方）；有效样本少于2个或输入能量不为正时为0"""
+        integrals = self.theoretical_integrals
+        if integrals["count"] < 2 or integrals["input_energy"] <= 0:
+            return 0.0
+        return integrals["output_energy"] / integrals["input_energy"]
+
+    @cached_property
+    def avg_output_current(self):
+        """验证实验输出电流的平均值（跳过NaN），没有有效样本时为NaN"""
+        if self.verification_integrals["count"] == 0:
+            return np.nan
+        return (float(np.nanmean(self.acquisition[self.channels["verification_output"]])) - self.initial_v) / self.reference_v
+
+    @cached_property
+    def stats(self):
+        """已读取的各AIN通道的 max/min/avg/std/rms"""
+        with stage("stats", self.acquisition.file_path):
+            return _calculate_channel_stats(self.acquisition)
+
+    def _traces(self, currents, valid):
+        with stage("plot", self.acquisition.file_path):
+            positions = valid_sample_index(valid)
+            if positions is not None:
+                currents = {name: current[valid] for name, current in currents.items()}
+            currents = {name: current.astype(self.trace_dtype, copy=False) for name, current in currents.items()}
+        return TraceData(currents, self.acquisition.start_row, positions, self.sampling_freq, self.r_load, self.drive_v)
+
+    @cached_property
+    def verification_plot_data(self):
+        """验证实验剔除NaN后的逐点数据（TraceData：time、current、power）"""
+        if not self.has_verification:
+            return TraceData.empty(VERIFICATION_TRACES)
+        with stage("convert", self.acquisition.file_path):
+            current = (self.acquisition[self.channels["verification_output"]] - self.initial_v) / self.reference_v
+            valid = ~np.isnan(current)
+        return self._traces({"current": current}, valid)
+
+    @cached_property
+    def theoretical_plot_data(self):
+        """理论实验剔除NaN后的逐点数据（TraceData：time、output_current、input_current、output_power、input_power）"""
+        if not self.has_theoretical:
+            return TraceData.empty(THEORETICAL_TRACES)
+        with stage("convert", self.acquisition.file_path):
+            output_current = (self.acquisition[self.channels["theoretical_output"]] - self.initial_v) / self.reference_v
+            input_current = (self.acquisition[self.channels["theoretical_input"]] - self.initial_v) / self.reference_v
+            valid = ~np.isnan(output_current) & ~np.isnan(input_current)
+        return self._traces({"output_current": output_current, "input_current": input_current}, valid)
+
+    def side_results(self, include_stats: bool = True, include_plot_data: bool = True):
+        """
+        返回 calculate_unified_efficiencies 中单个文件的 (verification, theoretical) 结果（理论效率未开方）。
+        有效样本少于2个的部分效率为0、绘图数据为空；include_plot_data=False 时不生成绘图数组。
+        """
+        verification, theoretical = _empty_side_results()
+
+        # 验证与理论两部分使用同一份通道统计结果
+        if include_stats:
+            verification.stats = self.stats
+            theoretical.stats = self.stats
+
+        if self.verification_integrals["count"] >= 2:
+            verification.efficiency = self.verification_efficiency
+            if include_plot_data:
+                verification.plot_data = self.verification_plot_data
+
+        if self.theoretical_integrals["count"] >= 2:
+            theoretical.efficiency = self.theoretical_efficiency
+            if include_plot_data:
+                theoretical.plot_data = self.theoretical_plot_data
+
+        return verification, theoretical
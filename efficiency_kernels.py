@@ -0,0 +1,394 @@
+import math
+import importlib.util
+import numpy as np
+
+from stage_trace import get_logger
+
+logger = get_logger(__name__)
+
+
+def channel_moments(block: np.ndarray, shift: np.ndarray | None = None):
+    """
+    对二维通道数据块 (通道数, 样本数) 一次性计算各通道的计数、和、平方和、最大值、最小值（跳过NaN）。
+
+    和与平方和基于平移后的数据 (x - shift) 计算以减小方差的舍入误差；shift 默认取每个通道的第一个样本。
+    分块累积时应对所有块使用同一个 shift，再用 merge_channel_moments 合并。
+    """
+    block = np.asarray(block, dtype=np.float64)
+    if block.ndim == 1:
+        block = block[np.newaxis, :]
+    n_channels = block.shape[0]
+    if shift is None:
+        shift = block[:, 0].copy() if block.shape[1] else np.zeros(n_channels)
+        shift[np.isnan(shift)] = 0.0
+
+    nan_mask = np.isnan(block)
+    centered = block - shift[:, np.newaxis]
+    centered[nan_mask] = 0.0
+    return {
+        "count": block.shape[1] - nan_mask.sum(axis=1),
+        "sum": centered.sum(axis=1),
+        "sumsq": np.einsum('ij,ij->i', centered, centered),
+        "max": np.fmax.reduce(block, axis=1) if block.shape[1] else np.full(n_channels, np.nan),
+        "min": np.fmin.reduce(block, axis=1) if block.shape[1] else np.full(n_channels, np.nan),
+        "shift": shift
+    }
+
+
+def merge_channel_moments(a, b):
+    """合并两个使用相同 shift 计算的 channel_moments 结果"""
+    if a is None:
+        return b
+    return {
+        "count": a["count"] + b["count"],
+        "sum": a["sum"] + b["sum"],
+        "sumsq": a["sumsq"] + b["sumsq"],
+        "max": np.fmax(a["max"], b["max"]),
+        "min": np.fmin(a["min"], b["min"]),
+        "shift": a["shift"]
+    }
+
+
+def moments_to_stats(moments):
+    """由 channel_moments 的结果得到每个通道的 max/min/avg/std/rms（std 为总体标准差），全为NaN的通道返回NaN"""
+    stats = []
+    for i in range(len(moments["count"])):
+        count = moments["count"][i]
+        if count == 0:
+            stats.append({"max": np.nan, "min": np.nan, "avg": np.nan, "std": np.nan, "rms": np.nan})
+            continue
+        shift = moments["shift"][i]
+        mean_centered = moments["sum"][i] / count
+        var = max(moments["sumsq"][i] / count - mean_centered**2, 0.0)
+        mean = shift + mean_centered
+        mean_square = var + mean**2
+        stats.append({
+            "max": moments["max"][i],
+            "min": moments["min"][i],
+            "avg": mean,
+            "std": np.sqrt(var),
+            "rms": np.sqrt(mean_square)
+        })
+    return stats
+
+
+def uniform_trapz(y: np.ndarray, dx: float, index: np.ndarray | None = None) -> float:
+    """
+    均匀采样信号的梯形积分，只使用采样间隔 dx，不需要时间数组。
+
+    y: 有效样本（已剔除NaN）。
+    index: y 中每个样本在原始序列中的位置（整数，递增）；None 表示样本连续、没有缺口。
+    剔除NaN后留下的缺口用两侧的有效样本连成一个梯形跨过（与对剔除后的时间轴做 np.trapz 相同）。
+    """
+    n = len(y)
+    if n < 2:
+        return 0.0
+    if index is None:
+        return float(dx * (np.sum(y) - 0.5 * (y[0] + y[-1])))
+    return float(0.5 * dx * np.dot(np.diff(index), y[1:] + y[:-1]))
+
+
+def valid_sample_index(valid: np.ndarray):
+    """由有效样本掩码得到 uniform_trapz 所需的 index 参数；全部有效时返回 None"""
+    return None if valid.all() else np.flatnonzero(valid)
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, n_buckets: int, x_range=None):
+    """
+    绘图用的最小/最大值抽稀：把 x_range 内的样本按序号等分为 n_buckets 个桶，每桶只保留最小值和最大值两个点，
+    峰值不会因抽稀而丢失。x 需单调递增；x_range 为 None 时使用全部样本。
+    区间两侧各多保留一个样本，使曲线延伸到显示区域之外。点数不超过 2*n_buckets 时不抽稀。
+    返回 (x, y)。
+    """
+    start, stop = 0, len(x)
+    if x_range is not None:
+        start = max(int(np.searchsorted(x, x_range[0], side='left')) - 1, 0)
+        stop = min(int(np.searchsorted(x, x_range[1], side='right')) + 1, len(x))
+    n = stop - start
+    if n <= 2 * n_buckets:
+        return x[start:stop], y[start:stop]
+
+    segment = y[start:stop]
+    bucket_size = -(-n // n_buckets)
+    n_full = (n // bucket_size) * bucket_size
+    blocks = segment[:n_full].reshape(-1, bucket_size)
+    offsets = np.arange(blocks.shape[0]) * bucket_size
+    picks = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1), [0, n - 1]]
+    if n_full < n:
+        tail = segment[n_full:]
+        picks.append([n_full + tail.argmin(), n_full + tail.argmax()])
+    index = np.unique(np.concatenate(picks)) + start
+    return x[index], y[index]
+
+
+def trapz_weights(n: int, dx: float, index: np.ndarray | None = None) -> np.ndarray:
+    """
+    梯形积分的逐样本权重：np.dot(trapz_weights(...), y) 等于 uniform_trapz(y, dx, index)。
+    同一组样本需要对多个被积函数积分时，可先求权重再做加权求和。
+    """
+    weights = np.zeros(n)
+    if n < 2:
+        return weights
+    if index is None:
+        weights.fill(dx)
+        weights[0] = weights[-1] = 0.5 * dx
+        return weights
+    half_steps = 0.5 * dx * np.diff(index)
+    weights[:-1] += half_steps
+    weights[1:] += half_steps
+    return weights
+
+
+def window_starts(n: int, window: int, hop: int) -> np.ndarray:
+    """长度为 n 的序列上，长度 window、步长 hop 的各滑动窗口起点"""
+    if window < 1 or hop < 1:
+        raise ValueError("窗口长度和步长必须为正整数")
+    if n < window:
+        return np.zeros(0, dtype=np.int64)
+    return np.arange(0, n - window + 1, hop)
+
+
+def windowed_trapz(y: np.ndarray, dx: float, window: int, hop: int, index: np.ndarray | None = None) -> np.ndarray:
+    """
+    滑动窗口梯形积分：每个窗口包含 y 中连续的 window 个有效样本，窗口起点相隔 hop 个样本。
+    基于相邻样本梯形面积的前缀和，总耗时 O(n)，与窗口长度无关。index 的含义与缺口处理同 uniform_trapz。
+    """
+    steps = 1.0 if index is None else np.diff(index)
+    prefix = np.concatenate(([0.0], np.cumsum(0.5 * dx * steps * (y[1:] + y[:-1]))))
+    starts = window_starts(len(y), window, hop)
+    return prefix[starts + window - 1] - prefix[starts]
+
+
+def windowed_mean(y: np.ndarray, window: int, hop: int) -> np.ndarray:
+    """与 windowed_trapz 相同窗口划分下各窗口的平均值（前缀和实现）"""
+    prefix = np.concatenate(([0.0], np.cumsum(y)))
+    starts = window_starts(len(y), window, hop)
+    return (prefix[starts + window] - prefix[starts]) / window
+
+
+def detect_steady_state(y: np.ndarray, window: int, rel_tol: float = 0.05):
+    """
+    在信号 y 上寻找稳态段，耗时 O(n)。
+
+    用前缀和求长度 window 的滑动平均（跳过NaN），与全部滑动平均的中位数（稳态水平）相对偏差不超过 rel_tol 的窗口视为稳定，
+    返回最长的一串连续稳定窗口覆盖的样本区间 (start, stop)。信号短于窗口时返回 (0, len(y))，没有稳定窗口时返回 None。
+    """
+    n = len(y)
+    if n <= window:
+        return 0, n
+    valid = ~np.isnan(y)
+    prefix_sum = np.concatenate(([0.0], np.cumsum(np.where(valid, y, 0.0))))
+    prefix_count = np.concatenate(([0], np.cumsum(valid)))
+    counts = prefix_count[window:] - prefix_count[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (prefix_sum[window:] - prefix_sum[:-window]) / counts
+    if not np.any(counts > 0):
+        return None
+    level = np.median(means[counts > 0])
+    stable = (counts > 0) & (np.abs(means - level) <= rel_tol * abs(level))
+    if not np.any(stable):
+        return None
+
+    edges = np.diff(np.concatenate(([0], stable.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_stops = np.flatnonzero(edges == -1)
+    longest = np.argmax(run_stops - run_starts)
+    return int(run_starts[longest]), int(run_stops[longest] - 1 + window)
+
+
+# fused_side_integrals 的累积状态（float64 数组）各元素的含义
+(FUSED_ROWS,
+ FUSED_VER_COUNT, FUSED_VER_ENERGY, FUSED_VER_LAST_POS, FUSED_VER_LAST_POWER, FUSED_VER_POWER_SUM, FUSED_VER_POWER_MAX,
+ FUSED_THEO_COUNT, FUSED_THEO_OUTPUT_ENERGY, FUSED_THEO_INPUT_ENERGY, FUSED_THEO_LAST_POS,
+ FUSED_THEO_LAST_OUTPUT, FUSED_THEO_LAST_INPUT) = range(13)
+FUSED_STATE_SIZE = 13
+
+
+def new_fused_state():
+    """fused_side_integrals 的初始累积状态"""
+    return np.zeros(FUSED_STATE_SIZE)
+
+
+def _fused_side_loop(ver_v, theo_output_v, theo_input_v, initial_v, reference_v, r_load, drive_v, dx, state):
+    # 逐样本完成跳过NaN、电压转电流、计算功率和梯形累加，不产生中间数组（供 Numba 编译）
+    n = max(len(ver_v), len(theo_output_v))
+    has_ver = len(ver_v) == n
+    has_theo = len(theo_output_v) == n and len(theo_input_v) == n
+    half_dx = 0.5 * dx
+    rows = state[FUSED_ROWS]
+    for k in range(n):
+        pos = rows + k
+        if has_ver:
+            v = ver_v[k]
+            if not math.isnan(v):
+                current = (v - initial_v) / reference_v
+                power = current * current * r_load
+                if state[FUSED_VER_COUNT] > 0:
+                    step = pos - state[FUSED_VER_LAST_POS]
+                    state[FUSED_VER_ENERGY] += half_dx * step * (state[FUSED_VER_LAST_POWER] + power)
+                    if power > state[FUSED_VER_POWER_MAX]:
+                        state[FUSED_VER_POWER_MAX] = power
+                else:
+                    state[FUSED_VER_POWER_MAX] = power
+                state[FUSED_VER_COUNT] += 1
+                state[FUSED_VER_LAST_POS] = pos
+                state[FUSED_VER_LAST_POWER] = power
+                state[FUSED_VER_POWER_SUM] += power
+        if has_theo:
+            v_out = theo_output_v[k]
+            v_in = theo_input_v[k]
+            if not (math.isnan(v_out) or math.isnan(v_in)):
+                current = (v_out - initial_v) / reference_v
+                output_power = current * current * r_load
+                input_power = drive_v * (v_in - initial_v) / reference_v
+                if state[FUSED_THEO_COUNT] > 0:
+                    weight = half_dx * (pos - state[FUSED_THEO_LAST_POS])
+                    state[FUSED_THEO_OUTPUT_ENERGY] += weight * (state[FUSED_THEO_LAST_OUTPUT] + output_power)
+                    state[FUSED_THEO_INPUT_ENERGY] += weight * (state[FUSED_THEO_LAST_INPUT] + input_power)
+                state[FUSED_THEO_COUNT] += 1
+                state[FUSED_THEO_LAST_POS] = pos
+                state[FUSED_THEO_LAST_OUTPUT] = output_power
+                state[FUSED_THEO_LAST_INPUT] = input_power
+    state[FUSED_ROWS] = rows + n
+    return state
+
+
+def _trapz_with_carry(state, count, last_pos, last_values, dx, valid, first_pos, *values):
+    # 对一块有效样本做梯形积分（缺口处理同 uniform_trapz），并补上与上一块最后一个有效样本 state[last_pos] 之间的梯形
+    index = valid_sample_index(valid)
+    integrals = [uniform_trapz(v, dx, index) for v in values]
+    if state[count] > 0:
+        step = first_pos - state[last_pos]
+        integrals = [total + 0.5 * dx * step * (state[last] + v[0])
+                     for total, last, v in zip(integrals, last_values, values)]
+    return integrals
+
+
+def _first_last_valid(valid, n_valid):
+    # 第一个和最后一个有效样本的位置
+    if n_valid == len(valid):
+        return 0, n_valid - 1
+    return int(np.argmax(valid)), len(valid) - 1 - int(np.argmax(valid[::-1]))
+
+
+def _fused_side_numpy(ver_v, theo_output_v, theo_input_v, initial_v, reference_v, r_load, drive_v, dx, state):
+    # 未安装 Numba 时的等价实现（按块向量化）
+    n = max(len(ver_v), len(theo_output_v))
+    rows = state[FUSED_ROWS]
+    if len(ver_v) == n:
+        output_i = (ver_v - initial_v) / reference_v
+        valid = ~np.isnan(output_i)
+        n_valid = int(np.count_nonzero(valid))
+        if n_valid:
+            first, last = _first_last_valid(valid, n_valid)
+            power = output_i[valid]**2 * r_load
+            (energy,) = _trapz_with_carry(state, FUSED_VER_COUNT, FUSED_VER_LAST_POS, [FUSED_VER_LAST_POWER], dx,
+                                          valid, rows + first, power)
+            block_max = power.max()
+            state[FUSED_VER_ENERGY] += energy
+            state[FUSED_VER_POWER_MAX] = block_max if state[FUSED_VER_COUNT] == 0 else max(state[FUSED_VER_POWER_MAX], block_max)
+            state[FUSED_VER_POWER_SUM] += power.sum()
+            state[FUSED_VER_COUNT] += n_valid
+            state[FUSED_VER_LAST_POS] = rows + last
+            state[FUSED_VER_LAST_POWER] = power[-1]
+    if len(theo_output_v) == n and len(theo_input_v) == n:
+        output_i = (theo_output_v - initial_v) / reference_v
+        input_i = (theo_input_v - initial_v) / reference_v
+        valid = ~np.isnan(output_i) & ~np.isnan(input_i)
+        n_valid = int(np.count_nonzero(valid))
+        if n_valid:
+            first, last = _first_last_valid(valid, n_valid)
+            output_power = output_i[valid]**2 * r_load
+            input_power = drive_v * input_i[valid]
+            output_energy, input_energy = _trapz_with_carry(
+                state, FUSED_THEO_COUNT, FUSED_THEO_LAST_POS, [FUSED_THEO_LAST_OUTPUT, FUSED_THEO_LAST_INPUT], dx,
+                valid, rows + first, output_power, input_power)
+            state[FUSED_THEO_OUTPUT_ENERGY] += output_energy
+            state[FUSED_THEO_INPUT_ENERGY] += input_energy
+            state[FUSED_THEO_COUNT] += n_valid
+            state[FUSED_THEO_LAST_POS] = rows + last
+            state[FUSED_THEO_LAST_OUTPUT] = output_power[-1]
+            state[FUSED_THEO_LAST_INPUT] = input_power[-1]
+    state[FUSED_ROWS] = rows + n
+    return state
+
+
+# numba 的导入约需 0.2 s，推迟到第一次调用 fused_side_integrals 时
+HAS_NUMBA = importlib.util.find_spec("numba") is not None
+_fused_side_kernel = None
+
+
+def _get_fused_side_kernel():
+    global _fused_side_kernel
+    if _fused_side_kernel is None:
+        kernel = _fused_side_numpy
+        if HAS_NUMBA:
+            try:
+                import numba
+                kernel = numba.njit(cache=True, nogil=True)(_fused_side_loop)
+            except ImportError as e:
+                logger.warning("无法导入 numba，使用 NumPy 实现: %s", e)
+        _fused_side_kernel = kernel
+    return _fused_side_kernel
+
+
+_EMPTY = np.zeros(0)
+
+
+def fused_side_integrals(ver_v=None, theo_output_v=None, theo_input_v=None, initial_v: float = 0.0,
+                         reference_v: float = 1.0, r_load: float = 1.0, drive_v: float = 0.0, dx: float = 1.0,
+                         state: np.ndarray | None = None) -> np.ndarray:
+    """
+    一次遍历同时计算验证实验与理论实验的能量积分（跳过NaN、电压转电流、功率、梯形积分），结果累积在 state 中。
+
+    ver_v: 验证实验输出通道电压；theo_output_v/theo_input_v: 理论实验输出/输入通道电压，不需要的通道传 None。
+    三者长度相同（同一段采样）。分块调用时传入上一次返回的 state，梯形积分在块边界处衔接，结果与整体计算相同；
+    缺口处理与 uniform_trapz 相同。各量在 state 中的位置见 FUSED_* 常量。
+    安装了 Numba 时使用编译后的单循环实现，否则使用等价的 NumPy 实现（两者只有浮点求和顺序上的差别）。
+    """
+    if state is None:
+        state = new_fused_state()
+    ver_v = _EMPTY if ver_v is None else np.asarray(ver_v, dtype=np.float64)
+    theo_output_v = _EMPTY if theo_output_v is None else np.asarray(theo_output_v, dtype=np.float64)
+    theo_input_v = _EMPTY if theo_input_v is None else np.asarray(theo_input_v, dtype=np.float64)
+    return _get_fused_side_kernel()(ver_v, theo_output_v, theo_input_v, float(initial_v), float(reference_v),
+                              float(r_load), float(drive_v), float(dx), state)
+
+
+class SteadyStateDetector:
+    """
+    稳态段检测参数：window_seconds 为滑动平均窗口长度，rel_tol 为相对稳态水平的允许偏差。
+    在输出电流的平方（与输出功率成正比）上检测，交流输出也适用。
+    """
+
+    def __init__(self, window_seconds: float = 0.02, rel_tol: float = 0.05):
+        self.window_seconds = window_seconds
+        self.rel_tol = rel_tol
+
+    def find_segment(self, output_current: np.ndarray, sampling_freq: float):
+        """返回稳态段的样本区间 (start, stop)，检测不到稳态时返回 None（电流的比例系数不影响结果）"""
+        window = max(int(round(self.window_seconds * sampling_freq)), 1)
+        return detect_steady_state(output_current**2, window, self.rel_tol)
+
+    def trim(self, acquisition, output_column, initial_v: float, sampling_freq: float):
+        """
+        按输出通道截取采集数据（daq_io.Acquisition）的稳态段，返回不复制数据的视图。
+        缺少输出通道或检测不到稳态时返回原数据。
+        """
+        if acquisition.empty or output_column not in acquisition:
+            return acquisition
+        segment = self.find_segment(acquisition[output_column] - initial_v, sampling_freq)
+        if segment is None:
+            logger.warning("未检测到稳态段，使用全部数据")
+            return acquisition
+        return acquisition.slice(*segment)
+
+    def to_dict(self):
+        return {'window_seconds': self.window_seconds, 'rel_tol': self.rel_tol}
+
+    @classmethod
+    def from_dict(cls, data):
+        return None if data is None else cls(**data)
+
+    def __repr__(self):
+        return f"SteadyStateDetector(window_seconds={self.window_seconds!r}, rel_tol={self.rel_tol!r})"
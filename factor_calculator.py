@@ -1,6 +1,11 @@
-import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
+from daq_io import ChannelMap
+from efficiency_kernels import SteadyStateDetector
+from efficiency_engine import EfficiencyEngine, TraceData, VERIFICATION_TRACES
+from stage_trace import get_logger
+
+logger = get_logger(__name__)
 
 def calculate_single_efficiency(csv_file_path: str,
                               reference_v: float,
@@ -8,51 +13,38 @@ def calculate_single_efficiency(csv_file_path: str,
                               r_load: float,
                               power_input: float,
                               sampling_freq: float = 87500.0,
-                              points_to_process: Optional[int] = None) -> Dict:
+                              points_to_process: Optional[int] = None,
+                              channel_map: Optional[ChannelMap] = None,
+                              steady_state: Optional[SteadyStateDetector] = None,
+                              include_plot_data: bool = True) -> Dict:
+    """
+    只读取验证实验输出通道计算效率。include_plot_data=False 时不生成逐点的绘图数组（plot_data 为空）。
+    """
     try:
-        data_df = pd.read_csv(csv_file_path, header=None, skiprows=1)
-        
-        if points_to_process is not None and points_to_process > 0:
-            data_df = data_df.head(points_to_process)
+        engine = EfficiencyEngine.from_file(csv_file_path, reference_v, initial_v, r_load, power_input,
+                                            sampling_freq=sampling_freq, points_to_process=points_to_process,
+                                            channel_map=channel_map, steady_state=steady_state)
         
-        if data_df.empty or data_df.shape[1] < 3:
+        if engine.empty or not engine.has_verification:
             raise ValueError("数据文件为空或列数不足")
         
-        time_once = 1.0 / sampling_freq
-        time_array = np.arange(len(data_df)) * time_once
-        
-        output_v = pd.to_numeric(data_df.iloc[:, 2], errors='coerce').to_numpy()
-        output_i = (output_v - initial_v) / reference_v
-        
-        valid_idx = ~np.isnan(output_i)
-        if not np.any(valid_idx):
+        integrals = engine.verification_integrals
+        if integrals["count"] == 0:
             raise ValueError("没有有效的电流数据")
         
-        output_i_cleaned = output_i[valid_idx]
-        time_cleaned = time_array[valid_idx]
-        
-        output_power = output_i_cleaned**2 * r_load
-        
-        output_energy = np.trapz(output_power, x=time_cleaned)
-        input_energy = power_input * (len(time_cleaned) * time_once)
-        
-        efficiency = output_energy / input_energy if input_energy > 0 else 0.0
+        plot_data = engine.verification_plot_data if include_plot_data else TraceData.empty(VERIFICATION_TRACES)
         
         return {
-            "efficiency": efficiency,
-            "avg_output_power": np.mean(output_power),
-            "max_output_power": np.max(output_power),
-            "avg_output_current": np.mean(output_i_cleaned),
-            "duration": len(time_cleaned) * time_once,
-            "plot_data": {
-                "time": time_cleaned,
-                "current": output_i_cleaned,
-                "power": output_power
-            }
+            "efficiency": engine.verification_efficiency,
+            "avg_output_power": integrals["avg_output_power"],
+            "max_output_power": integrals["max_output_power"],
+            "avg_output_current": engine.avg_output_current,
+            "duration": integrals["duration"],
+            "plot_data": plot_data
         }
     
     except Exception as e:
-        print(f"计算效率时出错: {e}")
+        logger.error("计算效率时出错: %s", e)
         return None
 
 def calculate_factor_experiment(experiment_data: List[Dict]) -> Dict:
@@ -73,7 +65,7 @@ def calculate_factor_experiment(experiment_data: List[Dict]) -> Dict:
         
         result = calculate_single_efficiency(
             csv_file_path=file_path,
-            **calc_params
+            **{"include_plot_data": False, **calc_params}
         )
         
         if result:
@@ -106,12 +98,12 @@ def compare_dual_motor_efficiencies(zheng_file: str, fan_file: str,
                                    sampling_freq: float = 87500.0) -> float:
     zheng_result = calculate_single_efficiency(
         zheng_file, reference_v, initial_v, r_load, 
-        power_input, sampling_freq
+        power_input, sampling_freq, include_plot_data=False
     )
     
     fan_result = calculate_single_efficiency(
         fan_file, reference_v, initial_v, r_load,
-        power_input, sampling_freq
+        power_input, sampling_freq, include_plot_data=False
     )
     
     if zheng_result and fan_result:
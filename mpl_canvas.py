@@ -0,0 +1,76 @@
+"""
+界面中的 matplotlib 画布。单独成模块，界面在第一次显示含图表的标签页时才导入（matplotlib 的导入约需 0.5 s）。
+"""
+import matplotlib
+import numpy as np
+from PyQt6.QtWidgets import QSizePolicy
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from efficiency_kernels import minmax_decimate
+
+matplotlib.rcParams['font.sans-serif'] = ['SimHei']
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+
+class MatplotlibCanvas(FigureCanvas):
+    # 每条曲线按最小/最大值抽稀为该数量的桶，最多绘制约 2*DECIMATION_BUCKETS 个点
+    DECIMATION_BUCKETS = 2000
+ 
+    def __init__(self, parent=None, width=5, height=4, dpi=100):
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = self.fig.add_subplot(111)
+        super().__init__(self.fig)
+        self.setParent(parent)
+        FigureCanvas.setSizePolicy(self, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        FigureCanvas.updateGeometry(self)
+        self._traces = []
+
+    def _clear_axes(self):
+        # cla() 会清除坐标轴上的回调，需要重新连接
+        self.axes.cla()
+        self._traces = []
+        self.axes.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+    def _plot_trace(self, x_data, y_data, **kwargs):
+        """绘制抽稀后的曲线，保留全分辨率数据，缩放/平移后按新的显示范围重新抽稀"""
+        x_data = np.asarray(x_data)
+        y_data = np.asarray(y_data)
+        if len(x_data) > 2 * self.DECIMATION_BUCKETS and np.all(np.diff(x_data) >= 0):
+            line, = self.axes.plot(*minmax_decimate(x_data, y_data, self.DECIMATION_BUCKETS), **kwargs)
+            self._traces.append((line, x_data, y_data))
+        else:
+            self.axes.plot(x_data, y_data, **kwargs)
+
+    def _on_xlim_changed(self, axes):
+        if not self._traces:
+            return
+        x_range = axes.get_xlim()
+        for line, x_data, y_data in self._traces:
+            line.set_data(*minmax_decimate(x_data, y_data, self.DECIMATION_BUCKETS, x_range))
+        self.draw_idle()
+
+    def plot(self, x_data, y_data, title="", x_label="", y_label="", legend_label="", color=None):
+        self._clear_axes()
+        if x_data is not None and y_data is not None and len(x_data) > 0 and len(y_data) > 0:
+            self._plot_trace(x_data, y_data, label=legend_label, color=color)
+            if legend_label:
+                self.axes.legend()
+        self.axes.set_title(title)
+        self.axes.set_xlabel(x_label)
+        self.axes.set_ylabel(y_label)
+        self.axes.grid(True)
+        self.draw()
+
+    def plot_comparison(self, datasets, title="", x_label="", y_label=""):
+    
+        self._clear_axes()
+        colors = ['blue', 'red', 'green', 'orange']
+        for i, (x_data, y_data, label) in enumerate(datasets):
+            if x_data is not None and y_data is not None and len(x_data) > 0:
+                self._plot_trace(x_data, y_data, label=label, color=colors[i % len(colors)], alpha=0.7)
+        self.axes.set_title(title)
+        self.axes.set_xlabel(x_label)
+        self.axes.set_ylabel(y_label)
+        self.axes.legend()
+        self.axes.grid(True)
+        self.draw()
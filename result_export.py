@@ -0,0 +1,189 @@
+"""
+表格数据的流式写出，格式为 CSV、Parquet（需要安装 pyarrow）或 Excel（openpyxl 的 write-only 模式）：
+
+    with open_table_writer('结果.parquet') as writer:
+        summary = writer.table('实验结果对比', ['实验组', '效率'])
+        summary.append({'实验组': 1, '效率': 0.41})          # 逐行，攒满 chunk_rows 行写出一次
+        traces = writer.table('逐点数据', ['时间(s)', '电流(A)'])
+        traces.write({'时间(s)': t, '电流(A)': i})           # 按列的一段数据（数组），直接写出
+    print(writer.paths)
+
+写出的数据保持数值类型，内存占用只与 chunk_rows 有关，与总行数无关。CSV 和 Parquet 每个表一个文件：
+第一个表写入给定路径，之后的表写入同目录下的 “<文件名>_<表名>.<扩展名>”；Excel 每个表一个工作表，
+超过工作表行数上限时续写到 “<表名>_2”、“<表名>_3” 等工作表中。
+"""
+import os
+import numpy as np
+
+EXPORT_FORMATS = ("csv", "parquet", "xlsx")
+CHUNK_ROWS = 65536
+
+
+def export_format(path: str, fmt: str | None = None) -> str:
+    """由 fmt 或文件扩展名确定导出格式"""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt or path}（可选 {', '.join(EXPORT_FORMATS)}）")
+    return fmt
+
+
+class _Table:
+    """一个表：append() 逐行缓存，write() 直接写出按列的一段数据"""
+
+    def __init__(self, columns, chunk_rows):
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.n_rows = 0
+        self._pending = []
+
+    def append(self, row: dict):
+        self._pending.append(row)
+        if len(self._pending) >= self.chunk_rows:
+            self.flush()
+
+    def write(self, chunk: dict):
+        self.flush()
+        n = len(chunk[self.columns[0]])
+        if n:
+            self._write(chunk, n)
+            self.n_rows += n
+
+    def flush(self):
+        if self._pending:
+            rows, self._pending = self._pending, []
+            chunk = {column: [row.get(column, np.nan) for row in rows] for column in self.columns}
+            self._write(chunk, len(rows))
+            self.n_rows += len(rows)
+
+    def close(self):
+        self.flush()
+
+    def _write(self, chunk, n):
+        raise NotImplementedError
+
+
+class _CsvTable(_Table):
+    def __init__(self, path, columns, chunk_rows):
+        super().__init__(columns, chunk_rows)
+        # utf-8-sig：Excel 打开时能正确识别中文表头
+        self._file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self._file.write(','.join(self.columns) + '\n')
+
+    def _write(self, chunk, n):
+        import pandas as pd
+        pd.DataFrame(chunk, columns=self.columns).to_csv(self._file, header=False, index=False, lineterminator='\n')
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class _ParquetTable(_Table):
+    def __init__(self, path, columns, chunk_rows):
+        super().__init__(columns, chunk_rows)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError(f"导出 Parquet 文件需要安装 pyarrow (pip install pyarrow): {e}") from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._path = path
+        self._writer = None
+
+    def _write(self, chunk, n):
+        data = {column: chunk[column] for column in self.columns}
+        if self._writer is None:
+            table = self._pa.table(data)
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        else:
+            table = self._pa.table(data, schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        super().close()
+        if self._writer is None:
+            # 空表：只写出表头（各列按浮点数类型）
+            self._pq.write_table(self._pa.table({column: self._pa.array([], self._pa.float64())
+                                                 for column in self.columns}), self._path)
+        else:
+            self._writer.close()
+
+
+class _XlsxTable(_Table):
+    MAX_ROWS = 1_048_576
+
+    def __init__(self, workbook, name, columns, chunk_rows):
+        super().__init__(columns, chunk_rows)
+        self._workbook = workbook
+        self._name = name
+        self._sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self._sheets += 1
+        title = self._name if self._sheets == 1 else f"{self._name}_{self._sheets}"
+        self._sheet = self._workbook.create_sheet(title[:31])
+        self._sheet.append(self.columns)
+        self._sheet_rows = 1
+
+    def _write(self, chunk, n):
+        values = [np.asarray(chunk[column]).tolist() for column in self.columns]
+        for row in zip(*values):
+            if self._sheet_rows >= self.MAX_ROWS:
+                self._new_sheet()
+            # NaN 在 Excel 中写为空单元格
+            self._sheet.append([None if value != value else value for value in row])
+            self._sheet_rows += 1
+
+
+class TableWriter:
+    """一个导出目标（见模块说明），用 open_table_writer() 创建；paths 为已写入的文件"""
+
+    def __init__(self, path: str, fmt: str | None = None, chunk_rows: int = CHUNK_ROWS):
+        self.path = path
+        self.format = export_format(path, fmt)
+        self.chunk_rows = chunk_rows
+        self.paths = []
+        self._tables = []
+        self._workbook = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.format == "xlsx":
+            import openpyxl
+            self._workbook = openpyxl.Workbook(write_only=True)
+            self.paths.append(path)
+
+    def table(self, name: str, columns) -> _Table:
+        if self.format == "xlsx":
+            table = _XlsxTable(self._workbook, name, columns, self.chunk_rows)
+        else:
+            if self._tables:
+                stem, ext = os.path.splitext(self.path)
+                path = f"{stem}_{name}{ext}"
+            else:
+                path = self.path
+            table = (_CsvTable if self.format == "csv" else _ParquetTable)(path, columns, self.chunk_rows)
+            self.paths.append(path)
+        self._tables.append(table)
+        return table
+
+    def close(self):
+        for table in self._tables:
+            table.close()
+        self._tables = []
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_table_writer(path: str, fmt: str | None = None, chunk_rows: int = CHUNK_ROWS) -> TableWriter:
+    """fmt 为 None 时由扩展名确定格式（.csv、.parquet、.xlsx）"""
+    return TableWriter(path, fmt, chunk_rows)
@@ -0,0 +1,135 @@
+"""
+日志与分阶段计时。
+
+各模块通过 get_logger(__name__) 获取 "motor" 下的日志记录器，调用方（命令行、图形界面）决定输出级别和去向。
+StageTracer 记录每个文件各计算阶段（parse、steady_state、convert、integrate、stats、plot）的耗时：
+
+    with tracing() as tracer:
+        calculate_unified_efficiencies(...)
+    print(tracer.summary())
+    tracer.export_json('trace.json')   # Chrome / Perfetto 可直接打开
+
+没有激活的 StageTracer 时 stage() 返回共享的空上下文，开销只有一次 ContextVar 查询。
+激活状态按线程（上下文）区分，后台线程中的计算需要在该线程内调用 tracing()。
+"""
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+LOGGER_NAME = "motor"
+
+STAGES = ("parse", "steady_state", "convert", "integrate", "stats", "plot")
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+logger = get_logger(__name__)
+
+_current_tracer = ContextVar("motor_stage_tracer", default=None)
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("tracer", "name", "file", "start")
+
+    def __init__(self, tracer, name, file):
+        self.tracer = tracer
+        self.name = name
+        self.file = file
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.file, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class StageTracer:
+    """
+    收集分阶段计时记录。每条记录为 {"stage", "file", "start" (time.perf_counter() 时刻), "seconds", "pid", "thread"}。
+    记录可以来自子进程（见 run_experiment_task 的 trace_stages），用 extend() 合并。
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.records = []
+
+    def add(self, stage, file, start, seconds):
+        record = {"stage": stage, "file": file, "start": start, "seconds": seconds,
+                  "pid": os.getpid(), "thread": threading.get_ident()}
+        self.records.append(record)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s %s: %.3f ms", stage, file, seconds * 1000)
+
+    def extend(self, records):
+        self.records.extend(records)
+
+    def summary(self):
+        """按阶段汇总：{stage: {"count", "seconds"}}，按总耗时从大到小排列"""
+        totals = {}
+        for record in self.records:
+            entry = totals.setdefault(record["stage"], {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += record["seconds"]
+        return dict(sorted(totals.items(), key=lambda item: item[1]["seconds"], reverse=True))
+
+    def by_file(self):
+        """按文件汇总：{file: {stage: seconds}}"""
+        files = {}
+        for record in self.records:
+            stages = files.setdefault(record["file"], {})
+            stages[record["stage"]] = stages.get(record["stage"], 0.0) + record["seconds"]
+        return files
+
+    def format_summary(self):
+        total = sum(entry["seconds"] for entry in self.summary().values())
+        lines = [f"{len(self.by_file())} 个文件，分阶段耗时合计 {total * 1000:.1f} ms"]
+        for stage, entry in self.summary().items():
+            share = entry["seconds"] / total if total else 0.0
+            lines.append(f"  {stage:<13}{entry['seconds'] * 1000:10.1f} ms  {share:6.1%}  ({entry['count']} 次)")
+        return "\n".join(lines)
+
+    def to_trace_events(self):
+        """Chrome trace event 格式（"X" 完整事件，时间为相对于创建时刻的微秒数）"""
+        return [{"name": record["stage"], "cat": "motor", "ph": "X",
+                 "ts": (record["start"] - self.origin) * 1e6, "dur": record["seconds"] * 1e6,
+                 "pid": record["pid"], "tid": record["thread"],
+                 "args": {"file": record["file"]}} for record in self.records]
+
+    def export_json(self, path: str):
+        data = {"traceEvents": self.to_trace_events(), "displayTimeUnit": "ms",
+                "otherData": {"summary": self.summary(), "files": self.by_file()}}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        return path
+
+
+def active_tracer() -> StageTracer | None:
+    return _current_tracer.get()
+
+
+def stage(name: str, file=None):
+    """计时上下文：with stage("parse", file_path): ...；没有激活的 StageTracer 时不做任何事"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _NULL_STAGE
+    return _Stage(tracer, name, file)
+
+
+@contextlib.contextmanager
+def tracing(tracer: StageTracer | None = None):
+    """在当前线程（上下文）中激活 tracer（默认新建），退出时恢复原来的状态"""
+    tracer = StageTracer() if tracer is None else tracer
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
@@ -0,0 +1,64 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from daq_io import read_acquisition
+from efficiency_kernels import uniform_trapz, valid_sample_index
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'csv数据')
+CSV_FILES = sorted(glob.glob(os.path.join(CSV_DIR, '**', '*.csv'), recursive=True))
+
+SAMPLING_FREQ = 87500
+DX = 1.0 / SAMPLING_FREQ
+REFERENCE_V = 0.1
+INITIAL_V = 2.5
+R_LOAD = 10.0
+
+# NumPy 2.0 起 np.trapz 更名为 np.trapezoid
+_np_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def _reference_energy(power, valid):
+    # 原实现：对剔除NaN后的时间轴做 np.trapz
+    time = np.arange(len(valid)) * DX
+    return _np_trapezoid(power[valid], x=time[valid])
+
+
+def _assert_equivalent(v):
+    current = (v - INITIAL_V) / REFERENCE_V
+    power = current**2 * R_LOAD
+    valid = ~np.isnan(power)
+    expected = _reference_energy(power, valid)
+    actual = uniform_trapz(power[valid], DX, valid_sample_index(valid))
+    assert actual == pytest.approx(expected, rel=1e-12, abs=1e-15)
+
+
+@pytest.mark.parametrize('file_path', CSV_FILES, ids=lambda p: os.path.relpath(p, CSV_DIR))
+def test_matches_np_trapz_on_shipped_csv(file_path):
+    acquisition = read_acquisition(file_path, cache=None)
+    for column in range(1, acquisition.n_columns):
+        _assert_equivalent(acquisition[column])
+
+
+@pytest.mark.parametrize('file_path', CSV_FILES, ids=lambda p: os.path.relpath(p, CSV_DIR))
+def test_matches_np_trapz_with_nan_gaps(file_path):
+    acquisition = read_acquisition(file_path, cache=None)
+    rng = np.random.default_rng(0)
+    for column in range(1, acquisition.n_columns):
+        v = acquisition[column].copy()
+        n = len(v)
+        # 单点缺失、连续缺口，以及首尾缺失
+        v[rng.choice(n, size=n // 50, replace=False)] = np.nan
+        start = int(rng.integers(1, n - 100))
+        v[start:start + 100] = np.nan
+        v[:3] = np.nan
+        v[-2:] = np.nan
+        _assert_equivalent(v)
+
+
+def test_short_and_empty_input():
+    assert uniform_trapz(np.zeros(0), DX) == 0.0
+    assert uniform_trapz(np.array([1.0]), DX) == 0.0
+    assert uniform_trapz(np.array([1.0, 3.0]), DX, np.array([0, 4])) == pytest.approx(2.0 * 4 * DX)
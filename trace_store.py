@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import uuid
+import numpy as np
+from efficiency_engine import TraceData
+
+
+class TraceStore:
+    """
+    一次会话的逐点数据存储：spill() 把 TraceData 中的数组写入会话目录下的 .npy 文件，返回只保存文件路径的 TraceData，
+    绘图和导出时再以内存映射方式按需读取。批量结果因此只持有文件路径，常驻内存不随实验组数增长。
+
+    root 为 None 时在系统临时目录中创建会话目录，close() 时删除；指定 root 时由调用方负责清理。
+    子进程中可用 TraceStore(store.root) 写入同一目录。
+    """
+
+    def __init__(self, root: str | None = None):
+        self.owned = root is None
+        self.root = tempfile.mkdtemp(prefix="motor_traces_") if root is None else root
+        os.makedirs(self.root, exist_ok=True)
+
+    def spill(self, traces: TraceData, key: str = "trace") -> TraceData:
+        """写入磁盘并返回对应的 TraceData；已在磁盘上或为空的数据原样返回"""
+        if traces.spilled or traces.n_samples == 0:
+            return traces
+        arrays = dict(traces.currents)
+        if traces.positions is not None:
+            arrays["positions"] = traces.positions
+        # 文件名带随机后缀：同一会话中重复计算同一实验组不会覆盖仍被旧结果引用的文件
+        prefix = f"{key}_{uuid.uuid4().hex[:12]}"
+        paths = {}
+        for name, array in arrays.items():
+            path = os.path.join(self.root, f"{prefix}_{name}.npy")
+            np.save(path, np.ascontiguousarray(array))
+            paths[name] = path
+        return TraceData.from_files(paths, traces.start_row, traces.sampling_freq, traces.r_load, traces.drive_v)
+
+    def spill_result(self, result, key: str = "result"):
+        """把 calculate_unified_efficiencies 结果中各部分的 plot_data 换成磁盘上的数据，返回 result 本身"""
+        spilled = {}
+        for section in ("verification", "theoretical"):
+            for side in ("zheng", "fan"):
+                part = result.get(section, {}).get(side)
+                if part is None:
+                    continue
+                # 正接/反接为同一文件时两者共享同一份 TraceData，只写入一次
+                traces = part["plot_data"]
+                if id(traces) not in spilled:
+                    spilled[id(traces)] = self.spill(traces, f"{key}_{section}_{side}")
+                part["plot_data"] = spilled[id(traces)]
+        return result
+
+    @property
+    def disk_bytes(self):
+        """会话目录中文件占用的字节数"""
+        with os.scandir(self.root) as entries:
+            return sum(entry.stat().st_size for entry in entries if entry.is_file())
+
+    def close(self):
+        if self.owned:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
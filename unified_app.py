@@ -1,61 +1,204 @@
 import sys
+import bisect
+import logging
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QLineEdit, QFileDialog, QTableWidget, QTableWidgetItem, QMessageBox,
-    QScrollArea, QSizePolicy, QMainWindow, QGroupBox, QTabWidget, QDialog,
+    QScrollArea, QMainWindow, QGroupBox, QTabWidget, QDialog,
     QHeaderView, QTextEdit, QListWidget, QListWidgetItem, QSpinBox,
-    QDoubleSpinBox, QComboBox
+    QDoubleSpinBox, QComboBox, QProgressBar, QCheckBox
 )
-from PyQt6.QtCore import Qt, QLocale
+from PyQt6.QtCore import Qt, QLocale, QObject, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QDoubleValidator, QFont, QTextCursor, QPixmap
 
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-
-plt.rcParams['font.sans-serif'] = ['SimHei'] 
-plt.rcParams['axes.unicode_minus'] = False  
-
-from unified_calculator import calculate_unified_efficiencies, ExperimentConfig, BatchExperimentAnalyzer, calculate_simple_efficiency
-from factor_calculator import calculate_single_efficiency, calculate_factor_experiment
+# matplotlib（mpl_canvas）、pandas 和计算模块（unified_calculator）在第一次用到时才导入，窗口可以先显示出来
+from efficiency_kernels import SteadyStateDetector
+from daq_stream import StreamIngestServer
+from trace_store import TraceStore
+from stage_trace import LOGGER_NAME, StageTracer, get_logger, tracing
 import numpy as np
 import os
 
-class MatplotlibCanvas(FigureCanvas):
- 
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = self.fig.add_subplot(111)
-        super().__init__(self.fig)
-        self.setParent(parent)
-        FigureCanvas.setSizePolicy(self, QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        FigureCanvas.updateGeometry(self)
-
-    def plot(self, x_data, y_data, title="", x_label="", y_label="", legend_label="", color=None):
-        self.axes.cla() 
-        if x_data is not None and y_data is not None and len(x_data) > 0 and len(y_data) > 0:
-            self.axes.plot(x_data, y_data, label=legend_label, color=color)
-            if legend_label:
-                self.axes.legend()
-        self.axes.set_title(title)
-        self.axes.set_xlabel(x_label)
-        self.axes.set_ylabel(y_label)
-        self.axes.grid(True)
-        self.draw()
-
-    def plot_comparison(self, datasets, title="", x_label="", y_label=""):
-    
-        self.axes.cla()
-        colors = ['blue', 'red', 'green', 'orange']
-        for i, (x_data, y_data, label) in enumerate(datasets):
-            if x_data is not None and y_data is not None and len(x_data) > 0:
-                self.axes.plot(x_data, y_data, label=label, color=colors[i % len(colors)], alpha=0.7)
-        self.axes.set_title(title)
-        self.axes.set_xlabel(x_label)
-        self.axes.set_ylabel(y_label)
-        self.axes.legend()
-        self.axes.grid(True)
-        self.draw()
+logger = get_logger(__name__)
+
+LOCAL_STREAM_HOST = '127.0.0.1'
+
+class LazyTab(QWidget):
+    """标签页占位控件：第一次显示（或调用 ensure_built()）时才调用 builder 创建内容，创建后发出 built 信号"""
+    built = pyqtSignal()
+
+    def __init__(self, builder, parent=None):
+        super().__init__(parent)
+        self._builder = builder
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+
+    @property
+    def is_built(self):
+        return self._builder is None
+
+    def ensure_built(self):
+        if self._builder is not None:
+            builder, self._builder = self._builder, None
+            self._layout.addWidget(builder())
+            self.built.emit()
+
+    def showEvent(self, event):
+        self.ensure_built()
+        super().showEvent(event)
+
+
+class _LogBridge(QObject):
+    message = pyqtSignal(str, str)
+
+
+class QtLogHandler(logging.Handler):
+    """把计算模块的日志转发到界面日志面板；通过信号在主线程中显示，计算线程中也可以记录日志"""
+
+    def __init__(self, level=logging.INFO):
+        super().__init__(level)
+        self.bridge = _LogBridge()
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        level = "ERROR" if record.levelno >= logging.ERROR else "WARNING" if record.levelno >= logging.WARNING else "INFO"
+        self.bridge.message.emit(message, level)
+
+
+class UnifiedCalculationWorker(QObject):
+    """在后台线程中执行双机标定的统一计算"""
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, calc_kwargs, windowed_key=None):
+        super().__init__()
+        self.calc_kwargs = calc_kwargs
+        self.tracer = StageTracer()
+        self._cancelled = False
+        # windowed_key 为 (窗口长度, 步长) 时，在同一线程中接着计算滑动窗口效率序列
+        self.windowed_key = windowed_key
+        self.windowed_series = None
+
+    def cancel(self):
+        # 计算在正接/反接文件的读取与计算之间检查该标志并停止，已得到的结果也会被丢弃
+        self._cancelled = True
+
+    def run(self):
+        try:
+            from unified_calculator import calculate_unified_efficiencies
+            self.progress.emit(0, 1, "正在计算正接/反接数据...")
+            with tracing(self.tracer):
+                results = calculate_unified_efficiencies(**self.calc_kwargs, cancel_check=lambda: self._cancelled)
+                if results and self.windowed_key is not None and not self._cancelled:
+                    self.progress.emit(0, 1, "正在计算滑动窗口效率...")
+                    try:
+                        self.windowed_series = _windowed_efficiency_series(self.calc_kwargs, *self.windowed_key)
+                    except Exception as e:
+                        logger.error("滑动窗口效率计算失败: %s", e)
+                        self.windowed_key = None
+            self.progress.emit(1, 1, "计算完成")
+            self.finished.emit(None if self._cancelled else results)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def _windowed_efficiency_series(calc_kwargs, window_seconds, hop_seconds):
+    """
+    按统一计算的参数（含通道映射与稳态段设置）求正接与反接文件的滑动窗口效率序列，
+    合并为一个 DataFrame（side 列为 "正接"/"反接"），没有数据时返回 None。
+    """
+    import pandas as pd
+    from unified_calculator import calculate_windowed_efficiencies
+    series = []
+    computed = {}
+    for side, file_path, points in (("正接", calc_kwargs["zheng_file_path"], calc_kwargs["points_to_process_zheng"]),
+                                    ("反接", calc_kwargs["fan_file_path"], calc_kwargs["points_to_process_fan"])):
+        # 正接/反接为同一文件时只计算一次
+        key = (file_path, points)
+        if key not in computed:
+            computed[key] = calculate_windowed_efficiencies(
+                file_path, calc_kwargs["reference_v"], calc_kwargs["initial_v"], calc_kwargs["r_load"],
+                calc_kwargs["drive_v"], calc_kwargs["power_input"],
+                window_seconds=window_seconds,
+                hop_seconds=hop_seconds,
+                sampling_freq=calc_kwargs["sampling_freq"],
+                points_to_process=points,
+                channel_map=calc_kwargs.get("channel_map"),
+                steady_state=calc_kwargs.get("steady_state")
+            )
+        df = computed[key]
+        if df is not None and len(df) > 0:
+            df = df.copy()
+            df.insert(0, "side", side)
+            series.append(df)
+    return pd.concat(series, ignore_index=True) if series else None
+
+
+class WindowedEfficiencyWorker(QObject):
+    """在后台线程中计算滑动窗口效率序列（修改窗口长度/步长后重新计算时使用）"""
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, calc_kwargs, window_seconds, hop_seconds):
+        super().__init__()
+        self.calc_kwargs = calc_kwargs
+        self.key = (window_seconds, hop_seconds)
+
+    def run(self):
+        try:
+            self.finished.emit(_windowed_efficiency_series(self.calc_kwargs, *self.key))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class BatchAnalysisWorker(QObject):
+    """在后台线程中逐组（或通过进程池并行）执行批量实验，每完成一组发出一次信号"""
+    progress = pyqtSignal(int, int, str)
+    group_finished = pyqtSignal(object)
+    group_failed = pyqtSignal(int, str)
+    finished = pyqtSignal(bool)
+    failed = pyqtSignal(str)
+
+    def __init__(self, tasks, max_workers=1):
+        super().__init__()
+        self.tasks = tasks
+        self.max_workers = max_workers
+        self.tracer = StageTracer()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        from unified_calculator import iter_experiment_tasks
+        total = len(self.tasks)
+        files_by_index = {task['experiment_index']: task['zheng_file'] for task in self.tasks}
+        done = 0
+        try:
+            self.progress.emit(0, total, "开始计算...")
+            with tracing(self.tracer):
+                task_iter = iter_experiment_tasks(self.tasks, self.max_workers)
+                try:
+                    for index, result, error in task_iter:
+                        done += 1
+                        if result is not None:
+                            self.group_finished.emit(result)
+                        else:
+                            self.group_failed.emit(index, error)
+                        self.progress.emit(done, total, os.path.basename(files_by_index.get(index, "")))
+                        if self._cancelled:
+                            break
+                finally:
+                    task_iter.close()
+            self.finished.emit(self._cancelled)
+        except Exception as e:
+            self.failed.emit(str(e))
+
 
 class UnifiedMotorAnalysisApp(QMainWindow):
     def __init__(self):
@@ -77,9 +220,41 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         }
 
         self.results = None
+        self.results_calc_kwargs = None
+        # 计算结果的逐点数据写入会话目录，界面只持有文件路径，绘图时按需读取
+        self.trace_store = TraceStore()
+        self.windowed_series = None
+        # 当前结果在各 (窗口长度, 步长) 下的滑动窗口效率序列，计算新结果时清空
+        self.windowed_cache = {}
+        self._windowed_thread = None
+        self._windowed_worker = None
+        self._windowed_failed = None
+        self.live_monitor = None
+        # 实时监测按固定间隔读取新增数据并刷新，刷新频率与数据写入速度无关
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self._poll_live_monitor)
+        self.live_file = None
+        self.live_stream = None
+        # 批量分析时各组结果陆续到达，图表最多每 300 ms 重绘一次
+        self._batch_plot_timer = QTimer(self)
+        self._batch_plot_timer.setSingleShot(True)
+        self._batch_plot_timer.setInterval(300)
+        self._batch_plot_timer.timeout.connect(self._update_batch_plots)
+        self._principle_dialog = None
+        self._calc_thread = None
+        self._calc_worker = None
+        self._batch_thread = None
+        self._batch_worker = None
+        # 最近一次计算的分阶段计时（StageTracer）
+        self.stage_tracer = None
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMaximumHeight(100)
+        self._log_handler = QtLogHandler()
+        self._log_handler.bridge.message.connect(self.log)
+        motor_logger = logging.getLogger(LOGGER_NAME)
+        motor_logger.addHandler(self._log_handler)
+        motor_logger.setLevel(logging.INFO)
         
         QLocale.setDefault(QLocale(QLocale.Language.C, QLocale.Country.AnyCountry))
         self._init_ui()
@@ -113,12 +288,18 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         self.main_tabs = QTabWidget()
         dual_motor_widget = self._create_dual_motor_widget()
         self.main_tabs.addTab(dual_motor_widget, "🔄 双机标定实验")
-        batch_experiment_widget = self._create_batch_experiment_widget()
-        self.main_tabs.addTab(batch_experiment_widget, "🔍 批量实验分析")
+        # 批量实验、图表和实时监测标签页在第一次显示时才创建（同时导入 matplotlib）
+        self.batch_tab = LazyTab(self._create_batch_experiment_widget)
+        self.main_tabs.addTab(self.batch_tab, "🔍 批量实验分析")
         main_layout.addWidget(self.main_tabs)
         log_group = QGroupBox("系统日志")
-        log_layout = QVBoxLayout()
-        log_layout.addWidget(self.log_text)
+        log_layout = QHBoxLayout()
+        log_layout.addWidget(self.log_text, 1)
+        self.btn_export_trace = QPushButton("⏱ 导出计时")
+        self.btn_export_trace.setToolTip("导出最近一次计算各文件的分阶段耗时（JSON，可用 Chrome/Perfetto 查看）")
+        self.btn_export_trace.clicked.connect(self._export_stage_trace)
+        self.btn_export_trace.setEnabled(False)
+        log_layout.addWidget(self.btn_export_trace, 0, Qt.AlignmentFlag.AlignTop)
         log_group.setLayout(log_layout)
         main_layout.addWidget(log_group)
         self.log("系统已就绪，请选择实验类型开始分析", "INFO")
@@ -194,6 +375,17 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         layout.addWidget(files_group)
         actions_group = QGroupBox("🚀 操作")
         actions_layout = QVBoxLayout()
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("并行进程数："))
+        self.batch_workers_spin = QSpinBox()
+        self.batch_workers_spin.setRange(1, max(os.cpu_count() or 1, 1))
+        self.batch_workers_spin.setValue(min(4, os.cpu_count() or 1))
+        self.batch_workers_spin.setToolTip("各实验组在多个进程中并行计算，设为1则逐组顺序计算")
+        workers_layout.addWidget(self.batch_workers_spin)
+        actions_layout.addLayout(workers_layout)
+        self.batch_steady_state_check = QCheckBox("自动截取稳态段（排除启动/停机过程）")
+        self.batch_steady_state_check.setToolTip("按输出电流检测每个文件的稳态段，只用稳态段计算效率")
+        actions_layout.addWidget(self.batch_steady_state_check)
         self.btn_run_batch = QPushButton("🧮 运行批量分析")
         self.btn_run_batch.clicked.connect(self._run_batch_analysis)
         self.btn_run_batch.setStyleSheet("""
@@ -216,7 +408,17 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         self.btn_save_batch_config.clicked.connect(self._save_batch_config)
         self.btn_load_batch_config = QPushButton("📥 加载配置")
         self.btn_load_batch_config.clicked.connect(self._load_batch_config)
+        self.batch_progress = QProgressBar()
+        self.batch_progress.setFormat("%v / %m")
+        self.batch_progress.setValue(0)
+        self.btn_cancel_batch = QPushButton("⏹ 取消")
+        self.btn_cancel_batch.clicked.connect(self._cancel_batch_analysis)
+        self.btn_cancel_batch.setEnabled(False)
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.batch_progress, 1)
+        progress_layout.addWidget(self.btn_cancel_batch)
         actions_layout.addWidget(self.btn_run_batch)
+        actions_layout.addLayout(progress_layout)
         actions_layout.addWidget(self.btn_export_batch)
         actions_layout.addWidget(self.btn_save_batch_config)
         actions_layout.addWidget(self.btn_load_batch_config)
@@ -227,6 +429,7 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         return panel
     def _create_batch_results_panel(self):
         """创建批量实验结果面板"""
+        from mpl_canvas import MatplotlibCanvas
         panel = QWidget()
         layout = QVBoxLayout(panel)
         self.batch_results_tabs = QTabWidget()
@@ -371,8 +574,10 @@ class UnifiedMotorAnalysisApp(QMainWindow):
             self.log(f"已选择 {len(self.batch_file_list)} 个数据文件", "SUCCESS")
     
     def _run_batch_analysis(self):
-
+        from unified_calculator import ExperimentConfig, BatchExperimentAnalyzer
         self.batch_config = ExperimentConfig(is_factor_exploration_mode=True)
+        if self.batch_steady_state_check.isChecked():
+            self.batch_config.steady_state = SteadyStateDetector()
         
      
         params = self._get_batch_params_from_table()
@@ -384,7 +589,7 @@ class UnifiedMotorAnalysisApp(QMainWindow):
             voltage_levels = []
             for voltage, power in params:
                 voltage_levels.append({'drive_v': voltage, 'power_input': power})
-            self.batch_config.configure_voltage_exploration(voltage_levels, r_load_fixed=10.0)
+            self.batch_config.configure_voltage_exploration(voltage_levels)
         elif self.batch_explore_type.currentText() == "负载电阻影响":
             resistance_power_levels = []
             for r_load, power in params:
@@ -399,8 +604,7 @@ class UnifiedMotorAnalysisApp(QMainWindow):
           
             self.batch_config.exploration_type = 'magnetic_distance'
             self.batch_config.fixed_params = {
-                'drive_v': 12.0,
-                'r_load': 10.0
+                'drive_v': 12.0
             }
             self.batch_config.variable_params = []
             for distance, power in distance_power_pairs:
@@ -461,9 +665,9 @@ class UnifiedMotorAnalysisApp(QMainWindow):
                 self.log(f"错误: 文件数与参数组数不匹配", "ERROR")
                 return
 
+            tasks = []
             for i, file_path in enumerate(files_to_process):
                 if not os.path.exists(file_path):
-                    print(f"警告: 文件 {file_path} 未找到，跳过组 {i+1}")
                     self.log(f"警告: 文件 {file_path} 未找到，跳过组 {i+1}", "WARNING")
                     continue
 
@@ -507,51 +711,140 @@ class UnifiedMotorAnalysisApp(QMainWindow):
                 else:
                      p_config['r_load'] = base_calc_params['r_load'] 
 
-                print(f"\n[RUN] 第 {i+1} 组: {self.batch_config.exploration_type}")
-                print(f"[RUN] 文件: {file_path}")
-                print(f"[RUN] 最终计算参数: {p_config}")
-
-                calc_result = calculate_unified_efficiencies(
-                    zheng_file_path=file_path,
-                    fan_file_path=file_path, 
-                    reference_v=p_config['reference_v'],
-                    initial_v=p_config['initial_v'],
-                    r_load=p_config['r_load'], 
-                    drive_v=p_config.get('drive_v', 0),
-                    power_input=p_config['power_input'],
-                    sampling_freq=p_config['sampling_freq']
-                )
-                if calc_result:
-                    factor_efficiency = calc_result["verification"]["finished_efficiency"]
-                    plot_data_source = calc_result["verification"]["zheng"]["plot_data"] 
-                    avg_power_val = 0
-                    max_power_val = 0
-                    if plot_data_source and len(plot_data_source["power"]) > 0:
-                        avg_power_val = np.mean(plot_data_source["power"])
-                        max_power_val = np.max(plot_data_source["power"])
-                    
-                    simplified_result = {
-                        'experiment_params': p_config, 
-                        'experiment_index': i + 1,
-                        'factor_exploration_mode': True, 
-                        'efficiency': factor_efficiency,
-                        'plot_data': plot_data_source, 
-                        'avg_output_power': avg_power_val,
-                        'max_output_power': max_power_val,
-                    }
-                    self.batch_analyzer.results.append(simplified_result)
-            
-            if self.batch_analyzer.results:
-                self._update_batch_results()
-                self.btn_export_batch.setEnabled(True)
-                self.log("批量分析完成！", "SUCCESS")
-            else:
-                QMessageBox.warning(self, "分析失败", "未获得有效结果，请检查数据文件")
-                self.log("批量分析失败：无有效结果", "ERROR")
+                logger.debug("[RUN] 第 %d 组: %s, 文件: %s", i + 1, self.batch_config.exploration_type, file_path)
+                logger.debug("[RUN] 最终计算参数: %s", p_config)
+
+                tasks.append({
+                    'experiment_index': i + 1,
+                    'experiment_params': p_config,
+                    'zheng_file': file_path,
+                    'fan_file': file_path,
+                    'points_to_process': None,
+                    'channel_map': self.batch_config.channel_map.to_dict(),
+                    'steady_state': self.batch_config.steady_state.to_dict() if self.batch_config.steady_state is not None else None,
+                    'factor_exploration_mode': True
+                })
+
+            if not tasks:
+                QMessageBox.warning(self, "分析失败", "没有可处理的数据文件")
+                self.log("批量分析失败：没有可处理的数据文件", "ERROR")
+                return
+
+            max_workers = self.batch_workers_spin.value()
+            self.log(f"共 {len(tasks)} 组，使用 {max_workers} 个进程计算", "INFO")
+            self._start_batch_worker(tasks, max_workers)
                 
         except Exception as e:
             QMessageBox.critical(self, "执行错误", f"批量分析过程中发生错误: {e}")
             self.log(f"批量分析异常: {e}", "ERROR")
+
+    def _start_batch_worker(self, tasks, max_workers):
+        self.batch_analyzer.results = []
+        self.batch_analyzer.failures = []
+        self.batch_results_table.setRowCount(0)
+        self.batch_progress.setRange(0, len(tasks))
+        self.batch_progress.setValue(0)
+        self.btn_run_batch.setEnabled(False)
+        self.btn_export_batch.setEnabled(False)
+        self.btn_cancel_batch.setEnabled(True)
+
+        self._batch_thread = QThread(self)
+        self._batch_worker = BatchAnalysisWorker(tasks, max_workers)
+        self._batch_worker.moveToThread(self._batch_thread)
+        self._batch_thread.started.connect(self._batch_worker.run)
+        self._batch_worker.progress.connect(self._on_batch_progress)
+        self._batch_worker.group_finished.connect(self._on_batch_group_finished)
+        self._batch_worker.group_failed.connect(self._on_batch_group_failed)
+        self._batch_worker.finished.connect(self._on_batch_finished)
+        self._batch_worker.failed.connect(self._on_batch_failed)
+        self._batch_worker.finished.connect(self._batch_thread.quit)
+        self._batch_worker.failed.connect(self._batch_thread.quit)
+        self._batch_thread.finished.connect(self._batch_worker.deleteLater)
+        self._batch_thread.finished.connect(self._on_batch_thread_finished)
+        self._batch_thread.start()
+
+    def _cancel_batch_analysis(self):
+        if self._batch_worker is not None:
+            self._batch_worker.cancel()
+            self.btn_cancel_batch.setEnabled(False)
+            self.log("正在取消批量分析，等待进行中的实验组完成...", "WARNING")
+
+    def _on_batch_progress(self, done, total, message):
+        self.batch_progress.setValue(done)
+        if message:
+            self.log(f"批量分析进度 {done}/{total}: {message}", "INFO")
+
+    def _on_batch_group_finished(self, result):
+        # 每完成一组只插入一行（按实验组序号），图表由定时器合并重绘
+        results = self.batch_analyzer.results
+        row = bisect.bisect(results, result['experiment_index'], key=lambda r: r['experiment_index'])
+        results.insert(row, result)
+        is_factor_mode = results[0].get('factor_exploration_mode', False)
+        if self.batch_results_table.rowCount() == 0:
+            self._set_batch_results_columns(is_factor_mode)
+        self.batch_results_table.insertRow(row)
+        base_efficiency = self._batch_base_efficiency(results, is_factor_mode)
+        self._fill_batch_result_row(row, result, is_factor_mode, base_efficiency)
+        if row == 0 and is_factor_mode:
+            # 基准组（序号最小的组）变化，重新计算其他行的相对基准列
+            for i in range(1, len(results)):
+                self._set_batch_relative_item(i, results[i], base_efficiency)
+        if not self._batch_plot_timer.isActive():
+            self._batch_plot_timer.start()
+
+    def _on_batch_group_failed(self, index, error):
+        file_path = None
+        if self._batch_worker is not None:
+            file_path = next((t['zheng_file'] for t in self._batch_worker.tasks if t['experiment_index'] == index), None)
+        self.batch_analyzer.failures.append({'experiment_index': index, 'file': file_path, 'error': error})
+        self.log(f"第 {index} 组计算失败 ({file_path}): {error}", "WARNING")
+
+    def _show_stage_trace(self, tracer):
+        """在日志面板中显示分阶段耗时汇总"""
+        if not tracer.records:
+            return
+        self.stage_tracer = tracer
+        self.btn_export_trace.setEnabled(True)
+        for line in tracer.format_summary().splitlines():
+            self.log(line.strip(), "INFO")
+
+    def _export_stage_trace(self):
+        if self.stage_tracer is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出计时", "stage_trace.json", "JSON文件 (*.json)")
+        if not path:
+            return
+        try:
+            self.stage_tracer.export_json(path)
+            self.log(f"分阶段计时已导出到: {path}", "SUCCESS")
+        except OSError as e:
+            QMessageBox.critical(self, "导出失败", f"导出计时时发生错误: {e}")
+
+    def _on_batch_finished(self, cancelled):
+        if self._batch_worker is not None:
+            self._show_stage_trace(self._batch_worker.tracer)
+        self._update_batch_results()
+        if cancelled:
+            self.log(f"批量分析已取消，已完成 {len(self.batch_analyzer.results)} 组", "WARNING")
+        if self.batch_analyzer.results:
+            self.btn_export_batch.setEnabled(True)
+            if not cancelled:
+                self.log("批量分析完成！", "SUCCESS")
+        elif not cancelled:
+            QMessageBox.warning(self, "分析失败", "未获得有效结果，请检查数据文件")
+            self.log("批量分析失败：无有效结果", "ERROR")
+
+    def _on_batch_failed(self, message):
+        self._update_batch_results()
+        QMessageBox.critical(self, "执行错误", f"批量分析过程中发生错误: {message}")
+        self.log(f"批量分析异常: {message}", "ERROR")
+
+    def _on_batch_thread_finished(self):
+        self._batch_thread.deleteLater()
+        self._batch_thread = None
+        self._batch_worker = None
+        self.btn_run_batch.setEnabled(True)
+        self.btn_cancel_batch.setEnabled(False)
     
     def _get_batch_params_from_table(self):
        
@@ -566,16 +859,22 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         return params
     
     def _update_batch_results(self):
-     
+        """按全部结果重建结果表格并重绘图表（整批完成后调用一次）"""
+        self._batch_plot_timer.stop()
         if not self.batch_analyzer or not self.batch_analyzer.results:
             return
         
         results = self.batch_analyzer.results
+        is_factor_mode = results[0].get('factor_exploration_mode', False)
+        self._set_batch_results_columns(is_factor_mode)
         self.batch_results_table.setRowCount(len(results))
-        
-      
-        is_factor_mode = results[0].get('factor_exploration_mode', False) if results else False
+        base_efficiency = self._batch_base_efficiency(results, is_factor_mode)
+        for i, result in enumerate(results):
+            self._fill_batch_result_row(i, result, is_factor_mode, base_efficiency)
+
+        self._update_batch_plots()
 
+    def _set_batch_results_columns(self, is_factor_mode):
         if is_factor_mode:
            
             self.batch_results_table.setColumnCount(7)
@@ -597,53 +896,57 @@ class UnifiedMotorAnalysisApp(QMainWindow):
                 "综合效率差异(%)", "相对误差(%)"
             ])
 
-        base_efficiency = 0
-        if results:
-            if is_factor_mode:
-                base_efficiency = results[0].get('efficiency', 0)
-            else:
-                base_efficiency = results[0].get('verification', {}).get('finished_efficiency', 0)
-        
-        for i, result in enumerate(results):
-            params = result['experiment_params']
-            col = 0
-            self.batch_results_table.setItem(i, col, QTableWidgetItem(str(result['experiment_index'])))
-            col += 1
+    @staticmethod
+    def _batch_base_efficiency(results, is_factor_mode):
+        """相对基准列的基准效率：序号最小的实验组"""
+        if not results:
+            return 0
+        if is_factor_mode:
+            return results[0].get('efficiency', 0)
+        return results[0].get('verification', {}).get('finished_efficiency', 0)
 
-            if is_factor_mode:
-                
-                if self.batch_config.exploration_type == 'voltage':
-                    self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params.get('drive_v', 0):.1f}"))
-                elif self.batch_config.exploration_type == 'resistance':
-                    self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params.get('r_load', 0):.1f}"))
-                elif 'magnetic_distance' in params: 
-                    self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params['magnetic_distance']:.1f}"))
-                else:
-                     self.batch_results_table.setItem(i, col, QTableWidgetItem("N/A"))
-                col += 1
-             
-                self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params['power_input']:.1f}"))
-                col += 1
-           
-                efficiency = result.get('efficiency', 0)
-                self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{efficiency*100:.2f}"))
-                col += 1
-                self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{result.get('avg_output_power', 0):.2f}"))
-                col += 1
-                self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{result.get('max_output_power', 0):.2f}"))
-                col += 1
-                if base_efficiency > 0:
-                    relative = (efficiency / base_efficiency - 1) * 100
-                    self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{relative:+.1f}"))
-                else:
-                    self.batch_results_table.setItem(i, col, QTableWidgetItem("--"))
-            else:
-              
-                for j in range(col, self.batch_results_table.columnCount()):
-                     self.batch_results_table.setItem(i, j, QTableWidgetItem("--"))
+    def _fill_batch_result_row(self, i, result, is_factor_mode, base_efficiency):
+        params = result['experiment_params']
+        col = 0
+        self.batch_results_table.setItem(i, col, QTableWidgetItem(str(result['experiment_index'])))
+        col += 1
 
-        self._update_batch_plots()
+        if is_factor_mode:
+            
+            if self.batch_config.exploration_type == 'voltage':
+                self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params.get('drive_v', 0):.1f}"))
+            elif self.batch_config.exploration_type == 'resistance':
+                self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params.get('r_load', 0):.1f}"))
+            elif 'magnetic_distance' in params: 
+                self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params['magnetic_distance']:.1f}"))
+            else:
+                 self.batch_results_table.setItem(i, col, QTableWidgetItem("N/A"))
+            col += 1
+         
+            self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{params['power_input']:.1f}"))
+            col += 1
+       
+            efficiency = result.get('efficiency', 0)
+            self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{efficiency*100:.2f}"))
+            col += 1
+            self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{result.get('avg_output_power', 0):.2f}"))
+            col += 1
+            self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{result.get('max_output_power', 0):.2f}"))
+            self._set_batch_relative_item(i, result, base_efficiency)
+        else:
+          
+            for j in range(col, self.batch_results_table.columnCount()):
+                 self.batch_results_table.setItem(i, j, QTableWidgetItem("--"))
     
+    def _set_batch_relative_item(self, i, result, base_efficiency):
+        # 因素探究模式的最后一列：相对基准组的效率变化
+        col = self.batch_results_table.columnCount() - 1
+        if base_efficiency > 0:
+            relative = (result.get('efficiency', 0) / base_efficiency - 1) * 100
+            self.batch_results_table.setItem(i, col, QTableWidgetItem(f"{relative:+.1f}"))
+        else:
+            self.batch_results_table.setItem(i, col, QTableWidgetItem("--"))
+
     def _update_batch_plots(self):
        
         if not self.batch_analyzer or not self.batch_analyzer.results:
@@ -725,16 +1028,29 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         self.canvas_batch_power.axes.set_ylabel('平均输出功率 (W)')
         self.canvas_batch_power.axes.set_title(f'不同{title_prefix_plot}下的平均输出功率')
         self.canvas_batch_power.axes.grid(True, alpha=0.4, axis='y', linestyle='--')
-        plt.setp(self.canvas_batch_power.axes.get_xticklabels(), fontsize=9)
+        self.canvas_batch_power.axes.tick_params(axis='x', labelsize=9)
         self.canvas_batch_power.fig.tight_layout()
         self.canvas_batch_power.draw()
     
     def _export_batch_results(self):
-       
-        if self.batch_analyzer:
-            df = self.batch_analyzer.generate_comparison_table()
-            if df is not None:
-                QMessageBox.information(self, "导出成功", "批量实验结果已导出到Excel文件")
+        if not self.batch_analyzer or not self.batch_analyzer.results:
+            return
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "导出批量实验结果", f"实验结果对比_{self.batch_config.exploration_type}.xlsx",
+            "Excel 文件 (*.xlsx);;CSV 文件 (*.csv);;Parquet 文件 (*.parquet)"
+        )
+        if not file_path:
+            return
+        if not os.path.splitext(file_path)[1]:
+            # 文件名没有扩展名时按所选的文件类型补上
+            file_path += selected_filter[selected_filter.rfind('*') + 1:].rstrip(')')
+        try:
+            paths = self.batch_analyzer.export_results(file_path)
+        except (ImportError, ValueError, OSError) as e:
+            self.log(f"导出失败: {e}", "ERROR")
+            QMessageBox.critical(self, "导出失败", f"导出过程中发生错误: {e}")
+            return
+        QMessageBox.information(self, "导出成功", "批量实验结果已导出到:\n" + "\n".join(paths))
     
     def _save_batch_config(self):
       
@@ -753,6 +1069,7 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         )
         if file_path:
             try:
+                from unified_calculator import ExperimentConfig
                 self.batch_config = ExperimentConfig.load_config(file_path)
                 # TODO: 更新界面显示
                 self.log(f"配置已加载: {file_path}", "SUCCESS")
@@ -839,6 +1156,17 @@ class UnifiedMotorAnalysisApp(QMainWindow):
             row.addWidget(line_edit)
             params_layout.addLayout(row)
         
+        self.steady_state_check = QCheckBox("自动截取稳态段（排除启动/停机过程）")
+        self.steady_state_check.setToolTip("按验证实验输出电流检测正接/反接文件各自的稳态段，只用稳态段计算效率和统计量")
+        params_layout.addWidget(self.steady_state_check)
+        from daq_io import get_default_cache
+        self.acquisition_cache_check = QCheckBox("缓存解析后的数据（再次读取同一文件时更快）")
+        self.acquisition_cache_check.setToolTip("把解析后的通道数据保存为二进制文件（默认位于 ~/.cache/motor_daq，上限 2 GiB），"
+                                                "源文件修改后自动失效")
+        self.acquisition_cache_check.setChecked(get_default_cache() is not None)
+        self.acquisition_cache_check.toggled.connect(self._toggle_acquisition_cache)
+        params_layout.addWidget(self.acquisition_cache_check)
+        
         params_group.setLayout(params_layout)
         layout.addWidget(params_group)
         
@@ -869,7 +1197,18 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         self.btn_principle = QPushButton("📖 查看原理说明")
         self.btn_principle.clicked.connect(self._show_principle)
         
+        self.calc_progress = QProgressBar()
+        self.calc_progress.setTextVisible(False)
+        self.calc_progress.setValue(0)
+        self.btn_cancel_calculate = QPushButton("⏹ 取消")
+        self.btn_cancel_calculate.clicked.connect(self._cancel_calculation)
+        self.btn_cancel_calculate.setEnabled(False)
+        calc_progress_layout = QHBoxLayout()
+        calc_progress_layout.addWidget(self.calc_progress, 1)
+        calc_progress_layout.addWidget(self.btn_cancel_calculate)
+
         actions_layout.addWidget(self.btn_calculate)
+        actions_layout.addLayout(calc_progress_layout)
         actions_layout.addWidget(self.btn_export)
         actions_layout.addWidget(self.btn_principle)
         actions_group.setLayout(actions_layout)
@@ -895,8 +1234,12 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         self.results_tabs.addTab(stats_tab, "📈 数据统计")
         
      
-        plots_tab = self._create_plots_tab()
-        self.results_tabs.addTab(plots_tab, "📉 图表分析")
+        self.plots_tab = LazyTab(self._create_plots_tab)
+        self.plots_tab.built.connect(self._update_plots)
+        self.results_tabs.addTab(self.plots_tab, "📉 图表分析")
+        
+        self.live_tab = LazyTab(self._create_live_tab)
+        self.results_tabs.addTab(self.live_tab, "📡 实时监测")
         
         layout.addWidget(self.results_tabs)
         return panel
@@ -963,8 +1306,18 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         
         return widget
 
+    def _with_navigation_toolbar(self, canvas):
+        """为曲线图加上缩放/平移工具栏，缩放后曲线按显示范围重新抽稀"""
+        from matplotlib.backends.backend_qtagg import NavigationToolbar2QT
+        container = QWidget()
+        container_layout = QVBoxLayout(container)
+        container_layout.setContentsMargins(0, 0, 0, 0)
+        container_layout.addWidget(NavigationToolbar2QT(canvas, container))
+        container_layout.addWidget(canvas)
+        return container
+
     def _create_plots_tab(self):
-      
+        from mpl_canvas import MatplotlibCanvas
         widget = QWidget()
         layout = QVBoxLayout(widget)
         
@@ -973,19 +1326,209 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         
        
         self.canvas_current = MatplotlibCanvas(self)
-        plot_tabs.addTab(self.canvas_current, "电流对比")
+        plot_tabs.addTab(self._with_navigation_toolbar(self.canvas_current), "电流对比")
         
       
         self.canvas_power = MatplotlibCanvas(self)
-        plot_tabs.addTab(self.canvas_power, "功率对比")
+        plot_tabs.addTab(self._with_navigation_toolbar(self.canvas_power), "功率对比")
         
    
         self.canvas_efficiency_bar = MatplotlibCanvas(self)
         plot_tabs.addTab(self.canvas_efficiency_bar, "效率对比")
         
+        plot_tabs.addTab(self._create_windowed_plot_tab(), "滑动窗口效率")
+        
         layout.addWidget(plot_tabs)
         return widget
 
+    def _create_windowed_plot_tab(self):
+    
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("窗口长度(s):"))
+        self.window_seconds_spin = QDoubleSpinBox()
+        self.window_seconds_spin.setDecimals(3)
+        self.window_seconds_spin.setRange(0.001, 3600.0)
+        self.window_seconds_spin.setSingleStep(0.01)
+        self.window_seconds_spin.setValue(0.05)
+        controls.addWidget(self.window_seconds_spin)
+        controls.addWidget(QLabel("步长(s):"))
+        self.hop_seconds_spin = QDoubleSpinBox()
+        self.hop_seconds_spin.setDecimals(3)
+        self.hop_seconds_spin.setRange(0.001, 3600.0)
+        self.hop_seconds_spin.setSingleStep(0.01)
+        self.hop_seconds_spin.setValue(0.01)
+        controls.addWidget(self.hop_seconds_spin)
+        self.btn_update_windowed = QPushButton("🔄 更新")
+        self.btn_update_windowed.clicked.connect(self._update_windowed_plot)
+        controls.addWidget(self.btn_update_windowed)
+        self.btn_export_windowed = QPushButton("💾 导出序列")
+        self.btn_export_windowed.clicked.connect(self._export_windowed_series)
+        self.btn_export_windowed.setEnabled(False)
+        controls.addWidget(self.btn_export_windowed)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        from mpl_canvas import MatplotlibCanvas
+        self.canvas_windowed = MatplotlibCanvas(self)
+        layout.addWidget(self._with_navigation_toolbar(self.canvas_windowed))
+        return widget
+
+    def _create_live_tab(self):
+        from mpl_canvas import MatplotlibCanvas
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("数据来源:"))
+        self.live_source_combo = QComboBox()
+        self.live_source_combo.addItems(["CSV文件", "TCP数据流", "UDP数据流"])
+        self.live_source_combo.currentIndexChanged.connect(self._live_source_changed)
+        controls.addWidget(self.live_source_combo)
+        controls.addWidget(QLabel("端口:"))
+        self.live_port_spin = QSpinBox()
+        self.live_port_spin.setRange(1, 65535)
+        self.live_port_spin.setValue(5555)
+        self.live_port_spin.setEnabled(False)
+        controls.addWidget(self.live_port_spin)
+        controls.addWidget(QLabel("监听地址:"))
+        # 默认只接受本机采集程序的连接；其他地址需用户明确填写（数据流端口没有身份验证）
+        self.live_host_edit = QLineEdit(LOCAL_STREAM_HOST)
+        self.live_host_edit.setToolTip("数据流监听地址，默认 127.0.0.1 只接受本机连接；\n"
+                                       "填写 0.0.0.0 或网卡地址才接受其他主机的数据（没有身份验证）")
+        self.live_host_edit.setMaximumWidth(120)
+        self.live_host_edit.setEnabled(False)
+        controls.addWidget(self.live_host_edit)
+        self.btn_live_select = QPushButton("📂 选择采集文件")
+        self.btn_live_select.clicked.connect(self._live_select_file)
+        controls.addWidget(self.btn_live_select)
+        self.live_file_label = QLabel("未选择文件")
+        controls.addWidget(self.live_file_label)
+        controls.addWidget(QLabel("刷新间隔(ms):"))
+        self.live_interval_spin = QSpinBox()
+        self.live_interval_spin.setRange(100, 10000)
+        self.live_interval_spin.setSingleStep(100)
+        self.live_interval_spin.setValue(500)
+        self.live_interval_spin.valueChanged.connect(lambda value: self.live_timer.setInterval(value))
+        controls.addWidget(self.live_interval_spin)
+        self.btn_live_toggle = QPushButton("▶ 开始监测")
+        self.btn_live_toggle.clicked.connect(self._toggle_live_monitor)
+        self.btn_live_toggle.setEnabled(False)
+        controls.addWidget(self.btn_live_toggle)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.live_status_label = QLabel("选择正在写入的采集文件或数据流端口后开始监测，计算参数取左侧参数设置")
+        layout.addWidget(self.live_status_label)
+
+        live_plot_tabs = QTabWidget()
+        self.canvas_live_efficiency = MatplotlibCanvas(self)
+        live_plot_tabs.addTab(self.canvas_live_efficiency, "效率收敛")
+        self.canvas_live_trace = MatplotlibCanvas(self)
+        live_plot_tabs.addTab(self._with_navigation_toolbar(self.canvas_live_trace), "最近输出电流")
+        layout.addWidget(live_plot_tabs)
+        return widget
+
+    def _live_source_changed(self, index):
+        is_stream = index > 0
+        self.live_port_spin.setEnabled(is_stream)
+        self.live_host_edit.setEnabled(is_stream)
+        self.btn_live_select.setEnabled(not is_stream)
+        self.btn_live_toggle.setEnabled(is_stream or self.live_file is not None)
+
+    def _live_select_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "选择采集文件", "", "CSV 文件 (*.csv)")
+        if file_path:
+            self.live_file = file_path
+            self.live_file_label.setText(f"已选择: {os.path.basename(file_path)}")
+            self.btn_live_toggle.setEnabled(True)
+
+    def _toggle_live_monitor(self):
+        if self.live_timer.isActive():
+            self._stop_live_monitor()
+            return
+        params = self._validate_params()
+        if not params:
+            return
+        source = self.live_file
+        if self.live_source_combo.currentIndex() > 0:
+            protocol = 'tcp' if self.live_source_combo.currentIndex() == 1 else 'udp'
+            host = self.live_host_edit.text().strip() or LOCAL_STREAM_HOST
+            self.live_stream = StreamIngestServer(host=host, port=self.live_port_spin.value(),
+                                                  protocol=protocol, sampling_freq=params["sampling_freq"])
+            try:
+                self.live_stream.start()
+            except OSError as e:
+                self.log(f"无法监听 {host}:{self.live_port_spin.value()}: {e}", "ERROR")
+                self.live_stream = None
+                return
+            if host != LOCAL_STREAM_HOST:
+                self.log(f"数据流端口监听在 {host}，其他主机可以连接并发送数据（没有身份验证）", "WARNING")
+            source = f"{protocol}://{host}:{self.live_port_spin.value()}"
+        from unified_calculator import LiveEfficiencyMonitor
+        self.live_monitor = LiveEfficiencyMonitor(
+            self.live_file if self.live_stream is None else None,
+            reference_v=params["reference_v"],
+            initial_v=params["initial_v"],
+            r_load=params["r_load"],
+            drive_v=params["drive_v"],
+            power_input=params["power_input"],
+            sampling_freq=params["sampling_freq"],
+            max_bytes_per_poll=2 * 1024 * 1024,
+            stream=self.live_stream
+        )
+        self.live_timer.start(self.live_interval_spin.value())
+        self.btn_live_toggle.setText("⏹ 停止监测")
+        self.btn_live_select.setEnabled(False)
+        self.live_source_combo.setEnabled(False)
+        self.live_port_spin.setEnabled(False)
+        self.live_host_edit.setEnabled(False)
+        self.log(f"开始实时监测: {source}", "INFO")
+
+    def _stop_live_monitor(self):
+        self.live_timer.stop()
+        if self.live_stream is not None:
+            self.live_stream.stop()
+            self.live_stream = None
+        self.btn_live_toggle.setText("▶ 开始监测")
+        self.live_source_combo.setEnabled(True)
+        self._live_source_changed(self.live_source_combo.currentIndex())
+        self.log("已停止实时监测", "INFO")
+
+    def _poll_live_monitor(self):
+        try:
+            new_rows = self.live_monitor.poll()
+        except Exception as e:
+            self.log(f"实时监测读取失败: {e}", "ERROR")
+            self._stop_live_monitor()
+            return
+        if new_rows == 0:
+            return
+
+        snapshot = self.live_monitor.last_snapshot
+        self.live_status_label.setText(
+            f"已读取 {snapshot['rows']} 行 ({snapshot['duration']:.2f} s)    "
+            f"验证实验效率: {snapshot['verification_efficiency']*100:.3f}%    "
+            f"理论实验效率: {snapshot['theoretical_efficiency']*100:.3f}%"
+        )
+        if "rolling" in snapshot:
+            rolling = snapshot["rolling"]
+            self.live_status_label.setText(
+                self.live_status_label.text() +
+                f"    最近 {self.live_monitor.rolling_samples / self.live_monitor.sampling_freq:g} s 验证实验效率: "
+                f"{rolling['verification_efficiency']*100:.3f}%    丢失采样: {snapshot['lost_rows']}"
+            )
+
+        history = np.array(self.live_monitor.efficiency_history)
+        datasets = [(history[:, 0], history[:, 1] * 100, "验证实验")]
+        if self.live_monitor.channels["theoretical_output"] is not None:
+            datasets.append((history[:, 0], history[:, 2] * 100, "理论实验"))
+        self.canvas_live_efficiency.plot_comparison(datasets, "累计效率", "采集时长 (s)", "效率 (%)")
+        self.canvas_live_trace.plot(self.live_monitor.trace_time, self.live_monitor.trace_current,
+                                    "最近输出电流", "时间 (s)", "电流 (A)", color='blue')
+
     def _init_efficiency_table(self):
         for i in range(4):
             for j in range(1, 5):
@@ -1041,6 +1584,15 @@ class UnifiedMotorAnalysisApp(QMainWindow):
             self.log(f"参数验证失败: {e}", "ERROR")
             return None
 
+    def _toggle_acquisition_cache(self, enabled):
+        from daq_io import AcquisitionCache, set_default_cache
+        cache = AcquisitionCache() if enabled else None
+        set_default_cache(cache)
+        if cache is not None:
+            self.log(f"数据缓存已启用: {cache.describe()}", "INFO")
+        else:
+            self.log("数据缓存已关闭", "INFO")
+
     def _calculate(self):
 
         if not self.zheng_file or not self.fan_file:
@@ -1054,32 +1606,86 @@ class UnifiedMotorAnalysisApp(QMainWindow):
 
         self.log("开始统一计算...", "INFO")
         
-        try:
-            self.results = calculate_unified_efficiencies(
-                zheng_file_path=self.zheng_file,
-                fan_file_path=self.fan_file,
-                reference_v=params["reference_v"],
-                initial_v=params["initial_v"],
-                r_load=params["r_load"],
-                drive_v=params["drive_v"],
-                power_input=params["power_input"],
-                sampling_freq=params["sampling_freq"],
-                points_to_process_zheng=params["points_to_process_zheng"],
-                points_to_process_fan=params["points_to_process_fan"]
-            )
-
-            if self.results:
-                self._update_results()
-                self.btn_export.setEnabled(True)
-                self.log("计算完成！", "SUCCESS")
-                QMessageBox.information(self, "计算完成", "统一效率计算已完成，请查看结果")
-            else:
-                QMessageBox.critical(self, "计算错误", "计算失败，请检查数据文件和参数")
-                self.log("计算失败：返回结果为空", "ERROR")
-
-        except Exception as e:
-            QMessageBox.critical(self, "执行错误", f"计算过程中发生错误: {e}")
-            self.log(f"计算异常: {e}", "ERROR")
+        calc_kwargs = dict(
+            zheng_file_path=self.zheng_file,
+            fan_file_path=self.fan_file,
+            reference_v=params["reference_v"],
+            initial_v=params["initial_v"],
+            r_load=params["r_load"],
+            drive_v=params["drive_v"],
+            power_input=params["power_input"],
+            sampling_freq=params["sampling_freq"],
+            points_to_process_zheng=params["points_to_process_zheng"],
+            points_to_process_fan=params["points_to_process_fan"],
+            steady_state=SteadyStateDetector() if self.steady_state_check.isChecked() else None
+        )
+        self.btn_calculate.setEnabled(False)
+        self.btn_cancel_calculate.setEnabled(True)
+        self.calc_progress.setRange(0, 0)
+
+        self._calc_thread = QThread(self)
+        self._calc_worker = UnifiedCalculationWorker(calc_kwargs, self._windowed_key())
+        self._calc_worker.moveToThread(self._calc_thread)
+        self._calc_thread.started.connect(self._calc_worker.run)
+        self._calc_worker.finished.connect(self._on_calculation_finished)
+        self._calc_worker.failed.connect(self._on_calculation_failed)
+        self._calc_worker.finished.connect(self._calc_thread.quit)
+        self._calc_worker.failed.connect(self._calc_thread.quit)
+        self._calc_thread.finished.connect(self._calc_worker.deleteLater)
+        self._calc_thread.finished.connect(self._on_calculation_thread_finished)
+        self._calc_thread.start()
+
+    def _cancel_calculation(self):
+        if self._calc_worker is not None:
+            self._calc_worker.cancel()
+            self.btn_cancel_calculate.setEnabled(False)
+            self.log("已取消统一计算", "WARNING")
+
+    def _on_calculation_finished(self, results):
+        if self._calc_worker is not None and self._calc_worker._cancelled:
+            return
+        self.results = self.trace_store.spill_result(results, "dual") if results else results
+        self.results_calc_kwargs = self._calc_worker.calc_kwargs
+        self.windowed_cache = {}
+        if self._calc_worker.windowed_key is not None:
+            self.windowed_cache[self._calc_worker.windowed_key] = self._calc_worker.windowed_series
+        self._show_stage_trace(self._calc_worker.tracer)
+        if self.results:
+            self._update_results()
+            self.btn_export.setEnabled(True)
+            self.log("计算完成！", "SUCCESS")
+            QMessageBox.information(self, "计算完成", "统一效率计算已完成，请查看结果")
+        else:
+            QMessageBox.critical(self, "计算错误", "计算失败，请检查数据文件和参数")
+            self.log("计算失败：返回结果为空", "ERROR")
+
+    def _on_calculation_failed(self, message):
+        QMessageBox.critical(self, "执行错误", f"计算过程中发生错误: {message}")
+        self.log(f"计算异常: {message}", "ERROR")
+
+    def _on_calculation_thread_finished(self):
+        self._calc_thread.deleteLater()
+        self._calc_thread = None
+        self._calc_worker = None
+        self.calc_progress.setRange(0, 1)
+        self.calc_progress.setValue(0)
+        self.btn_calculate.setEnabled(True)
+        self.btn_cancel_calculate.setEnabled(False)
+
+    def closeEvent(self, event):
+        self.live_timer.stop()
+        if self.live_stream is not None:
+            self.live_stream.stop()
+        for worker, thread in ((self._calc_worker, self._calc_thread), (self._batch_worker, self._batch_thread),
+                               (self._windowed_worker, self._windowed_thread)):
+            if worker is not None and hasattr(worker, "cancel"):
+                worker.cancel()
+            if thread is not None:
+                thread.quit()
+                thread.wait()
+        self.trace_store.close()
+        logging.getLogger(LOGGER_NAME).removeHandler(self._log_handler)
+        super().closeEvent(event)
 
     def _update_results(self):
  
@@ -1145,6 +1751,9 @@ class UnifiedMotorAnalysisApp(QMainWindow):
                 self.stats_table.setItem(i, 6, QTableWidgetItem(f"{stats['avg']:.4f}" if not np.isnan(stats['avg']) else "N/A"))
 
     def _update_plots(self):
+        # 图表标签页还没有显示过时不绘图，第一次显示时（built 信号）再按当前结果绘制
+        if not self.results or not self.plots_tab.is_built:
+            return
         ver = self.results["verification"]
         theo = self.results["theoretical"]
         
@@ -1172,9 +1781,88 @@ class UnifiedMotorAnalysisApp(QMainWindow):
         
         self.canvas_power.plot_comparison(datasets, "输出功率对比", "时间 (s)", "功率 (W)")
         
+        self._update_windowed_plot()
+        
   
         self._plot_efficiency_comparison()
 
+    def _windowed_key(self):
+        """滑动窗口效率的 (窗口长度, 步长)；图表标签页尚未创建时返回 None"""
+        if not self.plots_tab.is_built:
+            return None
+        return (self.window_seconds_spin.value(), self.hop_seconds_spin.value())
+
+    def _update_windowed_plot(self):
+        """显示当前窗口长度/步长下的滑动窗口效率序列；没有缓存时在后台线程中计算，完成后再绘图"""
+        if not self.results or self.results_calc_kwargs is None:
+            return
+        key = self._windowed_key()
+        if key in self.windowed_cache:
+            self._plot_windowed_series(self.windowed_cache[key])
+            return
+        if self._windowed_thread is not None:
+            # 正在计算其他参数，完成后按最新的参数再处理
+            return
+        self.btn_update_windowed.setEnabled(False)
+        self._windowed_thread = QThread(self)
+        self._windowed_worker = WindowedEfficiencyWorker(self.results_calc_kwargs, *key)
+        self._windowed_worker.moveToThread(self._windowed_thread)
+        self._windowed_thread.started.connect(self._windowed_worker.run)
+        self._windowed_worker.finished.connect(self._on_windowed_finished)
+        self._windowed_worker.failed.connect(self._on_windowed_failed)
+        self._windowed_worker.finished.connect(self._windowed_thread.quit)
+        self._windowed_worker.failed.connect(self._windowed_thread.quit)
+        self._windowed_thread.finished.connect(self._windowed_worker.deleteLater)
+        self._windowed_thread.finished.connect(self._on_windowed_thread_finished)
+        self._windowed_thread.start()
+
+    def _on_windowed_finished(self, series):
+        # 计算期间已有新的统一计算结果时丢弃
+        if self._windowed_worker.calc_kwargs is self.results_calc_kwargs:
+            self.windowed_cache[self._windowed_worker.key] = series
+
+    def _on_windowed_failed(self, message):
+        self.log(f"滑动窗口效率计算失败: {message}", "ERROR")
+        self._windowed_failed = (self._windowed_worker.calc_kwargs, self._windowed_worker.key)
+
+    def _on_windowed_thread_finished(self):
+        self._windowed_thread.deleteLater()
+        self._windowed_thread = None
+        self._windowed_worker = None
+        self.btn_update_windowed.setEnabled(True)
+        # 计算期间结果或参数有变化时按最新的再处理；失败的参数不自动重试，可点击“更新”重新计算
+        failed, self._windowed_failed = self._windowed_failed, None
+        if failed != (self.results_calc_kwargs, self._windowed_key()):
+            self._update_windowed_plot()
+
+    def _plot_windowed_series(self, series):
+        self.windowed_series = series
+        datasets = []
+        method_labels = {"verification": "验证", "theoretical": "理论"}
+        if self.windowed_series is not None:
+            for (side, method), group in self.windowed_series.groupby(["side", "method"], sort=False):
+                datasets.append((group["time"].to_numpy(), group["efficiency"].to_numpy() * 100,
+                                 f"{method_labels[method]}-{side}"))
+        self.canvas_windowed.plot_comparison(datasets, "滑动窗口效率", "窗口中心时间 (s)", "效率 (%)")
+        self.btn_export_windowed.setEnabled(self.windowed_series is not None)
+
+    def _export_windowed_series(self):
+        if self.windowed_series is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出滑动窗口效率", "windowed_efficiency.csv", "CSV文件 (*.csv)")
+        if file_path:
+            try:
+                export_df = self.windowed_series.replace({"method": {"verification": "验证实验", "theoretical": "理论实验"}})
+                export_df = export_df.rename(columns={
+                    "side": "接法", "method": "计算方法", "time": "窗口中心时间(s)",
+                    "efficiency": "效率", "avg_output_power": "平均输出功率(W)"
+                })
+                export_df.to_csv(file_path, index=False, encoding='utf-8-sig')
+                self.log(f"滑动窗口效率已导出至: {file_path}", "SUCCESS")
+            except Exception as e:
+                self.log(f"导出失败: {e}", "ERROR")
+                QMessageBox.critical(self, "导出失败", f"导出过程中发生错误: {e}")
+
     def _plot_efficiency_comparison(self):
         categories = ['正向效率', '反向效率', '综合效率']
         verification_values = [
@@ -1284,8 +1972,10 @@ class UnifiedMotorAnalysisApp(QMainWindow):
 
     def _show_principle(self):
         """显示原理说明"""
-        principle_dialog = PrincipleDialog(self)
-        principle_dialog.exec()
+        # 说明文字较多，第一次打开时创建，之后重复使用
+        if self._principle_dialog is None:
+            self._principle_dialog = PrincipleDialog(self)
+        self._principle_dialog.exec()
 
 
 
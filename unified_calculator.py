@@ -1,137 +1,126 @@
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
 import json
+from collections import OrderedDict, deque
 from datetime import datetime
-try:
-    import openpyxl 
-except ImportError:
-    print("警告: 未安装openpyxl库，无法导出Excel文件。请运行: pip install openpyxl")
+from daq_io import (read_acquisition, iter_acquisition_chunks, ChannelMap, CsvTailReader, get_default_cache,
+                    set_default_cache)
+from efficiency_kernels import (channel_moments, merge_channel_moments,
+                                valid_sample_index, trapz_weights,
+                                window_starts, windowed_trapz, windowed_mean, SteadyStateDetector,
+                                fused_side_integrals, new_fused_state, FUSED_ROWS, FUSED_VER_COUNT, FUSED_VER_ENERGY,
+                                FUSED_THEO_COUNT, FUSED_THEO_OUTPUT_ENERGY, FUSED_THEO_INPUT_ENERGY)
+from efficiency_engine import (EfficiencyEngine, SideResult, _stats_columns, _stats_from_moments,
+                               _empty_side_results, _resolve_load_plan, _load_plan)
+from trace_store import TraceStore
+from result_export import open_table_writer, CHUNK_ROWS
+from stage_trace import get_logger, stage, tracing, active_tracer
 
+logger = get_logger(__name__)
 
-plt.rcParams['font.sans-serif'] = ['SimHei'] 
-plt.rcParams['axes.unicode_minus'] = False    
 
-def _calculate_column_stats(column_data_series: pd.Series):
-    """Helper function to calculate max, min, avg for a pandas Series."""
-    numeric_data = pd.to_numeric(column_data_series, errors='coerce')
-    if numeric_data.empty or numeric_data.isnull().all():
-        return {"max": np.nan, "min": np.nan, "avg": np.nan}
-    return {
-        "max": numeric_data.max(),
-        "min": numeric_data.min(),
-        "avg": numeric_data.mean()
-    }
+def _pyplot():
+    """第一次绘图时才导入 matplotlib.pyplot 并设置中文字体，只做计算的调用方不需要为此付出导入时间"""
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
 
 def calculate_simple_efficiency(file_path: str, reference_v: float, initial_v: float, 
                               r_load: float, power_input: float,
                               sampling_freq: float = 87500.0,
-                              points_to_process: int | None = None):
-
-    print(f"\n[DEBUG] calculate_simple_efficiency called for file: {file_path}")
-    print(f"[DEBUG] Params: ref_v={reference_v}, init_v={initial_v}, r_load={r_load}, power_in={power_input}, samp_freq={sampling_freq}, points={points_to_process}")
+                              points_to_process: int | None = None,
+                              channel_map: ChannelMap | None = None,
+                              steady_state: SteadyStateDetector | None = None,
+                              include_plot_data: bool = True):
+    """只读取验证实验输出通道的简化计算；include_plot_data=False 时不生成逐点的绘图数组（plot_data 为空）"""
+    logger.debug("calculate_simple_efficiency called for file: %s", file_path)
+    logger.debug("Params: ref_v=%s, init_v=%s, r_load=%s, power_in=%s, samp_freq=%s, points=%s",
+                 reference_v, initial_v, r_load, power_input, sampling_freq, points_to_process)
     try:
-        time_once = 1.0 / sampling_freq
-        print(f"[DEBUG] time_once: {time_once:.10f} s")
-        
-    
-        data_df_full = pd.read_csv(file_path, header=None, skiprows=1)
-        print(f"[DEBUG] Full data shape: {data_df_full.shape}")
-        if points_to_process is not None and points_to_process > 0:
-            data_df = data_df_full.head(points_to_process)
-        else:
-            data_df = data_df_full
-        print(f"[DEBUG] Processed data shape: {data_df.shape}")
-        
-        if data_df.empty or data_df.shape[1] < 3:
-            print(f"警告: 数据文件 '{file_path}' 为空或列数不足")
+        engine = EfficiencyEngine.from_file(file_path, reference_v, initial_v, r_load, power_input,
+                                            sampling_freq=sampling_freq, points_to_process=points_to_process,
+                                            channel_map=channel_map, steady_state=steady_state)
+        logger.debug("Processed data shape: (%d, %d)", len(engine.acquisition), engine.acquisition.n_columns)
+
+        if engine.empty or not engine.has_verification:
+            logger.warning("数据文件 '%s' 为空或列数不足", file_path)
             return None
-  
-        t_original = pd.to_numeric(data_df.iloc[:, 0], errors='coerce').to_numpy()
-        time_array = np.arange(len(t_original)) * time_once
-        print(f"[DEBUG] t_original sample (first 5): {t_original[:5]}")
-        print(f"[DEBUG] time_array sample (first 5): {time_array[:5]}")
-        
-        
-        output_v_raw = data_df.iloc[:, 2]
-        print(f"[DEBUG] output_v_raw (AIN2) sample (first 5): {output_v_raw.head().to_numpy()}")
-        output_v = pd.to_numeric(output_v_raw, errors='coerce').to_numpy()
-        print(f"[DEBUG] output_v (numeric) sample (first 5): {output_v[:5]}")
-        output_i = (output_v - initial_v) / reference_v
-        print(f"[DEBUG] output_i (calculated) sample (first 5): {output_i[:5]}")
-        
- 
-        valid_idx = ~np.isnan(output_i) & ~np.isnan(time_array)
-        if not np.any(valid_idx):
-            print("警告: 没有有效数据")
+        if steady_state is not None:
+            logger.debug("steady-state segment: rows %d - %d", engine.acquisition.start_row,
+                         engine.acquisition.start_row + len(engine.acquisition))
+
+        integrals = engine.verification_integrals
+        if integrals["count"] == 0:
+            logger.warning("没有有效数据: %s", file_path)
             return None
-        
-        output_i_cleaned = output_i[valid_idx]
-        time_cleaned = time_array[valid_idx]
-        print(f"[DEBUG] len(output_i_cleaned): {len(output_i_cleaned)}, len(time_cleaned): {len(time_cleaned)}")
-        
-        if len(output_i_cleaned) < 2:
-            print("警告: 有效数据点太少")
+        if integrals["count"] < 2:
+            logger.warning("有效数据点太少: %s", file_path)
             return None
-        
-       
-        output_power = output_i_cleaned**2 * r_load
-        print(f"[DEBUG] output_power sample (first 5): {output_power[:5]}")
-        
-      
-        output_energy = np.trapz(output_power, x=time_cleaned)
-        print(f"[DEBUG] output_energy: {output_energy:.6f} J")
-        
-     
-        input_duration = len(time_cleaned) * time_once
-        print(f"[DEBUG] input_duration: {input_duration:.6f} s")
-        input_energy = power_input * input_duration
-        print(f"[DEBUG] input_energy (power_input * input_duration): {input_energy:.6f} J")
-        
-   
-        efficiency = output_energy / input_energy if input_energy > 0 else 0.0
-        print(f"[DEBUG] Calculated efficiency: {efficiency:.6f} ({efficiency*100:.2f}%)")
-        
-     
-        avg_output_power = np.mean(output_power)
-        max_output_power = np.max(output_power)
-        
+
+        input_energy = power_input * integrals["duration"]
+        efficiency = engine.verification_efficiency
+        logger.debug("output_energy: %.6f J", integrals['output_energy'])
+        logger.debug("input_duration: %.6f s", integrals['duration'])
+        logger.debug("input_energy (power_input * input_duration): %.6f J", input_energy)
+        logger.debug("Calculated efficiency: %.6f (%.2f%%)", efficiency, efficiency * 100)
+
         return {
             "efficiency": efficiency,
-            "avg_output_power": avg_output_power,
-            "max_output_power": max_output_power,
-            "output_energy": output_energy,
+            "avg_output_power": integrals["avg_output_power"],
+            "max_output_power": integrals["max_output_power"],
+            "output_energy": integrals["output_energy"],
             "input_energy": input_energy,
-            "duration": input_duration,
-            "plot_data": {
-                "time": time_cleaned,
-                "current": output_i_cleaned,
-                "power": output_power
-            }
+            "duration": integrals["duration"],
+            "plot_data": engine.verification_plot_data if include_plot_data else _empty_side_results()[0].plot_data
         }
         
     except Exception as e:
-        print(f"简化计算过程中发生错误: {e}")
+        logger.error("简化计算过程中发生错误: %s", e)
         return None
 
-def calculate_unified_efficiencies(zheng_file_path: str, fan_file_path: str,
-                                  reference_v: float, initial_v: float, r_load: float,
-                                  drive_v: float, power_input: float,
-                                  sampling_freq: float = 87500.0,
-                                  points_to_process_zheng: int | None = None,
-                                  points_to_process_fan: int | None = None):
-   
-    results = {
+def _clone_side_results(side):
+    """复制一个部分的结果，逐点数据和通道统计与原结果共用"""
+    return SideResult(side.efficiency, side.stats, side.plot_data)
+
+
+def _effective_points(points_to_process):
+    return points_to_process if points_to_process is not None and points_to_process > 0 else None
+
+
+def _is_same_acquisition(zheng_file_path, fan_file_path, points_to_process_zheng, points_to_process_fan):
+    """正接与反接是否为同一文件且截取点数一致（因素探究模式下的常见用法）"""
+    if _effective_points(points_to_process_zheng) != _effective_points(points_to_process_fan):
+        return False
+    if os.path.abspath(zheng_file_path) == os.path.abspath(fan_file_path):
+        return True
+    try:
+        return os.path.samefile(zheng_file_path, fan_file_path)
+    except OSError:
+        return False
+
+
+class CalculationCancelled(Exception):
+    """cancel_check 返回 True 时中止计算"""
+
+
+def _check_cancelled(cancel_check):
+    if cancel_check is not None and cancel_check():
+        raise CalculationCancelled()
+
+
+def _new_unified_results():
+    return {
         "verification": { 
-            "zheng": {"efficiency": 0.0, "stats": {}, "plot_data": {"time": np.array([]), "current": np.array([]), "power": np.array([])}},
-            "fan": {"efficiency": 0.0, "stats": {}, "plot_data": {"time": np.array([]), "current": np.array([]), "power": np.array([])}},
+            "zheng": None,
+            "fan": None,
             "finished_efficiency": 0.0
         },
         "theoretical": {  
-            "zheng": {"efficiency": 0.0, "stats": {}, "plot_data": {"time": np.array([]), "output_current": np.array([]), "input_current": np.array([]), "output_power": np.array([]), "input_power": np.array([])}},
-            "fan": {"efficiency": 0.0, "stats": {}, "plot_data": {"time": np.array([]), "output_current": np.array([]), "input_current": np.array([]), "output_power": np.array([]), "input_power": np.array([])}},
+            "zheng": None,
+            "fan": None,
             "finished_efficiency": 0.0
         },
         "comparison": { 
@@ -141,205 +130,537 @@ def calculate_unified_efficiencies(zheng_file_path: str, fan_file_path: str,
         }
     }
 
-    try:
-        time_once = 1.0 / sampling_freq 
-        
 
-        data_zheng_df_full = pd.read_csv(zheng_file_path, header=None, skiprows=1)
-        if points_to_process_zheng is not None and points_to_process_zheng > 0:
-            data_zheng_df = data_zheng_df_full.head(points_to_process_zheng)
-        else:
-            data_zheng_df = data_zheng_df_full
-        
-        if data_zheng_df.empty:
-            print(f"警告: 正接数据文件 '{zheng_file_path}' 为空或截取后为空。")
-            return None
-        else:
+def _finalize_unified_results(results):
+    """由正接/反接各自的效率计算综合效率与两种方法的差异"""
+    ver_zheng_eff = max(0, results["verification"]["zheng"]["efficiency"])
+    ver_fan_eff = max(0, results["verification"]["fan"]["efficiency"])
+    results["verification"]["finished_efficiency"] = (ver_zheng_eff * ver_fan_eff) ** 0.5
+
+    theo_zheng_raw = results["theoretical"]["zheng"]["efficiency"]
+    theo_fan_raw = results["theoretical"]["fan"]["efficiency"]
     
-            channel_names = ["AIN1", "AIN2", "AIN3", "AIN4", "AIN5", "AIN6", "AIN7", "AIN8"]
-            for i, channel in enumerate(channel_names):
-                if data_zheng_df.shape[1] > i+1:
-                    results["verification"]["zheng"]["stats"][channel] = _calculate_column_stats(data_zheng_df.iloc[:, i+1])
-                    results["theoretical"]["zheng"]["stats"][channel] = _calculate_column_stats(data_zheng_df.iloc[:, i+1])
-                else:
-                    results["verification"]["zheng"]["stats"][channel] = {"max": np.nan, "min": np.nan, "avg": np.nan}
-                    results["theoretical"]["zheng"]["stats"][channel] = {"max": np.nan, "min": np.nan, "avg": np.nan}
+    theo_zheng_processed = (max(0, theo_zheng_raw)) ** 0.5 * 100
+    theo_fan_processed = (max(0, theo_fan_raw)) ** 0.5 * 100
+    
+    if theo_zheng_processed >= 0 and theo_fan_processed >= 0:
+        results["theoretical"]["finished_efficiency"] = ((theo_zheng_processed * theo_fan_processed) / 10000) ** 0.5
+    else:
+        results["theoretical"]["finished_efficiency"] = 0.0
+        
+    results["theoretical"]["zheng"]["efficiency"] = theo_zheng_processed / 100
+    results["theoretical"]["fan"]["efficiency"] = theo_fan_processed / 100
+
+    results["comparison"]["zheng_diff"] = abs(results["theoretical"]["zheng"]["efficiency"] - results["verification"]["zheng"]["efficiency"])
+    results["comparison"]["fan_diff"] = abs(results["theoretical"]["fan"]["efficiency"] - results["verification"]["fan"]["efficiency"])
+    results["comparison"]["finished_diff"] = abs(results["theoretical"]["finished_efficiency"] - results["verification"]["finished_efficiency"])
+    return results
 
-      
-            t_zheng_original = pd.to_numeric(data_zheng_df.iloc[:, 0], errors='coerce').to_numpy() if data_zheng_df.shape[1] > 0 else np.array([])
-            time_zheng = np.arange(len(t_zheng_original)) * time_once
 
+def calculate_unified_efficiencies(zheng_file_path: str, fan_file_path: str,
+                                  reference_v: float, initial_v: float, r_load: float,
+                                  drive_v: float, power_input: float,
+                                  sampling_freq: float = 87500.0,
+                                  points_to_process_zheng: int | None = None,
+                                  points_to_process_fan: int | None = None,
+                                  channel_map: ChannelMap | None = None,
+                                  include_stats: bool = True,
+                                  include_theoretical: bool = True,
+                                  steady_state: SteadyStateDetector | None = None,
+                                  trace_dtype=np.float64,
+                                  cancel_check=None):
+    """
+    channel_map 指定各实验量所在的通道（默认 AIN 2 / AIN 6 / AIN 7），只解析需要的列。
+    include_stats=False 时不计算通道统计（stats 为空字典），include_theoretical=False 时不计算理论实验，
+    因素探究模式只需验证实验的输出通道。
+    steady_state 不为 None 时，按验证实验输出通道检测每个文件的稳态段，只用稳态段计算效率和统计量。
+    正接/反接的各部分结果为 SideResult（可按字典方式访问），plot_data 为 TraceData：只保存 trace_dtype 精度的电流，
+    时间轴和功率在访问时生成；trace_dtype=None 时不保留逐点数据（plot_data 为空）。
+    cancel_check 为无参数的可调用对象，在每个文件读取前后和计算前检查，返回 True 时停止计算并返回 None。
+    """
    
-            if data_zheng_df.shape[1] > 2:
-          
-                output_v_verification = pd.to_numeric(data_zheng_df.iloc[:, 2], errors='coerce').to_numpy()
-                output_i_verification = (output_v_verification - initial_v) / reference_v
-                
-            
-                valid_idx_ver = ~np.isnan(output_i_verification) & ~np.isnan(time_zheng)
-                
-                if np.any(valid_idx_ver):
-                    output_i_ver_cleaned = output_i_verification[valid_idx_ver]
-                    time_ver_cleaned = time_zheng[valid_idx_ver]
-                    
-                    if len(output_i_ver_cleaned) >= 2:
-                      
-                        output_power_ver = output_i_ver_cleaned**2 * r_load
-                        
-                        results["verification"]["zheng"]["plot_data"]["time"] = time_ver_cleaned
-                        results["verification"]["zheng"]["plot_data"]["current"] = output_i_ver_cleaned
-                        results["verification"]["zheng"]["plot_data"]["power"] = output_power_ver
-                        
-                  
-                        output_energy = np.trapz(output_power_ver, x=time_ver_cleaned)
-                        input_duration = len(time_ver_cleaned) * time_once
-                        input_energy = power_input * input_duration
-                        
-                        if input_energy > 0:
-                            results["verification"]["zheng"]["efficiency"] = output_energy / input_energy
+    results = _new_unified_results()
+    engine_params = (reference_v, initial_v, r_load, power_input, drive_v, sampling_freq)
+    load_options = {"channel_map": channel_map, "steady_state": steady_state,
+                    "include_stats": include_stats, "include_theoretical": include_theoretical,
+                    "trace_dtype": np.float64 if trace_dtype is None else trace_dtype}
+    side_options = {"include_stats": include_stats, "include_plot_data": trace_dtype is not None}
 
-       
-            if data_zheng_df.shape[1] > 7:
-                output_v_theoretical = pd.to_numeric(data_zheng_df.iloc[:, 6], errors='coerce').to_numpy()
-                output_i_theoretical = (output_v_theoretical - initial_v) / reference_v
-                
-                input_v_theoretical = pd.to_numeric(data_zheng_df.iloc[:, 7], errors='coerce').to_numpy()
-                input_i_theoretical = (input_v_theoretical - initial_v) / reference_v
-                
-                valid_idx_theo = ~np.isnan(output_i_theoretical) & ~np.isnan(input_i_theoretical) & ~np.isnan(time_zheng)
-                
-                if np.any(valid_idx_theo):
-                    output_i_theo_cleaned = output_i_theoretical[valid_idx_theo]
-                    input_i_theo_cleaned = input_i_theoretical[valid_idx_theo]
-                    time_theo_cleaned = time_zheng[valid_idx_theo]
-                    
-                    if len(output_i_theo_cleaned) >= 2:
-                        output_power_theo = output_i_theo_cleaned**2 * r_load
-                        input_power_theo = drive_v * input_i_theo_cleaned
-                        
-                        results["theoretical"]["zheng"]["plot_data"]["time"] = time_theo_cleaned
-                        results["theoretical"]["zheng"]["plot_data"]["output_current"] = output_i_theo_cleaned
-                        results["theoretical"]["zheng"]["plot_data"]["input_current"] = input_i_theo_cleaned
-                        results["theoretical"]["zheng"]["plot_data"]["output_power"] = output_power_theo
-                        results["theoretical"]["zheng"]["plot_data"]["input_power"] = input_power_theo
-                        
-                        numerator = np.trapz(output_power_theo, x=time_theo_cleaned)
-                        denominator = np.trapz(input_power_theo, x=time_theo_cleaned)
-                        
-                        if denominator > 0:
-                            results["theoretical"]["zheng"]["efficiency"] = numerator / denominator
+    try:
+        _check_cancelled(cancel_check)
+        engine_zheng = EfficiencyEngine.from_file(zheng_file_path, *engine_params,
+                                                  points_to_process=points_to_process_zheng, **load_options)
+        _check_cancelled(cancel_check)
+        if engine_zheng.empty:
+            logger.warning("正接数据文件 '%s' 为空或截取后为空。", zheng_file_path)
+            return None
+        ver_zheng, theo_zheng = engine_zheng.side_results(**side_options)
+        results["verification"]["zheng"] = ver_zheng
+        results["theoretical"]["zheng"] = theo_zheng
 
-       
-        data_fan_df_full = pd.read_csv(fan_file_path, header=None, skiprows=1)
-        if points_to_process_fan is not None and points_to_process_fan > 0:
-            data_fan_df = data_fan_df_full.head(points_to_process_fan)
+        del engine_zheng
+
+        # 因素探究模式下正接/反接传入同一文件：复用已解析的数据和计算结果，避免重复读取与计算
+        if _is_same_acquisition(zheng_file_path, fan_file_path, points_to_process_zheng, points_to_process_fan):
+            results["verification"]["fan"] = _clone_side_results(ver_zheng)
+            results["theoretical"]["fan"] = _clone_side_results(theo_zheng)
         else:
-            data_fan_df = data_fan_df_full
+            _check_cancelled(cancel_check)
+            engine_fan = EfficiencyEngine.from_file(fan_file_path, *engine_params,
+                                                    points_to_process=points_to_process_fan, **load_options)
+            _check_cancelled(cancel_check)
+            if not engine_fan.empty:
+                ver_fan, theo_fan = engine_fan.side_results(**side_options)
+            else:
+                ver_fan, theo_fan = _empty_side_results()
+            results["verification"]["fan"] = ver_fan
+            results["theoretical"]["fan"] = theo_fan
 
-        if not data_fan_df.empty:
-           
-            for i, channel in enumerate(channel_names):
-                if data_fan_df.shape[1] > i+1:
-                    results["verification"]["fan"]["stats"][channel] = _calculate_column_stats(data_fan_df.iloc[:, i+1])
-                    results["theoretical"]["fan"]["stats"][channel] = _calculate_column_stats(data_fan_df.iloc[:, i+1])
-                else:
-                    results["verification"]["fan"]["stats"][channel] = {"max": np.nan, "min": np.nan, "avg": np.nan}
-                    results["theoretical"]["fan"]["stats"][channel] = {"max": np.nan, "min": np.nan, "avg": np.nan}
-
-            t_fan_original = pd.to_numeric(data_fan_df.iloc[:, 0], errors='coerce').to_numpy() if data_fan_df.shape[1] > 0 else np.array([])
-            time_fan = np.arange(len(t_fan_original)) * time_once
-
-            if data_fan_df.shape[1] > 2:
-                output_v_verification_fan = pd.to_numeric(data_fan_df.iloc[:, 2], errors='coerce').to_numpy()
-                output_i_verification_fan = (output_v_verification_fan - initial_v) / reference_v
-                
-                valid_idx_ver_fan = ~np.isnan(output_i_verification_fan) & ~np.isnan(time_fan)
-                
-                if np.any(valid_idx_ver_fan):
-                    output_i_ver_fan_cleaned = output_i_verification_fan[valid_idx_ver_fan]
-                    time_ver_fan_cleaned = time_fan[valid_idx_ver_fan]
-                    
-                    if len(output_i_ver_fan_cleaned) >= 2:
-                        output_power_ver_fan = output_i_ver_fan_cleaned**2 * r_load
-                        
-                        results["verification"]["fan"]["plot_data"]["time"] = time_ver_fan_cleaned
-                        results["verification"]["fan"]["plot_data"]["current"] = output_i_ver_fan_cleaned
-                        results["verification"]["fan"]["plot_data"]["power"] = output_power_ver_fan
-                        
-                        output_energy_fan = np.trapz(output_power_ver_fan, x=time_ver_fan_cleaned)
-                        input_duration_fan = len(time_ver_fan_cleaned) * time_once
-                        input_energy_fan = power_input * input_duration_fan
-                        
-                        if input_energy_fan > 0:
-                            results["verification"]["fan"]["efficiency"] = output_energy_fan / input_energy_fan
-
-            if data_fan_df.shape[1] > 7:
-                output_v_theoretical_fan = pd.to_numeric(data_fan_df.iloc[:, 6], errors='coerce').to_numpy()
-                output_i_theoretical_fan = (output_v_theoretical_fan - initial_v) / reference_v
-                
-                input_v_theoretical_fan = pd.to_numeric(data_fan_df.iloc[:, 7], errors='coerce').to_numpy()
-                input_i_theoretical_fan = (input_v_theoretical_fan - initial_v) / reference_v
-                
-                valid_idx_theo_fan = ~np.isnan(output_i_theoretical_fan) & ~np.isnan(input_i_theoretical_fan) & ~np.isnan(time_fan)
-                
-                if np.any(valid_idx_theo_fan):
-                    output_i_theo_fan_cleaned = output_i_theoretical_fan[valid_idx_theo_fan]
-                    input_i_theo_fan_cleaned = input_i_theoretical_fan[valid_idx_theo_fan]
-                    time_theo_fan_cleaned = time_fan[valid_idx_theo_fan]
-                    
-                    if len(output_i_theo_fan_cleaned) >= 2:
-                        output_power_theo_fan = output_i_theo_fan_cleaned**2 * r_load
-                        input_power_theo_fan = drive_v * input_i_theo_fan_cleaned
-                        
-                        results["theoretical"]["fan"]["plot_data"]["time"] = time_theo_fan_cleaned
-                        results["theoretical"]["fan"]["plot_data"]["output_current"] = output_i_theo_fan_cleaned
-                        results["theoretical"]["fan"]["plot_data"]["input_current"] = input_i_theo_fan_cleaned
-                        results["theoretical"]["fan"]["plot_data"]["output_power"] = output_power_theo_fan
-                        results["theoretical"]["fan"]["plot_data"]["input_power"] = input_power_theo_fan
-                        
-                        numerator_fan = np.trapz(output_power_theo_fan, x=time_theo_fan_cleaned)
-                        denominator_fan = np.trapz(input_power_theo_fan, x=time_theo_fan_cleaned)
-                        
-                        if denominator_fan > 0:
-                            results["theoretical"]["fan"]["efficiency"] = numerator_fan / denominator_fan
+        return _finalize_unified_results(results)
 
-       
-        ver_zheng_eff = max(0, results["verification"]["zheng"]["efficiency"])
-        ver_fan_eff = max(0, results["verification"]["fan"]["efficiency"])
-        results["verification"]["finished_efficiency"] = (ver_zheng_eff * ver_fan_eff) ** 0.5
+    except CalculationCancelled:
+        logger.info("计算已取消")
+        return None
+    except FileNotFoundError as e:
+        logger.error("CSV文件未找到。 %s", e)
+        return None
+    except pd.errors.EmptyDataError as e:
+        logger.error("CSV文件为空或解析后无数据。 %s", e)
+        return None
+    except pd.errors.ParserError as e:
+        logger.error("解析CSV文件时出错。请检查文件格式。 %s", e)
+        return None
+    except Exception as e:
+        logger.exception("统一计算过程中发生未预料的错误: %s", e)
+        return None 
 
-        theo_zheng_raw = results["theoretical"]["zheng"]["efficiency"]
-        theo_fan_raw = results["theoretical"]["fan"]["efficiency"]
-        
-        theo_zheng_processed = (max(0, theo_zheng_raw)) ** 0.5 * 100
-        theo_fan_processed = (max(0, theo_fan_raw)) ** 0.5 * 100
-        
-        if theo_zheng_processed >= 0 and theo_fan_processed >= 0:
-            results["theoretical"]["finished_efficiency"] = ((theo_zheng_processed * theo_fan_processed) / 10000) ** 0.5
-        else:
-            results["theoretical"]["finished_efficiency"] = 0.0
-            
-        results["theoretical"]["zheng"]["efficiency"] = theo_zheng_processed / 100
-        results["theoretical"]["fan"]["efficiency"] = theo_fan_processed / 100
 
-        results["comparison"]["zheng_diff"] = abs(results["theoretical"]["zheng"]["efficiency"] - results["verification"]["zheng"]["efficiency"])
-        results["comparison"]["fan_diff"] = abs(results["theoretical"]["fan"]["efficiency"] - results["verification"]["fan"]["efficiency"])
-        results["comparison"]["finished_diff"] = abs(results["theoretical"]["finished_efficiency"] - results["verification"]["finished_efficiency"])
+class _StreamingSideAccumulator:
+    """
+    逐块累积单个数据文件的验证/理论实验结果。
+
+    梯形积分在块边界处携带上一块最后一个有效样本，因此与整体计算的结果一致；
+    通道统计量以 channel_moments 的形式逐块累积。不保留逐点的绘图数据。
+    """
+
+    def __init__(self, channels, time_once, reference_v, initial_v, r_load, drive_v, power_input, include_stats=True):
+        self.channels = channels
+        self.include_stats = include_stats
+        self.time_once = time_once
+        self.reference_v = reference_v
+        self.initial_v = initial_v
+        self.r_load = r_load
+        self.drive_v = drive_v
+        self.power_input = power_input
+
+        self.n_rows = 0
+        self.has_verification = False
+        self.has_theoretical = False
+        self.stats_columns = None
+        self.moments = None
 
-        return results
+        # 验证/理论实验的能量积分由 fused_side_integrals 逐块累积，块边界处的梯形衔接由其状态负责
+        self.integrals = new_fused_state()
 
+    def update(self, chunk):
+        n = len(chunk)
+        self.n_rows += n
+        if n == 0:
+            return
+
+        if self.stats_columns is None:
+            self.stats_columns = _stats_columns(chunk) if self.include_stats else []
+        if self.stats_columns:
+            block = np.stack([chunk[column] for column in self.stats_columns])
+            shift = self.moments["shift"] if self.moments is not None else None
+            self.moments = merge_channel_moments(self.moments, channel_moments(block, shift))
+
+        ver_column = self.channels["verification_output"]
+        theo_output_column = self.channels["theoretical_output"]
+        theo_input_column = self.channels["theoretical_input"]
+
+        ver_v = chunk[ver_column] if ver_column in chunk else None
+        theo_output_v = theo_input_v = None
+        if theo_output_column in chunk and theo_input_column in chunk:
+            theo_output_v = chunk[theo_output_column]
+            theo_input_v = chunk[theo_input_column]
+        self.has_verification |= ver_v is not None
+        self.has_theoretical |= theo_output_v is not None
+        fused_side_integrals(ver_v, theo_output_v, theo_input_v,
+                             self.initial_v, self.reference_v, self.r_load, self.drive_v, self.time_once,
+                             self.integrals)
+        # 两部分的通道都缺失时 fused_side_integrals 不知道块长度，由这里统一推进行号
+        self.integrals[FUSED_ROWS] = self.n_rows
+
+    def results(self):
+        """返回与 _calculate_side_efficiencies 相同结构的 (verification, theoretical)，绘图数据为空"""
+        verification, theoretical = _empty_side_results()
+
+        if self.include_stats:
+            stats = _stats_from_moments(self.stats_columns or [], self.moments)
+            verification["stats"] = stats
+            theoretical["stats"] = stats
+
+        integrals = self.integrals
+        ver_count = integrals[FUSED_VER_COUNT]
+        if self.has_verification and ver_count >= 2:
+            input_energy = self.power_input * (ver_count * self.time_once)
+            if input_energy > 0:
+                verification["efficiency"] = integrals[FUSED_VER_ENERGY] / input_energy
+
+        theo_input_energy = integrals[FUSED_THEO_INPUT_ENERGY]
+        if self.has_theoretical and integrals[FUSED_THEO_COUNT] >= 2 and theo_input_energy > 0:
+            theoretical["efficiency"] = integrals[FUSED_THEO_OUTPUT_ENERGY] / theo_input_energy
+
+        return verification, theoretical
+
+
+def _stream_side_efficiencies(file_path, points_to_process, chunksize, channel_map, include_stats, include_theoretical,
+                              time_once, *side_params, cancel_check=None):
+    channels, columns = _resolve_load_plan(file_path, channel_map, include_stats, include_theoretical)
+    accumulator = _StreamingSideAccumulator(channels, time_once, *side_params, include_stats=include_stats)
+    chunks = iter_acquisition_chunks(file_path, columns=columns, points_to_process=points_to_process, chunksize=chunksize)
+    try:
+        for chunk in chunks:
+            _check_cancelled(cancel_check)
+            accumulator.update(chunk)
+    finally:
+        chunks.close()
+    return accumulator
+
+
+def calculate_unified_efficiencies_streaming(zheng_file_path: str, fan_file_path: str,
+                                            reference_v: float, initial_v: float, r_load: float,
+                                            drive_v: float, power_input: float,
+                                            sampling_freq: float = 87500.0,
+                                            points_to_process_zheng: int | None = None,
+                                            points_to_process_fan: int | None = None,
+                                            chunksize: int = 500_000,
+                                            channel_map: ChannelMap | None = None,
+                                            include_stats: bool = True,
+                                            include_theoretical: bool = True,
+                                            cancel_check=None):
+    """
+    calculate_unified_efficiencies 的分块流式版本，用于超出内存的长时间采集文件。
+
+    按 chunksize 行分块读取CSV并累积能量、时长和各通道统计量，效率与统计结果与整体计算一致，
+    峰值内存只与 chunksize 有关。返回结构相同，但 plot_data 中的数组为空。
+    channel_map、include_stats、include_theoretical 的含义与 calculate_unified_efficiencies 相同，
+    cancel_check 在每块数据处理前检查。
+    """
+    load_options = (channel_map, include_stats, include_theoretical)
+    results = _new_unified_results()
+    side_params = (reference_v, initial_v, r_load, drive_v, power_input)
+
+    try:
+        time_once = 1.0 / sampling_freq
+
+        zheng_acc = _stream_side_efficiencies(zheng_file_path, points_to_process_zheng, chunksize, *load_options, time_once,
+                                              *side_params, cancel_check=cancel_check)
+        if zheng_acc.n_rows == 0:
+            logger.warning("正接数据文件 '%s' 为空或截取后为空。", zheng_file_path)
+            return None
+        ver_zheng, theo_zheng = zheng_acc.results()
+        results["verification"]["zheng"] = ver_zheng
+        results["theoretical"]["zheng"] = theo_zheng
+
+        if _is_same_acquisition(zheng_file_path, fan_file_path, points_to_process_zheng, points_to_process_fan):
+            results["verification"]["fan"] = _clone_side_results(ver_zheng)
+            results["theoretical"]["fan"] = _clone_side_results(theo_zheng)
+        else:
+            fan_acc = _stream_side_efficiencies(fan_file_path, points_to_process_fan, chunksize, *load_options, time_once,
+                                                *side_params, cancel_check=cancel_check)
+            ver_fan, theo_fan = fan_acc.results() if fan_acc.n_rows > 0 else _empty_side_results()
+            results["verification"]["fan"] = ver_fan
+            results["theoretical"]["fan"] = theo_fan
+
+        return _finalize_unified_results(results)
+
+    except CalculationCancelled:
+        logger.info("计算已取消")
+        return None
     except FileNotFoundError as e:
-        print(f"错误: CSV文件未找到。 {e}")
+        logger.error("CSV文件未找到。 %s", e)
         return None
     except pd.errors.EmptyDataError as e:
-        print(f"错误: CSV文件为空或解析后无数据。 {e}") 
+        logger.error("CSV文件为空或解析后无数据。 %s", e)
         return None
     except pd.errors.ParserError as e:
-        print(f"错误: 解析CSV文件时出错。请检查文件格式。 {e}")
+        logger.error("解析CSV文件时出错。请检查文件格式。 %s", e)
         return None
     except Exception as e:
-        print(f"统一计算过程中发生未预料的错误: {e}")
-        return None 
+        logger.exception("流式计算过程中发生未预料的错误: %s", e)
+        return None
+
+
+class LiveEfficiencyMonitor:
+    """
+    实时监测仍在写入中的单个数据文件。
+
+    每次 poll() 只解析新增的完整行（CsvTailReader），并以 _StreamingSideAccumulator 从上次的位置继续累积能量积分和通道统计，
+    单次更新的耗时只与新增数据量有关。efficiency_history 为最近 history_size 次更新后的效率（有界队列），
+    trace_time/trace_current 为最近 trace_seconds 秒的验证实验输出电流，供界面绘图。
+
+    stream 为 daq_stream.StreamIngestServer 时改为读取网络数据流（file_path 可为 None），
+    snapshot() 另给出最近 rolling_seconds 秒的滚动效率和通道统计（rolling）。
+    last_snapshot 为最近一次有新数据的 poll() 计算出的 snapshot()，界面刷新时直接使用，不再重复计算。
+    """
+
+    def __init__(self, file_path: str | None, reference_v: float, initial_v: float, r_load: float,
+                 drive_v: float, power_input: float, sampling_freq: float = 87500.0,
+                 channel_map: ChannelMap | None = None, history_size: int = 2000, trace_seconds: float = 2.0,
+                 max_bytes_per_poll: int = 8 * 1024 * 1024, stream=None, rolling_seconds: float = 1.0):
+        self.file_path = file_path
+        self.stream = stream
+        self.side_params = (reference_v, initial_v, r_load, drive_v, power_input)
+        self.sampling_freq = sampling_freq
+        self.time_once = 1.0 / sampling_freq
+        self.channel_map = channel_map
+        self.trace_samples = max(int(trace_seconds * sampling_freq), 1)
+        self.rolling_samples = max(int(rolling_seconds * sampling_freq), 2)
+        self.efficiency_history = deque(maxlen=history_size)
+        self.channels = None
+        self.accumulator = None
+        self.trace_time = np.array([])
+        self.trace_current = np.array([])
+        self.last_snapshot = None
+        if stream is None:
+            self.reader = CsvTailReader(file_path, columns=self._start_acquisition, max_bytes=max_bytes_per_poll)
+        else:
+            # 数据流每个采样 8 个 float32，按同样的字节数限制单次读取的采样数
+            self.reader = stream.open_reader(columns=self._start_acquisition, max_rows=max_bytes_per_poll // 32)
+
+    def _start_acquisition(self, header):
+        # 读到表头时（包括文件被重新写入后）重新开始累积
+        channels = (self.channel_map or ChannelMap()).resolve(header)
+        self.channels, columns = _load_plan(channels, len(header), include_stats=True, include_theoretical=True)
+        self.accumulator = _StreamingSideAccumulator(self.channels, self.time_once, *self.side_params)
+        self.efficiency_history.clear()
+        self.trace_time = np.array([])
+        self.trace_current = np.array([])
+        self.last_snapshot = None
+        return columns
+
+    def poll(self):
+        """读取并处理新增的数据，返回新增行数；有新数据时更新 last_snapshot"""
+        chunk = self.reader.read_new()
+        if chunk.empty:
+            return 0
+        self.accumulator.update(chunk)
+
+        reference_v, initial_v = self.side_params[0], self.side_params[1]
+        ver_column = self.channels["verification_output"]
+        if ver_column in chunk:
+            current = (chunk[ver_column] - initial_v) / reference_v
+            time_array = (chunk.start_row + np.arange(len(chunk))) * self.time_once
+            self.trace_time = np.concatenate((self.trace_time, time_array))[-self.trace_samples:]
+            self.trace_current = np.concatenate((self.trace_current, current))[-self.trace_samples:]
+
+        snapshot = self.last_snapshot = self.snapshot()
+        self.efficiency_history.append((snapshot["duration"], snapshot["verification_efficiency"],
+                                        snapshot["theoretical_efficiency"]))
+        return len(chunk)
+
+    def snapshot(self):
+        """
+        当前累计结果：rows、duration (s)、verification_efficiency、theoretical_efficiency（已开方，
+        与 calculate_unified_efficiencies 中单个文件的理论效率相同）以及各通道统计 stats。
+        """
+        if self.accumulator is None:
+            return {"rows": 0, "duration": 0.0, "verification_efficiency": 0.0,
+                    "theoretical_efficiency": 0.0, "stats": {}}
+        verification, theoretical = self.accumulator.results()
+        return {
+            "rows": self.accumulator.n_rows,
+            "duration": self.accumulator.n_rows * self.time_once,
+            "verification_efficiency": verification["efficiency"],
+            "theoretical_efficiency": max(0.0, theoretical["efficiency"]) ** 0.5,
+            "stats": verification["stats"],
+            **self._rolling_snapshot()
+        }
+
+    def _rolling_snapshot(self):
+        # 只复制环形缓冲区中最近 rolling_samples 个采样，用与单个文件相同的公式计算
+        if self.stream is None:
+            return {}
+        window = self.reader.read_tail(self.rolling_samples)
+        rolling = {"verification_efficiency": 0.0, "theoretical_efficiency": 0.0, "stats": {}}
+        if not window.empty:
+            reference_v, initial_v, r_load, drive_v, power_input = self.side_params
+            engine = EfficiencyEngine(window, self.channels, reference_v, initial_v, r_load, power_input, drive_v,
+                                      self.sampling_freq)
+            verification, theoretical = engine.side_results(include_plot_data=False)
+            rolling = {
+                "verification_efficiency": verification["efficiency"],
+                "theoretical_efficiency": max(0.0, theoretical["efficiency"]) ** 0.5,
+                "stats": verification["stats"]
+            }
+        return {"rolling": rolling, "lost_rows": self.reader.lost_rows}
+
+
+def _weighted_moments(values, weights):
+    """以样本均值为中心的加权零/一/二阶矩 (S0, S1, S2) 及中心值，用于按校准参数展开能量积分"""
+    center = float(np.mean(values))
+    centered = values - center
+    weighted = weights * centered
+    return float(np.sum(weights)), float(np.sum(weighted)), float(np.dot(weighted, centered)), center
+
+
+def sweep_calibration_parameters(file_path: str, reference_v, initial_v, r_load, power_input,
+                                 drive_v: float | None = None,
+                                 sampling_freq: float = 87500.0,
+                                 points_to_process: int | None = None,
+                                 channel_map: ChannelMap | None = None):
+    """
+    对同一次采集，在 reference_v、initial_v、r_load、power_input 的参数网格上一次性计算效率。
+
+    每个参数可以是标量或一组取值，结果为所有取值的笛卡尔积。文件只读取一次；
+    输出功率 R*((v-iv)/rv)^2 的积分按 v 的加权矩展开为 R/rv^2*(S2 - 2*d*S1 + d^2*S0)（d 为 iv 相对样本均值的偏移），
+    整个网格由一次广播运算得到。efficiency 与因素探究模式（正接/反接为同一文件）的验证实验效率一致；
+    提供 drive_v 且文件包含理论实验通道时，另给出 theoretical_efficiency。
+    返回每个参数组合一行的 DataFrame，文件为空时返回 None。
+    """
+    time_once = 1.0 / sampling_freq
+    include_theoretical = drive_v is not None
+    channels, columns = _resolve_load_plan(file_path, channel_map, include_stats=False,
+                                           include_theoretical=include_theoretical)
+    with stage("parse", file_path):
+        acquisition = read_acquisition(file_path, columns=columns, points_to_process=points_to_process)
+    if acquisition.empty:
+        return None
+
+    grids = np.meshgrid(np.atleast_1d(np.asarray(reference_v, dtype=np.float64)),
+                        np.atleast_1d(np.asarray(initial_v, dtype=np.float64)),
+                        np.atleast_1d(np.asarray(r_load, dtype=np.float64)),
+                        np.atleast_1d(np.asarray(power_input, dtype=np.float64)),
+                        indexing='ij')
+    rv, iv, r, p_in = (grid.ravel() for grid in grids)
+    sweep = pd.DataFrame({"reference_v": rv, "initial_v": iv, "r_load": r, "power_input": p_in})
+
+    output_energy = np.zeros(len(sweep))
+    duration = 0.0
+    avg_output_power = np.zeros(len(sweep))
+    max_output_power = np.zeros(len(sweep))
+    ver_column = channels["verification_output"]
+    if ver_column in acquisition:
+        output_v = acquisition[ver_column]
+        valid = ~np.isnan(output_v)
+        v = output_v[valid]
+        n = len(v)
+        if n >= 2:
+            scale = r / rv**2
+            s0, s1, s2, center = _weighted_moments(v, trapz_weights(n, time_once, valid_sample_index(valid)))
+            d = iv - center
+            output_energy = scale * (s2 - 2 * d * s1 + d**2 * s0)
+            m0, m1, m2, _ = _weighted_moments(v, np.ones(n))
+            avg_output_power = scale * (m2 - 2 * d * m1 + d**2 * m0) / n
+            max_output_power = scale * np.maximum(np.abs(v.max() - iv), np.abs(v.min() - iv))**2
+            duration = n * time_once
+
+    input_energy = p_in * duration
+    safe_input = np.where(input_energy > 0, input_energy, 1.0)
+    sweep["efficiency"] = np.where(input_energy > 0, np.maximum(output_energy / safe_input, 0.0), 0.0)
+    sweep["output_energy"] = output_energy
+    sweep["duration"] = duration
+    sweep["avg_output_power"] = avg_output_power
+    sweep["max_output_power"] = max_output_power
+
+    theo_output_column = channels["theoretical_output"]
+    theo_input_column = channels["theoretical_input"]
+    if include_theoretical and theo_output_column in acquisition and theo_input_column in acquisition:
+        valid = ~np.isnan(acquisition[theo_output_column]) & ~np.isnan(acquisition[theo_input_column])
+        v_out = acquisition[theo_output_column][valid]
+        v_in = acquisition[theo_input_column][valid]
+        efficiency = np.zeros(len(sweep))
+        if len(v_out) >= 2:
+            weights = trapz_weights(len(v_out), time_once, valid_sample_index(valid))
+            s0, s1, s2, center_out = _weighted_moments(v_out, weights)
+            d = iv - center_out
+            numerator = r / rv**2 * (s2 - 2 * d * s1 + d**2 * s0)
+            _, s1_in, _, center_in = _weighted_moments(v_in, weights)
+            denominator = drive_v / rv * (s1_in - (iv - center_in) * s0)
+            safe_denominator = np.where(denominator > 0, denominator, 1.0)
+            efficiency = np.where(denominator > 0, np.sqrt(np.maximum(numerator / safe_denominator, 0.0)), 0.0)
+        sweep["theoretical_efficiency"] = efficiency
+
+    return sweep
+
+
+def _windowed_frame(method, valid, window, hop, time_once, efficiency, avg_output_power, start_row=0):
+    positions = np.flatnonzero(valid) + start_row
+    starts = window_starts(len(positions), window, hop)
+    return pd.DataFrame({
+        "method": method,
+        "time": (positions[starts] + positions[starts + window - 1]) * 0.5 * time_once,
+        "efficiency": efficiency,
+        "avg_output_power": avg_output_power
+    })
+
+
+def calculate_windowed_efficiencies(file_path: str, reference_v: float, initial_v: float, r_load: float,
+                                    drive_v: float, power_input: float,
+                                    window_seconds: float, hop_seconds: float | None = None,
+                                    sampling_freq: float = 87500.0,
+                                    points_to_process: int | None = None,
+                                    channel_map: ChannelMap | None = None,
+                                    steady_state: SteadyStateDetector | None = None):
+    """
+    单个数据文件的滑动窗口效率序列，用于观察一次采集内的预热过程和热漂移。
+
+    每个窗口包含 window_seconds 对应数量的有效样本，相邻窗口起点相隔 hop_seconds（默认等于窗口长度，即不重叠）。
+    验证实验：窗口效率 = 窗口内输出能量 / (平均输入功率 * 窗口时长)；
+    理论实验：窗口效率 = sqrt(窗口内输出能量 / 输入能量)，与 calculate_unified_efficiencies 的单文件效率定义一致。
+    channel_map、steady_state 的含义与 calculate_unified_efficiencies 相同，截取稳态段时只对稳态段划分窗口。
+    基于前缀和计算，耗时与窗口长度无关。
+    返回 DataFrame，列为 method（"verification"/"theoretical"）、time（窗口中心在原始文件中的时刻, s）、efficiency、avg_output_power；
+    文件为空时返回 None。
+    """
+    time_once = 1.0 / sampling_freq
+    window = max(int(round(window_seconds * sampling_freq)), 2)
+    hop = max(int(round((hop_seconds or window_seconds) * sampling_freq)), 1)
+
+    channels, columns = _resolve_load_plan(file_path, channel_map, include_stats=False, include_theoretical=True)
+    with stage("parse", file_path):
+        acquisition = read_acquisition(file_path, columns=columns, points_to_process=points_to_process)
+    if steady_state is not None and not acquisition.empty:
+        with stage("steady_state", file_path):
+            acquisition = steady_state.trim(acquisition, channels["verification_output"], initial_v, sampling_freq)
+    if acquisition.empty:
+        return None
+
+    frames = []
+    start_row = acquisition.start_row
+    ver_column = channels["verification_output"]
+    if ver_column in acquisition:
+        output_i = (acquisition[ver_column] - initial_v) / reference_v
+        valid = ~np.isnan(output_i)
+        output_power = output_i[valid]**2 * r_load
+        output_energy = windowed_trapz(output_power, time_once, window, hop, valid_sample_index(valid))
+        input_energy = power_input * window * time_once
+        efficiency = output_energy / input_energy if input_energy > 0 else np.zeros(len(output_energy))
+        frames.append(_windowed_frame("verification", valid, window, hop, time_once, efficiency,
+                                      windowed_mean(output_power, window, hop), start_row))
+
+    theo_output_column = channels["theoretical_output"]
+    theo_input_column = channels["theoretical_input"]
+    if theo_output_column in acquisition and theo_input_column in acquisition:
+        output_i = (acquisition[theo_output_column] - initial_v) / reference_v
+        input_i = (acquisition[theo_input_column] - initial_v) / reference_v
+        valid = ~np.isnan(output_i) & ~np.isnan(input_i)
+        output_power = output_i[valid]**2 * r_load
+        input_power = drive_v * input_i[valid]
+        index = valid_sample_index(valid)
+        numerator = windowed_trapz(output_power, time_once, window, hop, index)
+        denominator = windowed_trapz(input_power, time_once, window, hop, index)
+        positive = denominator > 0
+        efficiency = np.zeros(len(numerator))
+        efficiency[positive] = np.sqrt(np.maximum(numerator[positive] / denominator[positive], 0.0))
+        frames.append(_windowed_frame("theoretical", valid, window, hop, time_once, efficiency,
+                                      windowed_mean(output_power, window, hop), start_row))
+
+    if not frames:
+        return pd.DataFrame(columns=["method", "time", "efficiency", "avg_output_power"])
+    return pd.concat(frames, ignore_index=True)
 
 
 
@@ -356,6 +677,8 @@ class ExperimentConfig:
             'sampling_freq': 87500.0  
         }
         self.is_factor_exploration_mode = is_factor_exploration_mode 
+        self.channel_map = ChannelMap()
+        self.steady_state = None
     
     def configure_voltage_exploration(self, voltage_levels, r_load_fixed=None):
      
@@ -411,6 +734,8 @@ class ExperimentConfig:
             'fixed_params': self.fixed_params,
             'variable_params': self.variable_params,
             'common_params': self.common_params,
+            'channel_map': self.channel_map.to_dict(),
+            'steady_state': self.steady_state.to_dict() if self.steady_state is not None else None,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -427,186 +752,524 @@ class ExperimentConfig:
         config.fixed_params = config_data['fixed_params']
         config.variable_params = config_data['variable_params']
         config.common_params = config_data['common_params']
+        config.channel_map = ChannelMap.from_dict(config_data.get('channel_map'))
+        config.steady_state = SteadyStateDetector.from_dict(config_data.get('steady_state'))
         
         return config
 
 
+class EnergyIntegralCache:
+    """
+    验证实验积分量的LRU缓存（OrderedDict 实现）。
+
+    键为文件标识（绝对路径、大小、修改时间）加上影响信号的参数（reference_v、initial_v、r_load、
+    sampling_freq、截取点数、输出通道、稳态检测参数），值为 calculate_verification_integrals 的结果。
+    效率 = 输出能量 / (平均输入功率 * 时长)，因此只修改输入功率时可直接由缓存得到结果。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(file_path, reference_v, initial_v, r_load, sampling_freq, points_to_process=None, channel_map=None,
+                 steady_state=None):
+        st = os.stat(file_path)
+        output_channel = ChannelMap.normalize((channel_map or ChannelMap()).verification_output)
+        steady_key = None if steady_state is None else (float(steady_state.window_seconds), float(steady_state.rel_tol))
+        return (os.path.abspath(file_path), st.st_size, st.st_mtime_ns,
+                float(reference_v), float(initial_v), float(r_load), float(sampling_freq),
+                _effective_points(points_to_process), output_channel, steady_key)
+
+    def get(self, key):
+        integrals = self._entries.get(key)
+        if integrals is not None:
+            self._entries.move_to_end(key)
+        return integrals
+
+    def put(self, key, integrals):
+        self._entries[key] = integrals
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, file_path=None):
+        """删除某个文件的全部缓存结果，file_path 为 None 时清空缓存"""
+        if file_path is None:
+            self._entries.clear()
+            return
+        path = os.path.abspath(file_path)
+        for key in [key for key in self._entries if key[0] == path]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_default_integral_cache = EnergyIntegralCache()
+
+
+def get_integral_cache():
+    return _default_integral_cache
+
+
+def calculate_verification_integrals(file_path: str, reference_v: float, initial_v: float, r_load: float,
+                                     sampling_freq: float = 87500.0, points_to_process: int | None = None,
+                                     channel_map: ChannelMap | None = None,
+                                     steady_state: SteadyStateDetector | None = None):
+    """
+    只读取验证实验的输出通道，计算与输入功率无关的积分量：
+    output_energy、duration、avg_output_power、max_output_power。文件为空时返回 None。
+    steady_state 不为 None 时只积分检测到的稳态段。
+    """
+    # 输入功率不参与积分量的计算，此处取 0
+    engine = EfficiencyEngine.from_file(file_path, reference_v, initial_v, r_load, 0.0, sampling_freq=sampling_freq,
+                                        points_to_process=points_to_process, channel_map=channel_map,
+                                        steady_state=steady_state)
+    if engine.empty:
+        return None
+
+    integrals = {"output_energy": 0.0, "duration": 0.0, "avg_output_power": 0, "max_output_power": 0}
+    verification = engine.verification_integrals
+    if verification["count"] >= 2:
+        integrals.update({key: verification[key] for key in integrals})
+    return integrals
+
+
+def factor_efficiency_from_integrals(integrals, power_input: float):
+    input_energy = power_input * integrals["duration"]
+    if input_energy <= 0:
+        return 0.0
+    return max(0.0, integrals["output_energy"] / input_energy)
+
+
+def _build_factor_result(integrals, experiment_params, experiment_index):
+    """由验证实验积分量构造因素探究模式下的简化结果"""
+    return {
+        'experiment_params': experiment_params,
+        'experiment_index': experiment_index,
+        'factor_exploration_mode': True,
+        'efficiency': factor_efficiency_from_integrals(integrals, experiment_params['power_input']),
+        'avg_output_power': integrals["avg_output_power"],
+        'max_output_power': integrals["max_output_power"],
+        'energy_integrals': integrals,
+    }
+
+
+SIMPLE_COMPARISON_COLUMNS = ['效率(%)', '平均输出功率(W)', '最大输出功率(W)']
+DUAL_COMPARISON_COLUMNS = ['验证实验-正接效率', '验证实验-反接效率', '验证实验-综合效率',
+                           '理论实验-正接效率', '理论实验-反接效率', '理论实验-综合效率',
+                           '正接效率差值', '反接效率差值', '综合效率差值']
+TRACE_EXPORT_COLUMNS = ['实验组', '实验', '接法', '时间(s)', '输出电流(A)', '输出功率(W)', '输入电流(A)', '输入功率(W)']
+# 逐点数据表的各列取自 TraceData 中的哪个键（验证实验为 current/power，理论实验为 output_*/input_*）
+_TRACE_EXPORT_SOURCES = {'时间(s)': ('time',), '输出电流(A)': ('current', 'output_current'),
+                         '输出功率(W)': ('power', 'output_power'), '输入电流(A)': ('input_current',),
+                         '输入功率(W)': ('input_power',)}
+
+
+def _trace_export_chunks(result, chunk_rows):
+    """双机标定结果中各部分逐点数据的分段，每段为 TRACE_EXPORT_COLUMNS 各列的数组"""
+    for section, section_label in (("verification", "验证实验"), ("theoretical", "理论实验")):
+        for side, side_label in (("zheng", "正接"), ("fan", "反接")):
+            part = result.get(section, {}).get(side)
+            if part is None:
+                continue
+            for chunk in part["plot_data"].iter_chunks(chunk_rows):
+                n = len(chunk["time"])
+                data = {'实验组': np.full(n, result['experiment_index']),
+                        '实验': np.full(n, section_label), '接法': np.full(n, side_label)}
+                for column, keys in _TRACE_EXPORT_SOURCES.items():
+                    data[column] = next((chunk[key] for key in keys if key in chunk), np.full(n, np.nan))
+                yield data
+
+
+def _is_simple_result(result):
+    """简化计算或因素探究模式的结果（只有验证实验的效率和功率，没有正接/反接两部分）"""
+    return bool(result.get('simple_mode') or result.get('factor_exploration_mode'))
+
+
+def _task_integral_key(task):
+    """因素探究任务在积分缓存中的键，文件不存在时返回 None"""
+    params = task['experiment_params']
+    try:
+        return EnergyIntegralCache.make_key(task['zheng_file'], params['reference_v'], params['initial_v'],
+                                            params['r_load'], params['sampling_freq'], task.get('points_to_process'),
+                                            ChannelMap.from_dict(task.get('channel_map')),
+                                            SteadyStateDetector.from_dict(task.get('steady_state')))
+    except (OSError, KeyError):
+        return None
+
+
+def run_experiment_task(task):
+    """
+    计算单个实验组，可在子进程中执行。
+
+    task 字典包含 experiment_index、experiment_params、zheng_file、fan_file、
+    points_to_process 和 factor_exploration_mode，可选 channel_map（ChannelMap.to_dict() 的结果）、
+    steady_state（SteadyStateDetector.to_dict() 的结果，不提供时不做稳态检测）
+    和 trace_dtype（如 'float32'，保留该精度的逐点数据；默认不保留，批量结果只含标量和统计量），
+    以及 trace_store（TraceStore 的目录）：提供时保留逐点数据（未指定 trace_dtype 时为 float64），在子进程中写入该目录，
+    返回的结果只包含文件路径。trace_stages 为 True 时记录分阶段计时，放在结果的 stage_trace 中（StageTracer.records）。
+    因素探究模式只读取验证实验的输出通道并计算其积分量，结果中的 energy_integrals 可放入 EnergyIntegralCache。
+    返回 (experiment_index, 结果或None, 错误信息或None)，单组失败不会抛出异常。
+    """
+    if task.get('trace_stages'):
+        with tracing() as tracer:
+            index, result, error = run_experiment_task({**task, 'trace_stages': False})
+        if result is not None:
+            result['stage_trace'] = tracer.records
+        return index, result, error
+
+    index = task['experiment_index']
+    params = task['experiment_params']
+    trace_root = task.get('trace_store')
+    trace_dtype = task.get('trace_dtype')
+    if trace_root is not None and trace_dtype is None:
+        trace_dtype = np.float64
+    channel_map = ChannelMap.from_dict(task.get('channel_map'))
+    steady_state = SteadyStateDetector.from_dict(task.get('steady_state'))
+    try:
+        if task.get('factor_exploration_mode'):
+            # 因素探究模式的正接/反接为同一文件，效率只取决于验证实验的积分量
+            integrals = calculate_verification_integrals(
+                task['zheng_file'], params['reference_v'], params['initial_v'], params['r_load'],
+                params['sampling_freq'], task.get('points_to_process'), channel_map, steady_state
+            )
+            if integrals is None:
+                return index, None, "计算失败，返回结果为空"
+            return index, _build_factor_result(integrals, params, index), None
+
+        result = calculate_unified_efficiencies(
+            zheng_file_path=task['zheng_file'],
+            fan_file_path=task['fan_file'],
+            reference_v=params['reference_v'],
+            initial_v=params['initial_v'],
+            r_load=params['r_load'],
+            drive_v=params.get('drive_v', 0),
+            power_input=params['power_input'],
+            sampling_freq=params['sampling_freq'],
+            points_to_process_zheng=task.get('points_to_process'),
+            points_to_process_fan=task.get('points_to_process'),
+            channel_map=channel_map,
+            steady_state=steady_state,
+            trace_dtype=trace_dtype
+        )
+        if result and trace_root is not None:
+            TraceStore(trace_root).spill_result(result, f"exp{index}")
+    except Exception as e:
+        return index, None, f"{type(e).__name__}: {e}"
+    if not result:
+        return index, None, "计算失败，返回结果为空"
+    result['experiment_params'] = params
+    result['experiment_index'] = index
+    return index, result, None
+
+
+_USE_DEFAULT_INTEGRAL_CACHE = object()
+
+
+def _resolve_worker_count(max_workers):
+    if max_workers is None or max_workers <= 0:
+        return os.cpu_count() or 1
+    return max_workers
+
+
+def iter_experiment_tasks(tasks, max_workers: int | None = 1, integral_cache=_USE_DEFAULT_INTEGRAL_CACHE):
+    """
+    执行一组实验任务，按完成顺序逐个返回 run_experiment_task 的结果。
+
+    max_workers 为 1 时在当前进程中顺序执行；大于 1 时使用进程池并行执行，
+    为 None 或 0 时使用全部CPU核心。关闭生成器即可取消剩余任务。
+    调用方激活了 StageTracer（stage_trace.tracing()）时，子进程中的分阶段计时也会合并到其中。
+    因素探究任务先查询 integral_cache（默认 get_integral_cache()，None 表示不使用缓存），
+    命中的任务直接返回，不再读取文件；新计算的积分量写回缓存。
+    """
+    if integral_cache is _USE_DEFAULT_INTEGRAL_CACHE:
+        integral_cache = _default_integral_cache
+
+    pending = []
+    keys = {}
+    for task in tasks:
+        key = _task_integral_key(task) if integral_cache is not None and task.get('factor_exploration_mode') else None
+        integrals = integral_cache.get(key) if key is not None else None
+        if integrals is not None:
+            index = task['experiment_index']
+            yield index, _build_factor_result(integrals, task['experiment_params'], index), None
+            continue
+        if key is not None:
+            keys[task['experiment_index']] = key
+        pending.append(task)
+
+    runner = _run_experiment_tasks(pending, max_workers)
+    try:
+        for index, result, error in runner:
+            if result is not None and index in keys:
+                integral_cache.put(keys[index], result['energy_integrals'])
+            yield index, result, error
+    finally:
+        runner.close()
+
+
+def _run_experiment_tasks(tasks, max_workers):
+    if not tasks:
+        return
+    workers = min(_resolve_worker_count(max_workers), len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            yield run_experiment_task(task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+    tracer = active_tracer()
+    # 子进程使用与当前进程相同的数据缓存设置（以 spawn 方式启动的子进程不会继承 set_default_cache 的设置）
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=set_default_cache, initargs=(get_default_cache(),))
+    try:
+        futures = {executor.submit(run_experiment_task, {**task, 'trace_stages': True} if tracer else task): task
+                   for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                index, result, error = future.result()
+                if tracer is not None and result is not None:
+                    tracer.extend(result.pop('stage_trace', ()))
+                yield index, result, error
+            except BrokenProcessPool as e:
+                yield task['experiment_index'], None, f"工作进程异常退出: {e}"
+            except Exception as e:
+                yield task['experiment_index'], None, f"{type(e).__name__}: {e}"
+    finally:
+        # 调用方提前停止迭代（如取消计算）时，丢弃尚未开始的任务
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
 class BatchExperimentAnalyzer:
-  
+    """trace_store 不为 None 时保留各组的逐点数据并写入该 TraceStore，self.results 只持有文件路径"""
     
-    def __init__(self, config: ExperimentConfig):
+    def __init__(self, config: ExperimentConfig, trace_store: TraceStore | None = None):
         self.config = config
+        self.trace_store = trace_store
+        self.results = []
+        self.failures = []
+        self.sweep_results = None
+    
+    def run_tasks(self, tasks, max_workers: int | None = 1):
+        """执行实验任务列表，结果按 experiment_index 排序保存到 self.results，失败的组记录在 self.failures"""
         self.results = []
+        self.failures = []
+        if self.trace_store is not None:
+            tasks = [{'trace_store': self.trace_store.root, **task} for task in tasks]
+        files_by_index = {task['experiment_index']: task['zheng_file'] for task in tasks}
+        for index, result, error in iter_experiment_tasks(tasks, max_workers):
+            if result is not None:
+                self.results.append(result)
+            else:
+                logger.warning("第 %s 组计算失败: %s", index, error)
+                self.failures.append({'experiment_index': index, 'file': files_by_index.get(index), 'error': error})
+        self.results.sort(key=lambda r: r['experiment_index'])
+        self.failures.sort(key=lambda f: f['experiment_index'])
+        return self.results
     
     def run_batch_experiments(self, file_pattern_or_zheng: str, 
                             fan_file_pattern: str | None = None,
-                            points_to_process: int | None = None): 
-       
+                            points_to_process: int | None = None,
+                            max_workers: int | None = 1): 
+        """max_workers > 1 时各实验组在进程池中并行计算，结果仍按实验组序号排列"""
+        n_groups = len(self.config.variable_params)
+        zheng_files = [file_pattern_or_zheng.format(index=i+1) for i in range(n_groups)]
+        fan_files = None if fan_file_pattern is None else [fan_file_pattern.format(index=i+1) for i in range(n_groups)]
+        self.run_files(zheng_files, fan_files, points_to_process, max_workers)
+
+    def run_files(self, zheng_files, fan_files=None, points_to_process: int | None = None,
+                  max_workers: int | None = 1):
+        """
+        第 i 个文件对应配置中的第 i 组参数（实验组序号 i+1）；文件数与参数组数不同时只计算两者都有的部分。
+        双机标定模式需要同样数量的反接文件 fan_files。
+        """
         self.results = []
+        self.failures = []
+        tasks = []
+        n_groups = len(self.config.variable_params)
+        if len(zheng_files) != n_groups:
+            logger.warning("数据文件数 (%d) 与配置中的实验组数 (%d) 不同，只计算前 %d 组",
+                           len(zheng_files), n_groups, min(len(zheng_files), n_groups))
         
-        for i in range(len(self.config.variable_params)):
+        for i, current_file_path in enumerate(zheng_files[:n_groups]):
             params_from_config = self.config.get_experiment_params(i)
             
-            current_file_path = file_pattern_or_zheng.format(index=i+1)
-            
             if self.config.is_factor_exploration_mode:
                
                 if not os.path.exists(current_file_path):
-                    print(f"警告: 第 {i+1} 组因素探究文件 '{current_file_path}' 未找到，跳过")
+                    logger.warning("第 %s 组因素探究文件 '%s' 未找到，跳过", i+1, current_file_path)
                     continue
-                print(f"\n运行第 {i+1} 组因素探究: {self.config.exploration_type}")
-                print(f"文件: {current_file_path}")
-                print(f"参数: {params_from_config}")
+                logger.info("运行第 %d 组因素探究: %s", i + 1, self.config.exploration_type)
+                logger.info("文件: %s", current_file_path)
+                logger.info("参数: %s", params_from_config)
                 
-               
-                result = calculate_unified_efficiencies(
-                    zheng_file_path=current_file_path,
-                    fan_file_path=current_file_path, 
-                    reference_v=params_from_config['reference_v'],
-                    initial_v=params_from_config['initial_v'],
-                    r_load=params_from_config['r_load'],
-                    drive_v=params_from_config.get('drive_v', 0),
-                    power_input=params_from_config['power_input'],
-                    sampling_freq=params_from_config['sampling_freq'],
-                    points_to_process_zheng=points_to_process,
-                    points_to_process_fan=points_to_process 
-                )
-                if result:
-                   
-                    factor_efficiency = result["verification"]["finished_efficiency"]
-                    simplified_result = {
-                        'experiment_params': params_from_config,
-                        'experiment_index': i + 1,
-                        'factor_exploration_mode': True,
-                        'efficiency': factor_efficiency,
-                      
-                        'plot_data': result["verification"]["zheng"]["plot_data"], 
-                        'avg_output_power': np.mean(result["verification"]["zheng"]["plot_data"]["power"]) if len(result["verification"]["zheng"]["plot_data"]["power"]) > 0 else 0,
-                        'max_output_power': np.max(result["verification"]["zheng"]["plot_data"]["power"]) if len(result["verification"]["zheng"]["plot_data"]["power"]) > 0 else 0,
-                    }
-                    self.results.append(simplified_result)
+                tasks.append({
+                    'experiment_index': i + 1,
+                    'experiment_params': params_from_config,
+                    'zheng_file': current_file_path,
+                    'fan_file': current_file_path,
+                    'points_to_process': points_to_process,
+                    'channel_map': self.config.channel_map.to_dict(),
+                    'steady_state': self.config.steady_state.to_dict() if self.config.steady_state is not None else None,
+                    'factor_exploration_mode': True
+                })
             else:
                
-                if fan_file_pattern is None:
-                    print("错误: 双机标定模式需要提供反接文件模式")
+                if fan_files is None or i >= len(fan_files):
+                    logger.error("双机标定模式需要提供反接文件模式")
                     return
                 
                 zheng_file = current_file_path
-                fan_file = fan_file_pattern.format(index=i+1)
+                fan_file = fan_files[i]
                 
                 if not os.path.exists(zheng_file) or not os.path.exists(fan_file):
-                    print(f"警告: 第 {i+1} 组双机标定文件不完整 (Z: {zheng_file}, F: {fan_file})，跳过")
+                    logger.warning("第 %s 组双机标定文件不完整 (Z: %s, F: %s)，跳过", i+1, zheng_file, fan_file)
                     continue
                 
-                print(f"\n运行第 {i+1} 组双机标定实验...")
-                print(f"参数: {params_from_config}")
+                logger.info("运行第 %d 组双机标定实验...", i + 1)
+                logger.info("参数: %s", params_from_config)
                 
-                result = calculate_unified_efficiencies(
-                    zheng_file_path=zheng_file,
-                    fan_file_path=fan_file,
-                    reference_v=params_from_config['reference_v'],
-                    initial_v=params_from_config['initial_v'],
-                    r_load=params_from_config['r_load'],
-                    drive_v=params_from_config.get('drive_v', 0),
-                    power_input=params_from_config['power_input'],
-                    sampling_freq=params_from_config['sampling_freq'],
-                    points_to_process_zheng=points_to_process,
-                    points_to_process_fan=points_to_process
-                )
-                if result:
-                    result['experiment_params'] = params_from_config
-                    result['experiment_index'] = i + 1
-                    self.results.append(result)
+                tasks.append({
+                    'experiment_index': i + 1,
+                    'experiment_params': params_from_config,
+                    'zheng_file': zheng_file,
+                    'fan_file': fan_file,
+                    'points_to_process': points_to_process,
+                    'channel_map': self.config.channel_map.to_dict(),
+                    'steady_state': self.config.steady_state.to_dict() if self.config.steady_state is not None else None,
+                    'factor_exploration_mode': False
+                })
+
+        self.run_tasks(tasks, max_workers)
     
-    def generate_comparison_table(self):
-       
+    def run_parameter_sweep(self, file_path: str, reference_v=None, initial_v=None, r_load=None,
+                            power_input=None, points_to_process: int | None = None):
+        """
+        对单个数据文件做校准参数敏感性扫描，结果 DataFrame 保存到 self.sweep_results。
+
+        未给出的参数取配置中的公共/固定参数；给出一组取值的参数参与扫描（见 sweep_calibration_parameters）。
+        """
+        params = self.config.common_params.copy()
+        params.update(self.config.fixed_params)
+        overrides = {'reference_v': reference_v, 'initial_v': initial_v, 'r_load': r_load, 'power_input': power_input}
+        params.update({name: value for name, value in overrides.items() if value is not None})
+        missing = [name for name in overrides if name not in params]
+        if missing:
+            logger.error("参数扫描缺少参数: %s", ', '.join(missing))
+            return None
+
+        self.sweep_results = sweep_calibration_parameters(
+            file_path,
+            reference_v=params['reference_v'],
+            initial_v=params['initial_v'],
+            r_load=params['r_load'],
+            power_input=params['power_input'],
+            drive_v=params.get('drive_v'),
+            sampling_freq=params['sampling_freq'],
+            points_to_process=points_to_process,
+            channel_map=self.config.channel_map
+        )
+        if self.sweep_results is None:
+            logger.warning("数据文件 '%s' 为空，无法进行参数扫描", file_path)
+        return self.sweep_results
+
+    def _comparison_columns(self, simple: bool):
+        variable = {'voltage': '输入电压(V)', 'resistance': '负载电阻(Ω)'}.get(self.config.exploration_type, '磁场距离(mm)')
+        return ['实验组', variable, '输入功率(W)'] + (SIMPLE_COMPARISON_COLUMNS if simple else DUAL_COMPARISON_COLUMNS)
+
+    def _comparison_row(self, result):
+        """结果对比表中的一行（数值类型）"""
+        params = result['experiment_params']
+        row = {'实验组': result['experiment_index'], '输入功率(W)': params['power_input']}
+        if self.config.exploration_type == 'voltage':
+            row['输入电压(V)'] = params['drive_v']
+        elif self.config.exploration_type == 'resistance':
+            row['负载电阻(Ω)'] = params['r_load']
+        else:
+            var_params = self.config.variable_params[result['experiment_index'] - 1]
+            row['磁场距离(mm)'] = var_params.get('magnetic_distance', np.nan)
+
+        if _is_simple_result(result):
+            row['效率(%)'] = result['efficiency'] * 100
+            row['平均输出功率(W)'] = result['avg_output_power']
+            row['最大输出功率(W)'] = result['max_output_power']
+        else:
+            ver, theo, comp = result['verification'], result['theoretical'], result['comparison']
+            row['验证实验-正接效率'] = ver['zheng']['efficiency']
+            row['验证实验-反接效率'] = ver['fan']['efficiency']
+            row['验证实验-综合效率'] = ver['finished_efficiency']
+            row['理论实验-正接效率'] = theo['zheng']['efficiency']
+            row['理论实验-反接效率'] = theo['fan']['efficiency']
+            row['理论实验-综合效率'] = theo['finished_efficiency']
+            row['正接效率差值'] = comp['zheng_diff']
+            row['反接效率差值'] = comp['fan_diff']
+            row['综合效率差值'] = comp['finished_diff']
+        return row
+
+    def export_results(self, path: str, fmt: str | None = None, include_traces: bool = False,
+                       chunk_rows: int = CHUNK_ROWS):
+        """
+        流式导出结果对比表（数值类型）、实验配置和（include_traces=True 时）各组的逐点数据，返回写入的文件路径列表。
+        格式由 fmt 或扩展名确定（csv、parquet、xlsx），各表的存放方式见 result_export 模块；
+        逐点数据按 chunk_rows 个样本分段读取和写出，内存占用与实验组数和采集时长无关。
+        只有保留了逐点数据的双机标定结果（见 trace_store）才有逐点数据。
+        """
         if not self.results:
-            print("错误: 没有可用的实验结果")
+            logger.error("没有可用的实验结果")
+            return []
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        with open_table_writer(path, fmt, chunk_rows) as writer:
+            summary = writer.table('实验结果对比', self._comparison_columns(_is_simple_result(self.results[0])))
+            traces = writer.table('逐点数据', TRACE_EXPORT_COLUMNS) if include_traces else None
+            for result in self.results:
+                summary.append(self._comparison_row(result))
+                if traces is not None:
+                    for chunk in _trace_export_chunks(result, chunk_rows):
+                        traces.write(chunk)
+            config = writer.table('实验配置', ['参数名', '参数值'])
+            for name, value in (('探究类型', self.config.exploration_type),
+                                ('固定参数', str(self.config.fixed_params)),
+                                ('通用参数', str(self.config.common_params)),
+                                ('实验时间', timestamp)):
+                config.append({'参数名': name, '参数值': value})
+        if traces is not None and traces.n_rows == 0:
+            logger.warning("结果中没有逐点数据：因素探究模式不保留逐点数据，双机标定模式需要使用 trace_store")
+        logger.info("实验结果已导出到: %s", ", ".join(writer.paths))
+        return writer.paths
+
+    def generate_comparison_table(self, output_dir: str | None = None):
+        """生成实验结果对比表并保存为Excel文件（未安装 openpyxl 时为CSV，output_dir 默认为当前目录），返回 DataFrame"""
+        if not self.results:
+            logger.error("没有可用的实验结果")
             return None
-        
-       
-        table_data = []
-        
-        for i, result in enumerate(self.results):
-            params = result['experiment_params']
-            row = {
-                '实验组': result['experiment_index']
-            }
-            
-          
-            if self.config.exploration_type == 'voltage':
-                row['输入电压(V)'] = params['drive_v']
-                row['输入功率(W)'] = params['power_input']
-            elif self.config.exploration_type == 'resistance':
-                row['负载电阻(Ω)'] = params['r_load']
-                row['输入功率(W)'] = params['power_input']
-            else: 
-              
-                var_params = self.config.variable_params[i]
-                if 'magnetic_distance' in var_params:
-                    row['磁场距离(mm)'] = var_params['magnetic_distance']
-                row['输入功率(W)'] = params['power_input']
-            
-          
-            if 'simple_mode' in result and result['simple_mode']:
-               
-                row['效率(%)'] = f"{result['efficiency']*100:.2f}"
-                row['平均输出功率(W)'] = f"{result['avg_output_power']:.2f}"
-                row['最大输出功率(W)'] = f"{result['max_output_power']:.2f}"
-            else:
-               
-                row['验证实验-正接效率'] = f"{result['verification']['zheng']['efficiency']:.4f}"
-                row['验证实验-反接效率'] = f"{result['verification']['fan']['efficiency']:.4f}"
-                row['验证实验-综合效率'] = f"{result['verification']['finished_efficiency']:.4f}"
-                
-                row['理论实验-正接效率'] = f"{result['theoretical']['zheng']['efficiency']:.4f}"
-                row['理论实验-反接效率'] = f"{result['theoretical']['fan']['efficiency']:.4f}"
-                row['理论实验-综合效率'] = f"{result['theoretical']['finished_efficiency']:.4f}"
-                
-                row['正接效率差值'] = f"{result['comparison']['zheng_diff']:.4f}"
-                row['反接效率差值'] = f"{result['comparison']['fan_diff']:.4f}"
-                row['综合效率差值'] = f"{result['comparison']['finished_diff']:.4f}"
-            
-            table_data.append(row)
-        
-     
-        df = pd.DataFrame(table_data)
-        
-      
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        excel_filename = f'实验结果对比_{self.config.exploration_type}_{timestamp}.xlsx'
-        
-        with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='实验结果对比', index=False)
-            
-           
-            config_df = pd.DataFrame([
-                ['探究类型', self.config.exploration_type],
-                ['固定参数', str(self.config.fixed_params)],
-                ['通用参数', str(self.config.common_params)],
-                ['实验时间', timestamp]
-            ], columns=['参数名', '参数值'])
-            config_df.to_excel(writer, sheet_name='实验配置', index=False)
-        
-        print(f"\n实验结果已保存到: {excel_filename}")
-        
-        return df
+        excel_filename = os.path.join(output_dir or '', f'实验结果对比_{self.config.exploration_type}_{timestamp}.xlsx')
+        try:
+            self.export_results(excel_filename)
+        except ImportError:
+            logger.warning("未安装openpyxl库，实验结果改为保存为CSV文件")
+            self.export_results(os.path.splitext(excel_filename)[0] + '.csv')
+        return pd.DataFrame([self._comparison_row(result) for result in self.results],
+                            columns=self._comparison_columns(_is_simple_result(self.results[0])))
     
-    def plot_efficiency_curves(self):
-      
+    def plot_efficiency_curves(self, output_dir: str | None = None, show: bool = True):
+        """绘制效率曲线并保存为PNG（output_dir 默认为当前目录），show=False 时不显示窗口，返回图片路径"""
         if not self.results:
-            print("错误: 没有可用的实验结果")
+            logger.error("没有可用的实验结果")
             return
-        
+        plt = _pyplot()
       
-        is_simple_mode = any('simple_mode' in result and result['simple_mode'] for result in self.results)
+        is_simple_mode = any(_is_simple_result(result) for result in self.results)
         
         if is_simple_mode:
         
             x_values = []
             efficiencies = []
             
-            for i, result in enumerate(self.results):
+            for result in self.results:
                 params = result['experiment_params']
                 
                 if self.config.exploration_type == 'voltage':
@@ -619,7 +1282,7 @@ class BatchExperimentAnalyzer:
                     title_prefix = '负载电阻'
                 else: 
                  
-                    var_params = self.config.variable_params[i]
+                    var_params = self.config.variable_params[result['experiment_index'] - 1]
                     if 'magnetic_distance' in var_params:
                         x_values.append(var_params['magnetic_distance'])
                     else:
@@ -661,7 +1324,7 @@ class BatchExperimentAnalyzer:
             theo_fan_eff = []
             theo_finished_eff = []
             
-            for i, result in enumerate(self.results):
+            for result in self.results:
                 params = result['experiment_params']
                 
                 if self.config.exploration_type == 'voltage':
@@ -672,7 +1335,7 @@ class BatchExperimentAnalyzer:
                     x_label = '负载电阻 (Ω)'
                 else: 
                    
-                    var_params = self.config.variable_params[i]
+                    var_params = self.config.variable_params[result['experiment_index'] - 1]
                     if 'magnetic_distance' in var_params:
                         x_values.append(var_params['magnetic_distance'])
                     else:
@@ -714,11 +1377,15 @@ class BatchExperimentAnalyzer:
         
        
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        fig_filename = f'效率曲线_{self.config.exploration_type}_{timestamp}.png'
+        fig_filename = os.path.join(output_dir or '', f'效率曲线_{self.config.exploration_type}_{timestamp}.png')
         plt.savefig(fig_filename, dpi=300, bbox_inches='tight')
-        plt.show()
+        if show:
+            plt.show()
+        else:
+            plt.close(fig)
         
-        print(f"\n效率曲线图已保存到: {fig_filename}")
+        logger.info("效率曲线图已保存到: %s", fig_filename)
+        return fig_filename
 
 
 